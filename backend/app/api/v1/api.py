@@ -1,9 +1,10 @@
 # app/api/v1/api.py
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import chat
+from app.api.v1.endpoints import admin, chat
 
 api_router = APIRouter()
 
 # Include endpoint routers here
-api_router.include_router(chat.router, tags=["chat"])
\ No newline at end of file
+api_router.include_router(chat.router, tags=["chat"])
+api_router.include_router(admin.router, tags=["admin"])
\ No newline at end of file
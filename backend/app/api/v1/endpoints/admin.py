@@ -0,0 +1,89 @@
+# app/api/v1/endpoints/admin.py
+from fastapi import APIRouter
+import logging
+
+from app.services.offload import blocking_offloader
+from app.services.tts_cache import tts_cache
+from app.services.canned_audio import canned_responses
+from app.services.answer_cache import answer_cache
+from app.services.session_store import session_store
+from app.services.conversation_store import conversation_store
+from app.services.session_registry import session_registry
+from app.services.audio_ingest import audio_ingest
+from app.services.provider_scheduler import provider_scheduler
+from app.services.resilience import provider_resilience
+from app.api.v1.endpoints.chat import manager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/admin/offload")
+async def get_offload_stats():
+    """Returns queue depth, running count and wait time per blocking stage."""
+    return blocking_offloader.stats()
+
+
+@router.get("/admin/tts-cache")
+async def get_tts_cache_stats():
+    """Returns TTS cache hit/miss counters and bytes held per tier."""
+    return tts_cache.stats()
+
+
+@router.get("/admin/canned")
+async def get_canned_responses():
+    """Lists canned system messages and whether their audio is pre-rendered."""
+    return {
+        key: {"text": canned_responses.text(key), "audio_bytes": len(canned_responses.audio(key) or b"")}
+        for key in canned_responses.keys()
+    }
+
+
+@router.get("/admin/answer-cache")
+async def get_answer_cache_stats():
+    """Returns answer cache hit/miss counters and hit vs. miss latency."""
+    return answer_cache.stats()
+
+
+@router.get("/admin/connections")
+async def get_connection_stats():
+    """Returns send queue depth, bytes in flight and drops per connected client."""
+    return manager.stats()
+
+
+@router.get("/admin/sessions")
+async def get_session_store_stats():
+    """Returns the session store backend, stored session count and write counters."""
+    return await blocking_offloader.run("session_store", session_store.stats)
+
+
+@router.get("/admin/conversations")
+async def get_conversation_store_stats():
+    """Returns pending writes, batches flushed, resumes and purges of the conversation store."""
+    return conversation_store.stats()
+
+
+@router.get("/admin/memory")
+async def get_memory_stats():
+    """Returns sessions and bytes held by in-memory histories and by open connections."""
+    return {
+        "sessions": session_registry.stats(),
+        "connections": {
+            "connections": len(manager.active_connections),
+            "send_queue_bytes": manager.send_queue_bytes(),
+            "ingest_bytes": audio_ingest.nbytes(),
+        },
+    }
+
+
+@router.get("/admin/providers")
+async def get_provider_stats():
+    """Returns rate limiter queue depth, slots in use, refusals and queue wait per provider."""
+    return provider_scheduler.stats()
+
+
+@router.get("/admin/resilience")
+async def get_resilience_stats():
+    """Returns circuit state, retries, hedges and timeouts per provider."""
+    return provider_resilience.stats()
@@ -4,96 +4,535 @@ import speech_recognition as sr
 import json
 import asyncio
 import logging
-from typing import Dict
+import time
+from typing import Any, AsyncIterator, Dict
 
 from app.services.chat_service import ChatService, chat_service # Import instance
+from app.services.audio_ingest import audio_ingest, valid_sample_rate
+from app.services.vad import END_OF_UTTERANCE, NO_SPEECH_TIMEOUT
+from app.services import canned_audio
+from app.services.canned_audio import canned_responses
+from app.services.filler import FillerSplicer
+from app.services import audio_codec, framing
+from app.services.audio_codec import AudioFormat, StreamEncoder
+from app.services.framing import FrameEncoder, FramingError
+from app.services.session_tasks import session_tasks
+from app.services.stt import STTStream
+from app.services.outbound_queue import OutboundQueue
+from app.services.provider_scheduler import LLM, STT, TTS, ProviderBusy
+from app.services import metrics
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Providers every voice turn calls: recognition, the reply and its speech
+TURN_PROVIDERS = (STT, LLM, TTS)
+
 
 class ConnectionManager:
-    """Manages active WebSocket connections."""
+    """Manages active WebSocket connections.
+
+    Every connection gets an OutboundQueue drained by its own writer task, so
+    sending never waits on a slow client's socket. Clients that offer the
+    framing.SUBPROTOCOL WebSocket subprotocol get every message as a binary
+    frame (see app.services.framing); others get JSON text and raw PCM.
+    Reply audio is sent in the format each client negotiated when it
+    connected (see app.services.audio_codec).
+    """
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        self.send_queues: Dict[str, OutboundQueue] = {}
+        self.encoders: Dict[str, FrameEncoder] = {} # framed connections only
+        self.formats: Dict[str, AudioFormat] = {}
+        self.slow_consumers_disconnected = 0
+
+    async def connect(self, websocket: WebSocket, client_id: str) -> bool:
+        """
+        Accepts a new connection and starts its writer task.
+
+        The reply audio format is negotiated from the audio_format (formats
+        in order of preference, e.g. "ulaw,pcm") and audio_sample_rate query
+        parameters of the WebSocket URL. A connection the client still had
+        open is replaced: its writer task is stopped and its socket closed.
 
-    async def connect(self, websocket: WebSocket, client_id: str):
-        """Accepts a new connection."""
-        await websocket.accept()
+        Returns:
+            Whether the client speaks the framed protocol.
+        """
+        framed = framing.SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+        await websocket.accept(subprotocol=framing.SUBPROTOCOL if framed else None)
+        replaced = self.send_queues.pop(client_id, None)
+        if replaced is not None:
+            logger.info(f"Client {client_id} reconnected; closing its previous connection")
+            replaced.evict()
+        self.encoders.pop(client_id, None)
         self.active_connections[client_id] = websocket
-        logger.info(f"Client connected: {client_id}, Total connections: {len(self.active_connections)}")
+        if framed:
+            self.encoders[client_id] = FrameEncoder()
+        self.formats[client_id] = audio_codec.negotiate(
+            websocket.query_params.get("audio_format"), websocket.query_params.get("audio_sample_rate")
+        )
+        queue = OutboundQueue(
+            websocket,
+            client_id,
+            max_bytes=settings.SEND_QUEUE_MAX_BYTES,
+            max_messages=settings.SEND_QUEUE_MAX_MESSAGES,
+            put_timeout=settings.SEND_QUEUE_PUT_TIMEOUT,
+            send_timeout=settings.SEND_TIMEOUT,
+            slow_consumer_seconds=settings.SEND_SLOW_CONSUMER_SECONDS,
+            coalesce=framing.coalesce if framed else None,
+        )
+        queue.start()
+        self.send_queues[client_id] = queue
+        audio_format = self.formats[client_id]
+        logger.info(
+            f"Client connected: {client_id}{' (framed)' if framed else ''}, "
+            f"audio {audio_format.name}@{audio_format.sample_rate}Hz, "
+            f"Total connections: {len(self.active_connections)}"
+        )
+        return framed
 
-    def disconnect(self, client_id: str):
-        """Removes a connection."""
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
-            logger.info(f"Client disconnected: {client_id}, Total connections: {len(self.active_connections)}")
+    def disconnect(self, client_id: str, websocket: WebSocket) -> bool:
+        """
+        Removes a connection and stops its writer task.
 
-    async def send_text_message(self, message: str, client_id: str):
-        """Sends a text message to a specific client."""
-        if client_id in self.active_connections:
-            try:
-                await self.active_connections[client_id].send_text(message)
-                logger.debug(f"Sent text to {client_id}: {message}")
-            except Exception as e:
-                logger.error(f"Error sending text to {client_id}: {e}")
-                # Consider disconnecting the client if send fails repeatedly
-                # self.disconnect(client_id)
+        Args:
+            client_id: The client identifier.
+            websocket: The connection that ended.
+
+        Returns:
+            False, and nothing is removed, if the client has reconnected since
+            (connect already closed this connection's writer task).
+        """
+        if self.active_connections.get(client_id) is not websocket:
+            logger.info(f"Previous connection of {client_id} closed; keeping the newer one")
+            return False
+        self.encoders.pop(client_id, None)
+        self.formats.pop(client_id, None)
+        queue = self.send_queues.pop(client_id, None)
+        if queue is not None:
+            queue.close()
+            if queue.slow_consumer:
+                self.slow_consumers_disconnected += 1
+        del self.active_connections[client_id]
+        logger.info(f"Client disconnected: {client_id}, Total connections: {len(self.active_connections)}")
+        return True
+
+    def close_evicted(self, client_id: str) -> None:
+        """Closes the connection of a client whose session was evicted (idle or over budget)."""
+        queue = self.send_queues.get(client_id)
+        if queue is not None:
+            logger.info(f"Closing connection of evicted session: {client_id}")
+            queue.evict()
+
+    def audio_format(self, client_id: str) -> AudioFormat:
+        """Returns the reply audio format negotiated by a client."""
+        return self.formats.get(client_id) or audio_codec.default_format()
+
+    async def send_text_message(self, message: str, client_id: str, flush_audio: bool = False):
+        """
+        Queues a text message (shown or spoken by the client) for a specific client.
+
+        Args:
+            message: The text message.
+            client_id: The target client.
+            flush_audio: Drop audio still queued for the client before this message.
+        """
+        queue = self.send_queues.get(client_id)
+        if queue is not None:
+            encoder = self.encoders.get(client_id)
+            queue.put_text(
+                encoder.encode(framing.TEXT, message.encode()) if encoder else message, flush_audio=flush_audio
+            )
+            logger.debug(f"Queued text to {client_id}: {message}")
+
+    async def send_control(
+        self, message: Dict[str, Any], client_id: str, stream: int = 0, flush_audio: bool = False
+    ) -> None:
+        """
+        Queues a control message: JSON text, or a CONTROL frame on a framed connection.
+
+        Args:
+            message: The JSON-serializable message.
+            client_id: The target client.
+            stream: The stream the message belongs to (framed connections).
+            flush_audio: Drop audio still queued for the client before this message.
+        """
+        queue = self.send_queues.get(client_id)
+        if queue is not None:
+            encoder = self.encoders.get(client_id)
+            text = json.dumps(message)
+            queue.put_text(
+                encoder.encode(framing.CONTROL, text.encode(), stream) if encoder else text, flush_audio=flush_audio
+            )
+            logger.debug(f"Queued control message to {client_id}: {text}")
+
+    async def send_audio_message(self, audio_bytes: bytes | memoryview, client_id: str, stream: int = 0) -> bool:
+        """
+        Queues audio data for a specific client.
+
+        Args:
+            audio_bytes: The audio; a memoryview is copied once, into the queued message.
+            client_id: The target client.
+            stream: The reply stream the audio belongs to (framed connections).
+
+        Returns:
+            False if the frame was dropped because the client is over its send budget.
+        """
+        queue = self.send_queues.get(client_id)
+        if queue is None:
+            return False
+        encoder = self.encoders.get(client_id)
+        if encoder is not None:
+            audio_bytes = encoder.encode(framing.AUDIO, audio_bytes, stream)
+        elif isinstance(audio_bytes, memoryview):
+            audio_bytes = bytes(audio_bytes)
+        queued = await queue.put_audio(audio_bytes)
+        if not queued:
+            logger.debug(f"Dropped {len(audio_bytes)} bytes of audio data for {client_id}")
+        return queued
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns send queue counters per connected client and the memory they hold.
+
+        Returns:
+            A JSON-serializable dict of counters.
+        """
+        return {
+            "connections": len(self.active_connections),
+            "slow_consumers_disconnected": self.slow_consumers_disconnected,
+            "send_queue_bytes": self.send_queue_bytes(),
+            "ingest_bytes": audio_ingest.nbytes(),
+            "clients": {client_id: queue.stats() for client_id, queue in self.send_queues.items()},
+        }
+
+    def send_queue_bytes(self) -> int:
+        """Returns the outbound bytes held by all send queues."""
+        return sum(queue.nbytes for queue in self.send_queues.values())
+
+    async def send_audio_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        client_id: str,
+        utterance_end: float | None = None,
+        trace_id: str | None = None,
+        filler: bool = False,
+    ) -> int:
+        """
+        Streams audio to a client as it is produced.
+
+        Incoming chunks are converted to the client's audio format, coalesced
+        into frames of TTS_FRAME_MS of audio (compressed formats are forwarded
+        as they arrive) and sent as binary messages between "audio_start" and "audio_end" control
+        messages, so the client can start playback on the first frame. On a
+        framed connection all of them carry a new stream id, so the client can
+        ignore late frames of a reply it already stopped.
+        With filler, a filler clip is played if no audio is ready
+        FILLER_DELAY_MS after utterance_end (see FillerSplicer).
+
+        Args:
+            chunks: Async iterator of TTS audio chunks (PCM unless the client's
+                format is passed through).
+            client_id: The target client.
+            utterance_end: time.perf_counter() at which the user's utterance
+                ended; time to the first frame is recorded from it.
+            trace_id: Optional turn id echoed in the control messages so the
+                client can correlate its own timing.
+            filler: Whether a late reply may be masked with filler audio.
+
+        Returns:
+            The number of audio bytes queued (frames dropped under
+            backpressure are not counted).
+        """
+        audio_format = self.audio_format(client_id)
+        frame_bytes = audio_format.frame_bytes(settings.TTS_FRAME_MS)
+        transcoder = StreamEncoder(audio_format, settings.TTS_SAMPLE_RATE)
+        started_at = utterance_end or time.perf_counter()
+        trace = {"trace_id": trace_id} if trace_id else {}
+        encoder = self.encoders.get(client_id)
+        stream = encoder.open_stream() if encoder else 0
+        splicer = None
+        if filler and utterance_end is not None and settings.FILLER_ENABLED and not audio_format.passthrough:
+            # The filler is spliced into the TTS PCM, in frames of the same length
+            source_frame_bytes = settings.TTS_SAMPLE_RATE * 2 * settings.TTS_FRAME_MS // 1000
+            splicer = FillerSplicer(
+                utterance_end + settings.FILLER_DELAY_MS / 1000, source_frame_bytes, settings.FILLER_LEAD_MS / 1000
+            )
+            chunks = splicer.splice(chunks)
+        pending = bytearray()
+        sent = 0
+        frames = 0
+        dropped = 0
+        replied = False
+
+        async def send_frame(frame: bytes | memoryview) -> None:
+            nonlocal sent, frames, dropped, replied
+            if not replied and not (splicer and splicer.playing):
+                # Filler frames do not count as the reply's first audio
+                replied = True
+                first_audio = time.perf_counter() - started_at
+                if utterance_end is not None:
+                    metrics.FIRST_AUDIO_SECONDS.observe(first_audio)
+                after_filler = " (after filler)" if splicer and splicer.played else ""
+                logger.info(f"Time to first audio frame sent to {client_id}: {int(first_audio * 1000)}ms{after_filler}")
+            if await self.send_audio_message(frame, client_id, stream):
+                sent += len(frame)
+                frames += 1
+            else:
+                dropped += 1
+
+        await self.send_control({
+            "type": "audio_start",
+            "format": audio_format.name,
+            "sample_rate": audio_format.sample_rate,
+            **trace,
+        }, client_id, stream)
+        try:
+            async for chunk in chunks:
+                chunk = transcoder.encode(chunk)
+                if frame_bytes is None:
+                    if chunk:
+                        await send_frame(chunk)
+                    continue
+                pending.extend(chunk)
+                if len(pending) < frame_bytes:
+                    continue
+                usable = len(pending) - len(pending) % frame_bytes
+                with memoryview(pending) as view:
+                    for offset in range(0, usable, frame_bytes):
+                        await send_frame(view[offset:offset + frame_bytes])
+                del pending[:usable]
+            pending.extend(transcoder.flush())
+            if pending:
+                await send_frame(bytes(pending))
+        except asyncio.CancelledError:
+            # Tell the client to stop playback of the interrupted reply
+            await self.send_control(
+                {"type": "audio_end", "bytes": sent, "interrupted": True, **trace}, client_id, stream, flush_audio=True
+            )
+            raise
+        except Exception:
+            await self.send_control({"type": "audio_end", "bytes": sent, **trace}, client_id, stream)
+            raise
+        else:
+            await self.send_control({"type": "audio_end", "bytes": sent, **trace}, client_id, stream)
+        finally:
+            if encoder is not None:
+                encoder.close_stream(stream)
+        logger.info(
+            f"Streamed {sent} bytes in {frames} frames to {client_id} in "
+            f"{int((time.perf_counter() - started_at) * 1000)}ms (trace {trace_id})"
+        )
+        if dropped:
+            logger.warning(f"Dropped {dropped} audio frames for slow client {client_id}")
+        return sent
+
+    async def send_canned(self, key: str, client_id: str, trace_id: str | None = None) -> None:
+        """
+        Sends a canned system message, as pre-rendered audio when available.
 
-    async def send_audio_message(self, audio_bytes: bytes, client_id: str):
-        """Sends audio data (bytes) to a specific client."""
-        if client_id in self.active_connections:
+        Falls back to the message text when its audio has not been rendered.
+
+        Args:
+            key: The canned message key (see app.services.canned_audio).
+            client_id: The target client.
+            trace_id: Optional turn id echoed in the control messages.
+        """
+        audio_format = self.audio_format(client_id)
+        if audio_format.passthrough and audio_format.tts_format != settings.TTS_RESPONSE_FORMAT:
+            # Pre-rendered audio is PCM; compressed sessions get the message from TTS (cached)
             try:
-                await self.active_connections[client_id].send_bytes(audio_bytes)
-                logger.info(f"Sent {len(audio_bytes)} bytes of audio data to {client_id}")
+                audio = b"".join([
+                    chunk async for chunk in chat_service.synthesize_speech_stream(
+                        canned_responses.text(key), audio_format=audio_format.tts_format
+                    )
+                ])
             except Exception as e:
-                logger.error(f"Error sending audio bytes to {client_id}: {e}")
-                # Consider disconnecting the client
+                logger.warning(f"Could not synthesize canned message '{key}' as {audio_format.name}: {e}")
+                audio = None
+        else:
+            audio = canned_responses.audio(key)
+        if audio is None:
+            await self.send_text_message(canned_responses.text(key), client_id)
+            return
+
+        async def single_chunk() -> AsyncIterator[bytes]:
+            yield audio
+
+        await self.send_audio_stream(single_chunk(), client_id, trace_id=trace_id)
 
 
 manager = ConnectionManager()
+# Abandoned tabs keep their socket open; close it when the session is evicted
+chat_service.sessions.on_evict = manager.close_evicted
+metrics.metrics_registry.gauge(
+    "voice_connections", "Open WebSocket connections.", lambda: len(manager.active_connections)
+)
+metrics.metrics_registry.gauge(
+    "voice_connection_bytes",
+    "Memory held by connections: queued outbound audio plus inbound ingest buffers.",
+    lambda: manager.send_queue_bytes() + audio_ingest.nbytes(),
+)
 
 
-async def handle_audio_processing(client_id: str, service: ChatService):
-    """Handles the audio recording, processing, and response loop."""
+async def handle_audio_processing(
+    client_id: str,
+    service: ChatService,
+    audio_data: sr.AudioData | None,
+    trace_id: str | None = None,
+    utterance_end: float | None = None,
+    transcription: STTStream | None = None,
+):
+    """Handles the processing and response for one captured utterance."""
+    audio_format = manager.audio_format(client_id).tts_format
     try:
-        with sr.Microphone(
-            sample_rate=16000, # Consider making configurable if needed
-            # device_index= Optional device index
-        ) as source:
-            # Optional: Adjust for ambient noise once upon connection/start
-            # service.recognizer.adjust_for_ambient_noise(source)
-            # logger.info(f"Adjusted for ambient noise for {client_id}")
-
-            # Listen for audio
-            audio_data = await service.recognize_speech(source)
-
-            if audio_data:
-                # Process audio to text (includes debug saving)
-                recognized_text = await service.process_audio_to_text(audio_data, client_id)
-
-                if recognized_text:
+        if audio_data:
+            # Fail fast with a "busy" reply if a provider of the turn is saturated or failing
+            service.scheduler.admit(client_id)
+            service.resilience.admit(TURN_PROVIDERS)
+            # Process audio to text (includes debug saving)
+            recognized_text = await service.process_audio_to_text(audio_data, client_id, transcription)
+
+            if recognized_text and settings.LLM_STREAMING:
+                # Stream the LLM reply sentence by sentence through TTS to the client
+                await manager.send_audio_stream(
+                    service.respond_with_speech(recognized_text, client_id, audio_format), client_id, utterance_end,
+                    trace_id,
+                    filler=True,
+                )
+            elif recognized_text:
+                async def reply() -> AsyncIterator[bytes]:
                     # Get LLM response
                     llm_response = await service.get_llm_response(recognized_text, client_id)
-                    # Synthesize speech from LLM response
-                    audio_response = await service.synthesize_speech(llm_response)
-                    # Send synthesized audio back to client
-                    await manager.send_audio_message(audio_response, client_id)
-                else:
-                    # Could not understand audio
-                    await manager.send_text_message("ごめんなさい、よく聞き取れませんでした。", client_id)
+                    async for chunk in service.synthesize_speech_stream(llm_response, client_id, audio_format):
+                        yield chunk
+
+                # Stream synthesized audio back to client as it arrives (filler covers the LLM wait)
+                await manager.send_audio_stream(reply(), client_id, utterance_end, trace_id, filler=True)
+            if recognized_text:
+                # Share the turn with other workers, then summarize old turns
+                await service.save_session(client_id)
+                service.schedule_history_compaction(client_id)
             else:
-                # Timeout occurred during listening
-                await manager.send_text_message("...", client_id) # Indicate listening timeout
+                # Could not understand audio
+                await manager.send_canned(canned_audio.NOT_UNDERSTOOD, client_id, trace_id)
+        else:
+            # No audio was streamed before the end of the recording
+            await manager.send_canned(canned_audio.LISTEN_TIMEOUT, client_id, trace_id) # Indicate listening timeout
 
+    except ProviderBusy as e:
+        logger.warning(f"Provider saturated for {client_id}: {e}")
+        await manager.send_canned(canned_audio.BUSY, client_id, trace_id)
     except sr.RequestError as e:
         logger.error(f"Speech Recognition RequestError for {client_id}: {e}")
-        await manager.send_text_message("音声認識サービスでエラーが発生しました。", client_id)
+        await manager.send_canned(canned_audio.STT_ERROR, client_id, trace_id)
     except Exception as e:
         logger.error(f"Unexpected error during audio processing for {client_id}: {e}", exc_info=True)
-        await manager.send_text_message("処理中にエラーが発生しました。", client_id)
+        await manager.send_canned(canned_audio.PROCESSING_ERROR, client_id, trace_id)
+    finally:
+        if transcription is not None:
+            transcription.close()
+
+
+def finish_recording(client_id: str, service: ChatService, discard: bool = False):
+    """Closes the client's current utterance and processes it in the background.
+
+    Any pipeline still running for the client is cancelled first (barge-in).
+    """
+    utterance_end = time.perf_counter()
+    ingest = audio_ingest.get(client_id)
+    audio_data = ingest.finish()
+    transcription = ingest.take_transcription()
+    if discard:
+        audio_data = None
+    session_tasks.start(
+        client_id,
+        handle_audio_processing(client_id, service, audio_data, ingest.trace_id, utterance_end, transcription),
+    )
+
+
+async def parse_command(text: str | bytes, client_id: str) -> Dict[str, Any] | None:
+    """
+    Parses a JSON command (text message or CONTROL frame payload).
+
+    Answers the client with the "invalid message" reply if it is not a JSON object.
+
+    Returns:
+        The command, or None if it was invalid.
+    """
+    try:
+        message = json.loads(text)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        logger.error(f"Received invalid JSON from {client_id}: {text!r}")
+        message = None
+    if not isinstance(message, dict):
+        await manager.send_canned(canned_audio.INVALID_MESSAGE, client_id)
+        return None
+    return message
+
+
+async def handle_command(message: Dict[str, Any], client_id: str, service: ChatService) -> None:
+    """Acts on a command from the client; both protocols share these messages."""
+    try:
+        if message.get("type") == "start_recording":
+            logger.info(f"Received 'start_recording' from {client_id}")
+            sample_rate = message.get("sample_rate")
+            if sample_rate is not None and not valid_sample_rate(sample_rate):
+                logger.error(f"Refused start_recording from {client_id} with sample rate {sample_rate!r}")
+                await manager.send_control({
+                    "type": "error",
+                    "error": "invalid_sample_rate",
+                    "min_sample_rate": settings.AUDIO_INPUT_MIN_SAMPLE_RATE,
+                    "max_sample_rate": settings.AUDIO_INPUT_MAX_SAMPLE_RATE,
+                }, client_id)
+                await manager.send_canned(canned_audio.INVALID_MESSAGE, client_id)
+                return
+            # The child started talking again: stop the current reply (barge-in)
+            await session_tasks.cancel(client_id)
+            # Subsequent binary frames are buffered for this utterance and transcribed as they arrive
+            ingest = audio_ingest.get(client_id)
+            ingest.start(sample_rate=message.get("sample_rate"), trace_id=message.get("trace_id"))
+            ingest.attach(service.open_transcription(client_id, ingest.output_rate))
+        elif message.get("type") in ("stop", "interrupt"):
+            logger.info(f"Received '{message.get('type')}' from {client_id}")
+            ingest = audio_ingest.get(client_id)
+            ingest.finish() # Discard any partial utterance
+            ingest.close_transcription()
+            await session_tasks.cancel(client_id)
+        elif message.get("type") == "stop_recording":
+            logger.info(f"Received 'stop_recording' from {client_id}")
+            finish_recording(client_id, service)
+        else:
+            logger.warning(f"Received unknown text message type from {client_id}: {message}")
+            await manager.send_canned(canned_audio.UNKNOWN_COMMAND, client_id)
+    except Exception as e:
+        logger.error(f"Error processing message from {client_id}: {e}", exc_info=True)
+        await manager.send_canned(canned_audio.MESSAGE_ERROR, client_id)
+
+
+def handle_audio(pcm: bytes | memoryview, client_id: str, service: ChatService, end: bool = False) -> None:
+    """
+    Feeds a chunk of the client's utterance to ingest and endpointing.
+
+    Args:
+        pcm: Int16 PCM streamed from the browser (may be empty).
+        client_id: The client.
+        service: The chat service.
+        end: The client marked this chunk as the end of the recording.
+    """
+    ingest = audio_ingest.get(client_id)
+    if pcm:
+        event = ingest.feed(pcm)
+        if event == END_OF_UTTERANCE:
+            logger.info(f"End of utterance detected for {client_id}")
+            finish_recording(client_id, service)
+        elif event == NO_SPEECH_TIMEOUT:
+            logger.warning(f"No speech detected for {client_id} within {settings.SR_TIMEOUT}s")
+            finish_recording(client_id, service, discard=True)
+    if end and ingest.recording:
+        finish_recording(client_id, service)
 
 
 @router.websocket("/ws/{client_id}")
@@ -103,36 +542,50 @@ async def websocket_endpoint(
     service: ChatService = Depends(lambda: chat_service) # Inject service instance
 ):
     """WebSocket endpoint for voice chat."""
-    await manager.connect(websocket, client_id)
-    service.initialize_conversation(client_id) # Initialize history on connect
+    framed = await manager.connect(websocket, client_id)
+    owner = await service.open_session(client_id) # Claim the session and load its history
+    uplink_stream = None # framed: stream of the current utterance, set by its start_recording
 
     try:
         while True:
             # We expect text messages to trigger actions, like 'start_recording'
             data = await websocket.receive()
+            service.sessions.touch(client_id)
 
             if data["type"] == "websocket.receive":
                 if "text" in data:
-                    try:
-                        message = json.loads(data["text"])
+                    # JSON commands are accepted as text on both protocols
+                    message = await parse_command(data["text"], client_id)
+                    if message is not None:
                         if message.get("type") == "start_recording":
-                            logger.info(f"Received 'start_recording' from {client_id}")
-                            # Run audio processing in the background
-                            asyncio.create_task(handle_audio_processing(client_id, service))
+                            uplink_stream = 0 # framed clients starting by text send audio on stream 0
+                        await handle_command(message, client_id, service)
+
+                elif "bytes" in data and framed:
+                    try:
+                        frame = framing.decode(data["bytes"])
+                    except FramingError as e:
+                        logger.error(f"Received invalid frame from {client_id}: {e}")
+                        await manager.send_canned(canned_audio.INVALID_MESSAGE, client_id)
+                        continue
+                    if frame.type == framing.AUDIO:
+                        if frame.stream == uplink_stream:
+                            handle_audio(frame.payload, client_id, service, end=bool(frame.flags & framing.FLAG_END))
                         else:
-                            logger.warning(f"Received unknown text message type from {client_id}: {message}")
-                            await manager.send_text_message("不明なコマンドです。", client_id)
-                    except json.JSONDecodeError:
-                        logger.error(f"Received invalid JSON from {client_id}: {data['text']}")
-                        await manager.send_text_message("無効なメッセージ形式です。", client_id)
-                    except Exception as e:
-                        logger.error(f"Error processing message from {client_id}: {e}", exc_info=True)
-                        await manager.send_text_message("メッセージ処理中にエラーが発生しました。", client_id)
+                            logger.debug(f"Ignored audio of stale stream {frame.stream} from {client_id}")
+                    elif frame.type == framing.CONTROL:
+                        message = await parse_command(bytes(frame.payload), client_id)
+                        if message is not None:
+                            if message.get("type") == "start_recording":
+                                uplink_stream = frame.stream
+                            await handle_command(message, client_id, service)
+                    else:
+                        logger.warning(f"Received unknown frame type {frame.type} from {client_id}")
+                        await manager.send_canned(canned_audio.UNKNOWN_COMMAND, client_id)
 
                 elif "bytes" in data:
-                    # Handle binary data if needed in the future
-                    # logger.info(f"Received {len(data['bytes'])} bytes from {client_id}. Discarding.")
-                    pass # Currently not expecting binary data from client
+                    # Int16 PCM chunk streamed from the browser; an empty frame ends the recording
+                    handle_audio(data["bytes"], client_id, service, end=not data["bytes"])
 
             elif data["type"] == "websocket.disconnect":
                 logger.info(f"Received disconnect event for {client_id}")
@@ -144,9 +597,13 @@ async def websocket_endpoint(
         # Catch potential unexpected errors during receive loop
         logger.error(f"Unexpected error in WebSocket loop for {client_id}: {e}", exc_info=True)
         # Try to send an error message if connection is still active
-        if client_id in manager.active_connections:
-            await manager.send_text_message("サーバー内部で予期せぬエラーが発生しました。", client_id)
+        if manager.active_connections.get(client_id) is websocket:
+            await manager.send_canned(canned_audio.INTERNAL_ERROR, client_id)
     finally:
-        manager.disconnect(client_id)
-        service.clear_conversation(client_id) # Clean up history on disconnect
+        # A client that reconnected keeps its pipeline, ingest buffer and history
+        if manager.disconnect(client_id, websocket):
+            audio_ingest.remove(client_id)
+            # Stop in-flight STT/LLM/TTS work whose result could no longer be delivered
+            await session_tasks.cancel(client_id)
+        await service.close_session(client_id, owner) # Clean up history on disconnect
         logger.info(f"Cleaned up resources for client: {client_id}")
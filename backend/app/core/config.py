@@ -22,6 +22,25 @@ class Settings(BaseSettings):
     GEMINI_TOP_P: float = 1.0
     GEMINI_TOP_K: int = 1
     GEMINI_MAX_OUTPUT_TOKENS: int = 2048
+    LLM_STREAMING: bool = True # stream the reply into sentence-chunked TTS
+    LLM_PERSONA_PROMPT: str = (
+        "あなたはてぃ先生です。保育士のプロです。\n"
+        "質問に対し3~4歳児向けに回答し、150~200文字程度に要約し端的に回答してください。"
+    )
+
+    # Conversation History Settings (about one token per Japanese character)
+    HISTORY_CHAR_BUDGET: int = 2000 # max characters of history sent per request
+    HISTORY_SUMMARY_MAX_CHARS: int = 300 # rolling summary of folded turns
+
+    # LLM Answer Cache Settings (keyed by normalized question, persona and config)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+    ANSWER_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+    ANSWER_CACHE_WITH_HISTORY: bool = False # also serve cached answers mid-conversation
+
+    # Speculative LLM Settings (needs a streaming STT_BACKEND; misses cost extra LLM calls)
+    LLM_SPECULATION_ENABLED: bool = False # request the reply for a stable partial transcript before speech ends
+    LLM_SPECULATION_STABLE_MS: int = 300 # partial transcript unchanged this long before it is requested
 
     # OpenAI TTS Settings
     TTS_MODEL_NAME: str = "gpt-4o-mini-tts"
@@ -29,11 +48,128 @@ class Settings(BaseSettings):
     TTS_INSTRUCTIONS: str = "Speak in a cheerful and positive tone."
     TTS_RESPONSE_FORMAT: str = "pcm"
     TTS_CHUNK_SIZE: int = 1024
+    TTS_SAMPLE_RATE: int = 24000 # Hz, OpenAI PCM output (16-bit mono)
+    TTS_FRAME_MS: int = 40 # outbound audio is coalesced into frames of this length
+    TTS_SENTENCE_MIN_CHARS: int = 12 # shorter sentences are merged with the next
+    TTS_SEGMENTED: bool = True # split complete texts at sentences and synthesize them concurrently
+    TTS_SEGMENT_FANOUT: int = 3 # TTS requests in flight per reply; later sentences wait their turn
+    TTS_SEGMENT_GAP_MS: int = 0 # silence inserted between sentences (PCM only)
+
+    # TTS Audio Cache Settings (keyed by model, voice, instructions, format and text)
+    TTS_CACHE_ENABLED: bool = True
+    TTS_CACHE_MEMORY_BYTES: int = 64 * 1024 * 1024
+    TTS_CACHE_DISK_BYTES: int = 512 * 1024 * 1024 # 0 disables the on-disk tier
+    TTS_CACHE_MAX_ENTRY_BYTES: int = 4 * 1024 * 1024
+    TTS_CACHE_DIR: Path = Path(os.getenv("TTS_CACHE_DIR", "../tmp/tts_cache"))
+
+    # Canned Message Audio Settings (pre-rendered at startup)
+    CANNED_AUDIO_DIR: Path = Path(os.getenv("CANNED_AUDIO_DIR", "app/assets/canned")) # offline <key>.pcm files
+    CANNED_AUDIO_PRERENDER_TIMEOUT: float = 15.0 # seconds
+    CANNED_AUDIO_RETRY_SECONDS: float = 60.0
+
+    # Filler Audio Settings (masks a slow reply; clips are canned messages, PCM only)
+    FILLER_ENABLED: bool = True
+    FILLER_DELAY_MS: int = 1200 # end of the utterance until the filler starts if no reply audio was sent
+    FILLER_LEAD_MS: int = 80 # filler audio queued ahead of playback; the reply can cut in after this
+    FILLER_TEXTS: list[str] = ["うーんとね…", "えーっとね…", "そうだなあ…"]
 
     # Speech Recognition Settings
     SR_LANGUAGE: str = "ja-JP"
     SR_TIMEOUT: int = 5 # seconds
     SR_PHRASE_TIME_LIMIT: int = 8 # seconds
+    STT_BACKEND: str = os.getenv("STT_BACKEND", "google") # "google" (batch), "vosk" (offline, streaming) or "stub"
+    STT_VOSK_MODEL_PATH: Path = Path(os.getenv("STT_VOSK_MODEL_PATH", "models/vosk-model-small-ja-0.22"))
+    STT_STUB_TEXT: str = "なんでおそらはあおいの" # transcript of every utterance with the stub backend
+    STT_STUB_CHARS_PER_SECOND: float = 4.0 # growth of the stub's partial transcript per second of audio
+
+    # Audio Ingest Settings (PCM streamed from the browser over WebSocket)
+    AUDIO_INPUT_SAMPLE_RATE: int = 16000 # Hz, overridable per client by start_recording
+    AUDIO_INPUT_MIN_SAMPLE_RATE: int = 8000 # Hz; start_recording rates outside this range are refused
+    AUDIO_INPUT_MAX_SAMPLE_RATE: int = 96000
+    AUDIO_INPUT_SAMPLE_WIDTH: int = 2 # bytes per sample (Int16)
+    AUDIO_INGEST_MAX_SECONDS: int = 10 # seconds kept per utterance
+
+    # Input Conditioning Settings (ingested audio as handed to STT, see app/services/audio_conditioning.py)
+    AUDIO_CONDITIONING_ENABLED: bool = True
+    AUDIO_STT_SAMPLE_RATE: int = 16000 # Hz; input captured at higher rates is resampled to it
+    AUDIO_DC_SECONDS: float = 0.2 # time constant of the DC offset estimate
+    AUDIO_AGC_TARGET_PEAK: float = 0.5 # speech peak level, fraction of full scale
+    AUDIO_AGC_MAX_GAIN: float = 10.0 # +20dB at most for quiet voices
+    AUDIO_AGC_GATE: float = 0.02 # chunks peaking lower (fraction of full scale) keep the current gain
+    AUDIO_AGC_RELEASE_SECONDS: float = 1.0 # decay time constant of the tracked speech peak
+
+    # Voice Activity Detection / Endpointing Settings
+    # SR_TIMEOUT and SR_PHRASE_TIME_LIMIT remain the no-speech and max-length caps.
+    VAD_ENABLED: bool = True
+    VAD_FRAME_MS: int = 20
+    VAD_START_MS: int = 60 # consecutive speech before speech start
+    VAD_HANGOVER_MS: int = 500 # trailing silence that ends the utterance
+    VAD_ENERGY_RATIO: float = 4.0 # speech energy vs. noise floor
+    VAD_FRICATIVE_RATIO: float = 2.0 # lower ratio accepted for high-ZCR frames
+    VAD_FRICATIVE_ZCR: float = 0.3 # zero crossings per sample
+    VAD_MIN_ENERGY: float = 100.0 # noise floor lower bound (Int16 mean square)
+    VAD_NOISE_ALPHA: float = 0.05 # noise floor EMA coefficient per frame
+
+    # Blocking Call Offload Settings
+    OFFLOAD_MAX_WORKERS: int = 16 # threads shared by all blocking stages
+    STT_MAX_CONCURRENCY: int = 8 # concurrent listen/recognize_google calls (also the STT rate limiter's cap)
+    GC_FREEZE_AFTER_STARTUP: bool = True # keep startup objects out of full collections, which run on the event loop
+
+    # Provider Rate Limiting Settings (per worker process; size against the account quotas)
+    STT_RATE_PER_SECOND: float = 10.0
+    STT_BURST: int = 10
+    LLM_RATE_PER_SECOND: float = 10.0 # Gemini requests, including history summaries
+    LLM_BURST: int = 20
+    LLM_MAX_CONCURRENCY: int = 32
+    TTS_RATE_PER_SECOND: float = 20.0 # OpenAI TTS requests; one per reply sentence
+    TTS_BURST: int = 40
+    TTS_MAX_CONCURRENCY: int = 32
+    PROVIDER_MAX_QUEUE: int = 200 # waiting requests per provider; further ones are refused
+    PROVIDER_MAX_WAIT_SECONDS: float = 3.0 # refuse ("busy" reply) rather than wait longer
+
+    # Provider Call Resilience Settings (retries and hedges only happen before the first result)
+    STT_TIMEOUT_SECONDS: float = 8.0 # recognition of one utterance
+    LLM_TIMEOUT_SECONDS: float = 10.0 # until the first token, or the whole reply when not streaming
+    TTS_TIMEOUT_SECONDS: float = 5.0 # until the first audio byte
+    PROVIDER_STALL_SECONDS: float = 10.0 # longest gap between streamed tokens or audio chunks
+    PROVIDER_RETRIES: int = 1 # retries after a timeout, connection error or 5xx
+    PROVIDER_RETRY_BASE_SECONDS: float = 0.1 # retry n waits uniformly up to base * 2**(n - 1)
+    PROVIDER_RETRY_MAX_SECONDS: float = 1.0
+    STT_HEDGE_ENABLED: bool = False # each attempt holds a worker thread until Google answers
+    LLM_HEDGE_ENABLED: bool = True # send a second request when the first is slower than HEDGE_QUANTILE
+    TTS_HEDGE_ENABLED: bool = True
+    HEDGE_QUANTILE: float = 0.95 # of the last 200 times to first token/byte
+    HEDGE_MIN_SAMPLES: int = 50 # observed attempts before hedging starts
+    BREAKER_FAILURE_THRESHOLD: int = 5 # consecutive failures that open a provider's circuit
+    BREAKER_RESET_SECONDS: float = 10.0 # calls are refused ("busy" reply) this long before a trial call
+
+    # Outbound WebSocket Queue Settings (one writer task per connection)
+    SEND_QUEUE_MAX_BYTES: int = 1024 * 1024 # about 20s of 24kHz PCM queued per client
+    SEND_QUEUE_MAX_MESSAGES: int = 256 # further audio frames are coalesced
+    SEND_QUEUE_PUT_TIMEOUT: float = 0.5 # seconds an audio frame waits for space before it is dropped
+    SEND_TIMEOUT: float = 10.0 # seconds a single send may take
+    SEND_SLOW_CONSUMER_SECONDS: float = 5.0 # continuously over budget before disconnecting
+
+    # Session State Settings (shared by uvicorn workers)
+    SESSION_STORE: str = os.getenv("SESSION_STORE", "memory") # "memory" (single worker) or "sqlite"
+    SESSION_STORE_PATH: Path = Path(os.getenv("SESSION_STORE_PATH", "../tmp/sessions.sqlite3"))
+    UVICORN_WORKERS: int = int(os.getenv("UVICORN_WORKERS", "1")) # >1 disables reload; needs a shared store
+
+    # Session Registry Settings (histories held in memory by this process)
+    SESSION_IDLE_SECONDS: float = 10 * 60 # sessions without client activity are evicted and disconnected
+    SESSION_SWEEP_INTERVAL: float = 30.0 # seconds between idle sweeps
+    SESSION_MAX_BYTES: int = 64 * 1024 # per history; oldest turns are dropped beyond this
+    SESSIONS_MAX_BYTES: int = 256 * 1024 * 1024 # all histories; least recently active are evicted beyond this
+
+    # Conversation Persistence Settings (SQLite, write-behind; resumed on reconnect)
+    CONVERSATION_STORE_ENABLED: bool = True
+    CONVERSATION_STORE_PATH: Path = Path(os.getenv("CONVERSATION_STORE_PATH", "../tmp/conversations.sqlite3"))
+    CONVERSATION_FLUSH_INTERVAL: float = 0.5 # seconds between batched writes
+    CONVERSATION_BATCH_SIZE: int = 500 # pending writes that trigger an early flush
+    CONVERSATION_MAX_PENDING: int = 50000 # oldest pending writes are dropped beyond this
+    CONVERSATION_RESUME_SECONDS: int = 30 * 60 # idle conversations older than this start fresh
+    CONVERSATION_RETENTION_SECONDS: int = 7 * 24 * 60 * 60 # stored turns are purged after this
+    CONVERSATION_PURGE_INTERVAL: float = 60 * 60
 
     # Debug Settings
     DEBUG_MODE: bool = os.getenv("DEBUG_MODE", "false").lower() == "true"
@@ -1,20 +1,55 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 import uvicorn
 
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.services.offload import blocking_offloader
+from app.services.tts_cache import tts_cache
+from app.services.canned_audio import canned_responses
+from app.services.chat_service import chat_service
+from app.services.metrics import metrics_registry
+from app.services.session_store import session_store
+from app.services.conversation_store import conversation_store
+from app.services.session_registry import session_registry
+from app.utils.gc_utils import freeze_startup_objects
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks."""
+    logger.info(f"Session store: {session_store.name}")
+    if settings.UVICORN_WORKERS > 1 and session_store.name == "memory":
+        logger.warning("Multiple workers with the in-memory session store; sessions are not shared between workers.")
+    if settings.TTS_CACHE_ENABLED:
+        tts_cache.load()
+    if settings.CONVERSATION_STORE_ENABLED:
+        await conversation_store.start()
+    session_registry.start()
+    await canned_responses.prerender(chat_service.render_canned)
+    if settings.GC_FREEZE_AFTER_STARTUP:
+        freeze_startup_objects()
+    yield
+    await canned_responses.shutdown()
+    await session_registry.close()
+    await conversation_store.close()
+    blocking_offloader.shutdown()
+    session_store.close()
+
+
 app = FastAPI(
     title="Voice Chat API",
     description="API for real-time voice chat with LLM and TTS.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS Middleware
@@ -36,6 +71,14 @@ async def read_root():
     logger.info("Root endpoint '/' called.")
     return {"status": "ok", "message": "Welcome to Voice Chat API!"}
 
+
+@app.get("/metrics", tags=["Health Check"], response_class=PlainTextResponse)
+async def read_metrics():
+    """Pipeline latency histograms in the Prometheus text format."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     logger.info("Starting Uvicorn server...")
-    uvicorn.run("app.main:app", host="127.0.0.1", port=5000, reload=True)
\ No newline at end of file
+    # Reload only works with a single worker process
+    workers = settings.UVICORN_WORKERS
+    uvicorn.run("app.main:app", host="127.0.0.1", port=5000, reload=workers == 1, workers=workers)
\ No newline at end of file
@@ -0,0 +1,152 @@
+# app/services/answer_cache.py
+import hashlib
+import json
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict
+
+from app.core.config import settings, GENERATION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Katakana ァ (U+30A1) .. ヶ (U+30F6) map onto hiragana by a fixed offset.
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalizes recognized speech so that trivially different questions match.
+
+    Applies NFKC (full/half width folding), folds katakana to hiragana,
+    lowercases, and drops punctuation, symbols and whitespace.
+
+    Args:
+        text: The recognized text.
+
+    Returns:
+        The normalized text.
+    """
+    folded = unicodedata.normalize("NFKC", text).translate(_KATAKANA_TO_HIRAGANA).lower()
+    return "".join(
+        char for char in folded
+        if unicodedata.category(char)[0] not in ("P", "S", "Z", "C")
+    )
+
+
+class AnswerCache:
+    """TTL- and size-bounded cache of LLM answers keyed by normalized question.
+
+    The key also covers the persona prompt, model and generation config, so a
+    configuration change never serves a stale answer. Lookup and upstream
+    latencies are accumulated to compare hit and miss cost.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """
+        Initializes the cache.
+
+        Args:
+            max_entries: Maximum number of answers kept (LRU eviction).
+            ttl_seconds: Lifetime of an answer.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        """
+        Builds the cache key for a question.
+
+        Args:
+            text: The recognized text.
+
+        Returns:
+            A hex SHA-256 over the normalized text and the LLM configuration.
+        """
+        material = json.dumps(
+            [
+                normalize_question(text),
+                settings.LLM_PERSONA_PROMPT,
+                settings.GEMINI_MODEL_NAME,
+                GENERATION_CONFIG,
+            ],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns a cached answer that has not expired.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The answer, or None on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        answer, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return answer
+
+    def put(self, key: str, answer: str) -> None:
+        """
+        Stores an answer.
+
+        Args:
+            key: The cache key.
+            answer: The full LLM answer.
+        """
+        if not answer:
+            return
+        self._entries[key] = (answer, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def record_hit(self, seconds: float) -> None:
+        """Accounts the latency of a cache hit."""
+        self.hits += 1
+        self.hit_seconds += seconds
+
+    def record_miss(self, seconds: float) -> None:
+        """Accounts the latency of an upstream LLM call that missed the cache."""
+        self.misses += 1
+        self.miss_seconds += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns hit/miss counters and average latency for each.
+
+        Returns:
+            A JSON-serializable dict of counters.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avg_hit_ms": round(self.hit_seconds / self.hits * 1000, 3) if self.hits else 0.0,
+            "avg_miss_ms": round(self.miss_seconds / self.misses * 1000, 1) if self.misses else 0.0,
+        }
+
+
+# Single instance of the answer cache
+answer_cache = AnswerCache(
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+)
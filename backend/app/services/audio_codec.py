@@ -0,0 +1,267 @@
+# app/services/audio_codec.py
+import logging
+import math
+import struct
+from dataclasses import dataclass
+from typing import Dict
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Formats converted from the 16-bit PCM TTS output: bytes per sample and default rate
+TRANSCODED_FORMATS: Dict[str, tuple[int, int]] = {
+    "pcm": (2, 24000), # raw little-endian Int16
+    "wav": (2, 24000), # Int16 behind a streaming WAV header sent at the start of every reply
+    "ulaw": (1, 8000), # G.711 mu-law
+    "alaw": (1, 8000), # G.711 A-law
+}
+# Compressed formats requested from TTS as they are and passed straight through
+PASSTHROUGH_FORMATS = ("mp3", "opus", "aac")
+OUTPUT_SAMPLE_RATES = (8000, 16000, 24000)
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """Encoding of the reply audio sent to one client."""
+
+    name: str
+    sample_rate: int
+    sample_width: int # bytes per sample; 0 for formats passed through from TTS
+
+    @property
+    def passthrough(self) -> bool:
+        """Whether the TTS output is sent as it is (compressed formats)."""
+        return self.sample_width == 0
+
+    @property
+    def tts_format(self) -> str:
+        """The response_format to request from TTS."""
+        return self.name if self.passthrough else settings.TTS_RESPONSE_FORMAT
+
+    def frame_bytes(self, frame_ms: int) -> int | None:
+        """
+        Returns the size of frame_ms of audio, or None for compressed formats.
+
+        Args:
+            frame_ms: The frame length in milliseconds.
+        """
+        if self.passthrough:
+            return None
+        return self.sample_rate * self.sample_width * frame_ms // 1000
+
+
+def default_format() -> AudioFormat:
+    """Returns the format of clients that did not negotiate one: the TTS output as it is."""
+    if settings.TTS_RESPONSE_FORMAT != "pcm":
+        return AudioFormat(settings.TTS_RESPONSE_FORMAT, settings.TTS_SAMPLE_RATE, 0)
+    return AudioFormat("pcm", settings.TTS_SAMPLE_RATE, 2)
+
+
+def negotiate(offered: str | None, sample_rate: str | None = None) -> AudioFormat:
+    """
+    Picks the first supported format from a client's list of preferences.
+
+    Args:
+        offered: Comma-separated format names in order of preference, e.g.
+            "ulaw,pcm" (None or empty for the default).
+        sample_rate: Requested output rate for uncompressed formats; one of
+            OUTPUT_SAMPLE_RATES. Defaults per format.
+
+    Returns:
+        The chosen format; the default if none of the offered ones is
+        supported. Clients learn the choice from the audio_start message.
+    """
+    source_is_pcm = settings.TTS_RESPONSE_FORMAT == "pcm"
+    rate = int(sample_rate) if sample_rate and sample_rate.isdigit() else None
+    if rate is not None and (rate not in OUTPUT_SAMPLE_RATES or rate > settings.TTS_SAMPLE_RATE):
+        logger.warning(f"Unsupported output sample rate {rate}Hz requested; using the format's default")
+        rate = None
+    for name in (offered or "").lower().split(","):
+        name = name.strip()
+        if name in TRANSCODED_FORMATS and source_is_pcm:
+            width, default_rate = TRANSCODED_FORMATS[name]
+            return AudioFormat(name, rate or min(default_rate, settings.TTS_SAMPLE_RATE), width)
+        if name in PASSTHROUGH_FORMATS:
+            return AudioFormat(name, settings.TTS_SAMPLE_RATE, 0)
+    if offered:
+        logger.warning(f"None of the offered audio formats '{offered}' is supported; using the default")
+    return default_format()
+
+
+class StreamResampler:
+    """Rational-ratio polyphase resampler for a stream of Int16 samples.
+
+    With the ratio reduced to up/down, every down input samples yield up
+    output samples, each a windowed-sinc phase applied to a window of the
+    input. Such a period of outputs is one fixed (up x block) matrix applied
+    to a block of input, so a chunk is resampled as a single matrix product
+    of that matrix with all of its complete input blocks; inputs of an
+    incomplete period wait for the next chunk. A stream resampled in pieces
+    equals the stream resampled at once.
+    """
+
+    def __init__(self, rate_in: int, rate_out: int, taps: int = 16, dtype: type = np.float64):
+        """
+        Initializes the resampler.
+
+        Args:
+            rate_in: Input sample rate.
+            rate_out: Output sample rate.
+            taps: Filter length in units of the larger of the two ratio terms.
+            dtype: Float type the samples are resampled in.
+        """
+        divisor = math.gcd(rate_in, rate_out)
+        self.up = rate_out // divisor
+        self.down = rate_in // divisor
+        self.phase_taps = math.ceil(taps * max(self.up, self.down) / self.up)
+        length = self.phase_taps * self.up
+        # Windowed sinc at the upsampled rate, cut off just below the lower Nyquist frequency
+        cutoff = 0.45 / max(self.up, self.down)
+        n = np.arange(length) - (length - 1) / 2
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0)
+        kernel *= self.up / kernel.sum()
+        # phases[p, j] weighs input sample i - j for outputs at upsampled positions p (mod up)
+        phases = kernel.reshape(self.phase_taps, self.up).T
+        # Output m of a period reads phase_taps inputs from starts[m] of the period's block
+        outputs = np.arange(self.up)
+        starts = outputs * self.down // self.up
+        self.block = int(starts[-1]) + self.phase_taps
+        period = np.zeros((self.up, self.block))
+        for m, (start, phase) in enumerate(zip(starts, outputs * self.down % self.up)):
+            period[m, start:start + self.phase_taps] = phases[phase, ::-1]
+        self._period = np.ascontiguousarray(period.T, dtype=dtype)
+        self._history = np.zeros(self.phase_taps - 1, dtype)
+
+    def reset(self) -> None:
+        """Forgets the input history, to start a new stream."""
+        self._history = np.zeros_like(self._history)
+
+    @property
+    def tail(self) -> int:
+        """Zero samples to feed after the end of a stream to get all of its output."""
+        return self.phase_taps // 2 + self.down
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Resamples the next chunk of the stream.
+
+        Args:
+            samples: Input samples (any numeric dtype).
+
+        Returns:
+            The output samples that this chunk completes, in the resampler's dtype.
+        """
+        buffer = np.concatenate((self._history, samples))
+        periods = (len(buffer) - self.block) // self.down + 1 if len(buffer) >= self.block else 0
+        self._history = buffer[periods * self.down:]
+        if not periods:
+            return np.empty(0, self._history.dtype)
+        blocks = np.lib.stride_tricks.sliding_window_view(buffer, self.block)[::self.down][:periods]
+        # A contiguous copy lets the product run in BLAS
+        return (np.ascontiguousarray(blocks) @ self._period).ravel()
+
+
+def _g711_tables() -> tuple[np.ndarray, np.ndarray]:
+    """Builds mu-law and A-law encodings of every Int16 value (ITU-T G.711)."""
+    pcm = np.arange(-32768, 32768, dtype=np.int32)
+
+    value = pcm >> 2 # 14-bit
+    mask = np.where(value < 0, 0x7F, 0xFF)
+    value = np.minimum(np.abs(value), 8159) + (0x84 >> 2)
+    segment = np.searchsorted(np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]), value)
+    ulaw = np.where(
+        segment >= 8, 0x7F, (segment << 4) | ((value >> (np.minimum(segment, 7) + 1)) & 0xF)
+    ) ^ mask
+
+    value = pcm >> 3 # 13-bit
+    mask = np.where(value >= 0, 0xD5, 0x55)
+    value = np.where(value >= 0, value, -value - 1)
+    segment = np.searchsorted(np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF]), value)
+    shift = np.where(segment < 2, 1, np.minimum(segment, 7))
+    alaw = np.where(segment >= 8, 0x7F, (segment << 4) | ((value >> shift) & 0xF)) ^ mask
+
+    # Index by the sample's bit pattern read as uint16
+    order = pcm.astype(np.uint16).argsort()
+    return ulaw[order].astype(np.uint8), alaw[order].astype(np.uint8)
+
+
+ULAW_TABLE, ALAW_TABLE = _g711_tables()
+
+
+def wav_header(sample_rate: int) -> bytes:
+    """
+    Returns a WAV header for a 16-bit mono stream of unknown length.
+
+    The RIFF and data sizes are set to their maximum, which players treat as
+    "until the end of the stream".
+    """
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 0xFFFFFFFF, b"WAVE", b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16, b"data", 0xFFFFFFFF,
+    )
+
+
+class StreamEncoder:
+    """Converts one reply's 16-bit PCM TTS output to a client's format.
+
+    Keeps an odd trailing byte and the resampler state between chunks, so
+    chunk boundaries leave no trace in the output.
+    """
+
+    def __init__(self, audio_format: AudioFormat, source_rate: int):
+        """
+        Initializes the encoder for one reply.
+
+        Args:
+            audio_format: The negotiated format.
+            source_rate: Sample rate of the PCM fed to encode().
+        """
+        self.format = audio_format
+        self._carry = b""
+        self._resampler = None
+        if not audio_format.passthrough and audio_format.sample_rate != source_rate:
+            self._resampler = StreamResampler(source_rate, audio_format.sample_rate)
+        self._table = {"ulaw": ULAW_TABLE, "alaw": ALAW_TABLE}.get(audio_format.name)
+        self._header = wav_header(audio_format.sample_rate) if audio_format.name == "wav" else b""
+
+    def encode(self, chunk: bytes | memoryview) -> bytes | memoryview:
+        """
+        Converts the next chunk of the reply.
+
+        Args:
+            chunk: TTS output (16-bit PCM unless the format is passed through).
+
+        Returns:
+            The encoded audio, possibly empty; chunks passed through unchanged
+            are returned as they are.
+        """
+        header, self._header = self._header, b""
+        if self.format.passthrough or (self._resampler is None and self._table is None and not self._carry
+                                       and len(chunk) % 2 == 0):
+            return header + chunk if header else chunk
+        if self._carry or len(chunk) % 2:
+            data = self._carry + bytes(chunk)
+            self._carry = data[len(data) - len(data) % 2:]
+            chunk = data[:len(data) - len(self._carry)]
+        return header + self._convert(np.frombuffer(chunk, dtype="<i2"))
+
+    def flush(self) -> bytes:
+        """
+        Ends the reply.
+
+        Returns:
+            The last samples, held back by the resampler's filter delay.
+        """
+        if self._resampler is None:
+            return b""
+        return self._convert(np.zeros(self._resampler.tail, dtype="<i2"))
+
+    def _convert(self, samples: np.ndarray) -> bytes:
+        if self._resampler is not None:
+            samples = np.clip(np.rint(self._resampler.process(samples)), -32768, 32767).astype("<i2")
+        if self._table is not None:
+            return self._table[samples.view("<u2")].tobytes()
+        return samples.tobytes()
@@ -0,0 +1,107 @@
+# app/services/audio_conditioning.py
+import math
+from typing import Dict
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.audio_codec import StreamResampler
+
+FULL_SCALE = 32768
+
+
+class InputConditioner:
+    """Prepares a client's browser PCM for speech recognition, one utterance at a time.
+
+    Every chunk is processed as a whole with NumPy:
+    - resampled from the capture rate to the STT rate (lower rates are kept)
+    - DC offset removed: the offset is an exponential average of chunk means
+      with time constant AUDIO_DC_SECONDS, subtracted as a ramp from the
+      previous estimate to the new one
+    - brought to a steady level: the speech peak is tracked over chunks whose
+      peak passes AUDIO_AGC_GATE (quieter chunks keep the gain, so silence is
+      not amplified) and decays with AUDIO_AGC_RELEASE_SECONDS; the gain
+      toward AUDIO_AGC_TARGET_PEAK drops at once and rises as a ramp across
+      the chunk
+    The resampler history, offset and gain carry over between chunks, so
+    chunk boundaries leave no steps in the output.
+    """
+
+    def __init__(self, sample_rate: int, output_rate: int = settings.AUDIO_STT_SAMPLE_RATE):
+        """
+        Initializes the conditioner.
+
+        Args:
+            sample_rate: Sample rate of the incoming Int16 PCM.
+            output_rate: The STT sample rate; input at a lower rate is not upsampled.
+        """
+        self.output_rate = min(sample_rate, output_rate)
+        self._resampler = None
+        if self.output_rate != sample_rate:
+            self._resampler = StreamResampler(sample_rate, self.output_rate, dtype=np.float32)
+        self._offset: float | None = None
+        self._peak = 0.0
+        self.gain = 1.0
+        self._ramps: Dict[int, np.ndarray] = {} # by chunk length
+
+    def reset(self) -> None:
+        """Forgets the state of the previous utterance."""
+        if self._resampler is not None:
+            self._resampler.reset()
+        self._offset = None
+        self._peak = 0.0
+        self.gain = 1.0
+
+    def process(self, pcm: bytes | memoryview) -> bytes:
+        """
+        Conditions the next chunk of the utterance.
+
+        Args:
+            pcm: Little-endian Int16 PCM, a whole number of samples.
+
+        Returns:
+            The conditioned Int16 PCM at output_rate (possibly empty while the
+            resampler waits for more input).
+        """
+        samples = np.frombuffer(pcm, dtype="<i2")
+        if self._resampler is not None:
+            return self._condition(self._resampler.process(samples))
+        return self._condition(samples.astype(np.float32))
+
+    def flush(self) -> bytes:
+        """
+        Ends the utterance.
+
+        Returns:
+            The last conditioned samples, held back by the resampler's filter delay.
+        """
+        if self._resampler is None:
+            return b""
+        return self._condition(self._resampler.process(np.zeros(self._resampler.tail, np.float32)))
+
+    def _condition(self, samples: np.ndarray) -> bytes:
+        count = len(samples)
+        if not count:
+            return b""
+        seconds = count / self.output_rate
+        ramp = self._ramps.get(count)
+        if ramp is None:
+            ramp = self._ramps[count] = np.arange(1, count + 1, dtype=np.float32) / count
+
+        mean = float(samples.mean())
+        previous = mean if self._offset is None else self._offset
+        self._offset = previous + (mean - previous) * (1 - math.exp(-seconds / settings.AUDIO_DC_SECONDS))
+        samples = samples - (previous + (self._offset - previous) * ramp)
+
+        start = self.gain
+        self._peak *= math.exp(-seconds / settings.AUDIO_AGC_RELEASE_SECONDS)
+        peak = max(float(samples.max()), -float(samples.min())) / FULL_SCALE
+        if peak >= settings.AUDIO_AGC_GATE:
+            self._peak = max(self._peak, peak)
+            self.gain = min(settings.AUDIO_AGC_TARGET_PEAK / self._peak, settings.AUDIO_AGC_MAX_GAIN)
+            start = min(start, self.gain) # attack at once, release as a ramp
+        samples *= start + (self.gain - start) * ramp
+        np.rint(samples, out=samples)
+        if peak * max(start, self.gain) >= 1:
+            np.clip(samples, -FULL_SCALE, FULL_SCALE - 1, out=samples)
+        return samples.astype("<i2").tobytes()
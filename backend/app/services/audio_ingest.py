@@ -0,0 +1,350 @@
+# app/services/audio_ingest.py
+import speech_recognition as sr
+import logging
+import time
+import uuid
+from typing import Any, Dict
+
+from app.core.config import settings
+from app.services.audio_conditioning import InputConditioner
+from app.services.stt import STTStream
+from app.services.vad import StreamingEndpointer
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def valid_sample_rate(sample_rate: Any) -> bool:
+    """
+    Tells whether a sample rate reported by a client can be ingested.
+
+    Args:
+        sample_rate: The value from the client's start_recording message.
+
+    Returns:
+        True for an int from AUDIO_INPUT_MIN_SAMPLE_RATE to AUDIO_INPUT_MAX_SAMPLE_RATE.
+    """
+    return (
+        isinstance(sample_rate, int)
+        and not isinstance(sample_rate, bool)
+        and settings.AUDIO_INPUT_MIN_SAMPLE_RATE <= sample_rate <= settings.AUDIO_INPUT_MAX_SAMPLE_RATE
+    )
+
+
+class PCMRingBuffer:
+    """Fixed-capacity byte ring buffer for raw PCM frames.
+
+    The backing store is allocated once; incoming frames are copied into it
+    through a memoryview so that appending never reallocates or concatenates.
+    When the buffer is full, the oldest bytes are overwritten.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Initializes the ring buffer.
+
+        Args:
+            capacity: The buffer size in bytes.
+
+        Raises:
+            ValueError: If capacity is not positive.
+        """
+        if capacity <= 0:
+            raise ValueError(f"Ring buffer capacity must be positive: {capacity}")
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._capacity = capacity
+        self._write_pos = 0
+        self._size = 0
+        self.dropped_bytes = 0
+
+    @property
+    def capacity(self) -> int:
+        """The buffer size in bytes."""
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        """Discards all buffered data without releasing the backing store."""
+        self._write_pos = 0
+        self._size = 0
+        self.dropped_bytes = 0
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:
+        """
+        Appends data to the buffer, overwriting the oldest bytes when full.
+
+        Args:
+            data: A bytes-like object to append.
+        """
+        src = memoryview(data).cast("B")
+        length = len(src)
+        if length == 0:
+            return
+        if length >= self._capacity:
+            # Only the newest `capacity` bytes survive.
+            self.dropped_bytes += self._size + length - self._capacity
+            self._view[:] = src[length - self._capacity:]
+            self._write_pos = 0
+            self._size = self._capacity
+            return
+
+        overflow = self._size + length - self._capacity
+        if overflow > 0:
+            self.dropped_bytes += overflow
+
+        first = min(length, self._capacity - self._write_pos)
+        self._view[self._write_pos:self._write_pos + first] = src[:first]
+        if first < length:
+            self._view[:length - first] = src[first:]
+        self._write_pos = (self._write_pos + length) % self._capacity
+        self._size = min(self._size + length, self._capacity)
+
+    def read_all(self) -> bytes:
+        """
+        Returns the buffered data in arrival order as a single bytes object.
+
+        Returns:
+            The buffered bytes (oldest first).
+        """
+        start = (self._write_pos - self._size) % self._capacity
+        end = start + self._size
+        if end <= self._capacity:
+            return self._view[start:end].tobytes()
+        out = bytearray(self._size)
+        head = self._capacity - start
+        out[:head] = self._view[start:]
+        out[head:] = self._view[:end - self._capacity]
+        return bytes(out)
+
+
+class AudioIngestSession:
+    """Collects one client's browser-streamed PCM into utterances.
+
+    Unless AUDIO_CONDITIONING_ENABLED is off, the audio is conditioned for
+    STT (see InputConditioner) as it arrives, so the ring buffer holds it at
+    output_rate. The conditioned audio is also fed to the utterance's
+    transcription stream, if one is attached, so streaming STT backends
+    recognize while the child speaks. Endpointing runs on the audio as
+    captured.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        sample_rate: int = settings.AUDIO_INPUT_SAMPLE_RATE,
+        sample_width: int = settings.AUDIO_INPUT_SAMPLE_WIDTH,
+        max_seconds: float = settings.AUDIO_INGEST_MAX_SECONDS,
+    ):
+        """
+        Initializes the ingest session.
+
+        Args:
+            client_id: The client identifier.
+            sample_rate: The sample rate of the incoming PCM in Hz.
+            sample_width: Bytes per sample (2 for Int16).
+            max_seconds: Maximum utterance length kept in the ring buffer.
+        """
+        self.client_id = client_id
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.recording = False
+        self.trace_id: str | None = None
+        self.started_at = 0.0
+        self.conditioner = InputConditioner(sample_rate) if settings.AUDIO_CONDITIONING_ENABLED else None
+        self.transcription: STTStream | None = None
+        self._ring = PCMRingBuffer(int(self.output_rate * sample_width * max_seconds))
+        self._carry = b""
+        self.endpointer = StreamingEndpointer(sample_rate) if settings.VAD_ENABLED else None
+
+    @property
+    def output_rate(self) -> int:
+        """Sample rate of the buffered audio handed to STT."""
+        return self.conditioner.output_rate if self.conditioner is not None else self.sample_rate
+
+    @property
+    def buffered_seconds(self) -> float:
+        """Length of the currently buffered audio in seconds."""
+        return len(self._ring) / (self.output_rate * self.sample_width)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the ring buffer, which is allocated up front."""
+        return self._ring.capacity + len(self._carry)
+
+    def start(self, sample_rate: int | None = None, trace_id: str | None = None) -> None:
+        """
+        Starts a new utterance, discarding any previously buffered audio.
+
+        A transcription stream still attached from the previous utterance is
+        closed; attach() one for the new utterance afterwards, at output_rate.
+
+        Args:
+            sample_rate: Optional sample rate reported by the client. The ring
+                buffer is only reallocated if the new rate needs more room.
+            trace_id: Optional client-supplied id of the turn; one is generated
+                if omitted.
+
+        Raises:
+            ValueError: If sample_rate is not a valid_sample_rate(); the
+                session is left unchanged.
+        """
+        if sample_rate is not None and not valid_sample_rate(sample_rate):
+            raise ValueError(f"Unsupported input sample rate: {sample_rate!r}")
+        self.close_transcription()
+        if sample_rate and sample_rate != self.sample_rate:
+            self.sample_rate = sample_rate
+            if self.conditioner is not None:
+                self.conditioner = InputConditioner(sample_rate)
+            needed = int(self.output_rate * self.sample_width * settings.AUDIO_INGEST_MAX_SECONDS)
+            if needed > self._ring.capacity:
+                self._ring = PCMRingBuffer(needed)
+            if self.endpointer is not None:
+                self.endpointer = StreamingEndpointer(sample_rate)
+            logger.info(f"Input sample rate for {self.client_id} set to {sample_rate}Hz")
+        self._ring.clear()
+        self._carry = b""
+        if self.conditioner is not None:
+            self.conditioner.reset()
+        if self.endpointer is not None:
+            self.endpointer.reset()
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.started_at = time.perf_counter()
+        self.recording = True
+
+    def feed(self, data: bytes | memoryview) -> str | None:
+        """
+        Appends a binary frame received from the client and runs endpointing on it.
+
+        Frames received while not recording are ignored. A trailing partial
+        sample is carried over to the next frame so samples stay aligned.
+
+        Args:
+            data: Raw little-endian PCM bytes (a view into a received frame is
+                not copied unless it is conditioned).
+
+        Returns:
+            The endpointer event for this frame (see app.services.vad), or None.
+        """
+        if not self.recording:
+            return None
+        if self._carry:
+            data = self._carry + data
+            self._carry = b""
+        remainder = len(data) % self.sample_width
+        if remainder:
+            self._carry = bytes(data[-remainder:])
+            data = memoryview(data)[:-remainder]
+        conditioned = self.conditioner.process(data) if self.conditioner is not None else data
+        self._ring.write(conditioned)
+        if self.transcription is not None and conditioned:
+            self.transcription.feed(conditioned)
+        if self.endpointer is not None:
+            return self.endpointer.process(data)
+        return None
+
+    def finish(self) -> sr.AudioData | None:
+        """
+        Ends the current utterance.
+
+        Returns:
+            The buffered audio as AudioData, or None if nothing was captured.
+        """
+        was_recording, self.recording = self.recording, False
+        self._carry = b""
+        if was_recording and self.conditioner is not None:
+            tail = self.conditioner.flush()
+            self._ring.write(tail)
+            if self.transcription is not None and tail:
+                self.transcription.feed(tail)
+        if not len(self._ring):
+            return None
+        if was_recording:
+            metrics.LISTEN_SECONDS.observe(time.perf_counter() - self.started_at)
+        if self._ring.dropped_bytes:
+            logger.warning(
+                f"Utterance for {self.client_id} exceeded {settings.AUDIO_INGEST_MAX_SECONDS}s; "
+                f"dropped {self._ring.dropped_bytes} oldest bytes."
+            )
+        frame_data = self._ring.read_all()
+        self._ring.clear()
+        conditioned = (
+            f" (conditioned to {self.output_rate}Hz, gain {self.conditioner.gain:.1f})" if self.conditioner else ""
+        )
+        logger.info(f"Captured {len(frame_data)} bytes of audio from {self.client_id}{conditioned}")
+        return sr.AudioData(frame_data, self.output_rate, self.sample_width)
+
+    def attach(self, transcription: STTStream) -> None:
+        """
+        Feeds the current utterance to a transcription stream from now on.
+
+        Args:
+            transcription: A stream opened at output_rate.
+        """
+        self.close_transcription()
+        self.transcription = transcription
+
+    def take_transcription(self) -> STTStream | None:
+        """
+        Detaches the transcription stream, handing it to whoever waits for the transcript.
+
+        Returns:
+            The stream, or None if none was attached.
+        """
+        transcription, self.transcription = self.transcription, None
+        return transcription
+
+    def close_transcription(self) -> None:
+        """Closes the attached transcription stream, if any (discarded utterance)."""
+        transcription = self.take_transcription()
+        if transcription is not None:
+            transcription.close()
+
+
+class AudioIngestManager:
+    """Keeps one AudioIngestSession per connected client."""
+
+    def __init__(self):
+        self.sessions: Dict[str, AudioIngestSession] = {}
+
+    def get(self, client_id: str) -> AudioIngestSession:
+        """
+        Returns the client's ingest session, creating it if needed.
+
+        Args:
+            client_id: The client identifier.
+
+        Returns:
+            The client's AudioIngestSession.
+        """
+        session = self.sessions.get(client_id)
+        if session is None:
+            session = AudioIngestSession(client_id)
+            self.sessions[client_id] = session
+        return session
+
+    def remove(self, client_id: str) -> None:
+        """
+        Drops the client's ingest session.
+
+        Args:
+            client_id: The client identifier.
+        """
+        session = self.sessions.pop(client_id, None)
+        if session is not None:
+            session.close_transcription()
+
+    def nbytes(self) -> int:
+        """
+        Returns the memory held by all ingest buffers.
+
+        Returns:
+            The total size in bytes.
+        """
+        return sum(session.nbytes for session in self.sessions.values())
+
+
+# Single instance of the ingest manager
+audio_ingest = AudioIngestManager()
@@ -0,0 +1,163 @@
+# app/services/canned_audio.py
+import asyncio
+import logging
+from pathlib import Path
+from typing import Awaitable, Callable, Dict
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Renderer = Callable[[str], Awaitable[bytes]]
+
+
+class CannedResponseRegistry:
+    """Fixed system messages and their pre-rendered audio.
+
+    Messages are registered by key at import time. prerender() renders every
+    registered message once at startup; messages registered afterwards are
+    rendered in the background as soon as they are added. When TTS is not
+    reachable, audio is loaded from CANNED_AUDIO_DIR/<key>.pcm if present and
+    rendering is retried periodically; until then callers fall back to text.
+    """
+
+    def __init__(self, offline_dir: Path | None = None):
+        """
+        Initializes the registry.
+
+        Args:
+            offline_dir: Directory of bundled <key>.pcm files used when TTS
+                is unavailable.
+        """
+        self.offline_dir = offline_dir
+        self._texts: Dict[str, str] = {}
+        self._audio: Dict[str, bytes] = {}
+        self._renderer: Renderer | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def register(self, key: str, text: str) -> str:
+        """
+        Adds a canned message.
+
+        Args:
+            key: A stable identifier for the message.
+            text: The message text.
+
+        Returns:
+            The key, so registrations can be assigned to module constants.
+        """
+        if self._texts.get(key) != text:
+            self._texts[key] = text
+            self._audio.pop(key, None)
+            if self._renderer is not None:
+                self._spawn(self._render_keys([key]))
+        return key
+
+    def text(self, key: str) -> str:
+        """
+        Returns the text of a canned message.
+
+        Args:
+            key: The message key.
+
+        Returns:
+            The registered text.
+        """
+        return self._texts[key]
+
+    def audio(self, key: str) -> bytes | None:
+        """
+        Returns the pre-rendered audio of a canned message.
+
+        Args:
+            key: The message key.
+
+        Returns:
+            The PCM audio, or None if it has not been rendered.
+        """
+        return self._audio.get(key)
+
+    def keys(self) -> list[str]:
+        """Returns every registered key."""
+        return list(self._texts)
+
+    def missing(self) -> list[str]:
+        """Returns the keys that have no audio yet."""
+        return [key for key in self._texts if key not in self._audio]
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _render_keys(self, keys: list[str]) -> None:
+        async def render(key: str) -> None:
+            try:
+                self._audio[key] = await self._renderer(self._texts[key])
+            except Exception as e:
+                logger.warning(f"Could not pre-render canned message '{key}': {e}")
+
+        await asyncio.gather(*(render(key) for key in keys))
+
+    def _load_offline(self, keys: list[str]) -> None:
+        if self.offline_dir is None:
+            return
+        for key in keys:
+            path = self.offline_dir / f"{key}.pcm"
+            if key not in self._audio and path.is_file():
+                self._audio[key] = path.read_bytes()
+                logger.info(f"Loaded offline audio for canned message '{key}' from {path}")
+
+    async def _retry_missing(self) -> None:
+        while self.missing():
+            await asyncio.sleep(settings.CANNED_AUDIO_RETRY_SECONDS)
+            await self._render_keys(self.missing())
+        logger.info("All canned messages are pre-rendered.")
+
+    async def prerender(self, renderer: Renderer) -> None:
+        """
+        Renders every registered message and keeps the audio in memory.
+
+        Args:
+            renderer: Coroutine function that synthesizes text to audio.
+        """
+        self._renderer = renderer
+        keys = self.missing()
+        try:
+            await asyncio.wait_for(self._render_keys(keys), timeout=settings.CANNED_AUDIO_PRERENDER_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Pre-rendering canned messages timed out after {settings.CANNED_AUDIO_PRERENDER_TIMEOUT}s")
+        missing = self.missing()
+        if missing:
+            self._load_offline(missing)
+            missing = self.missing()
+        if missing:
+            logger.warning(f"Canned messages without audio (text fallback): {missing}")
+            self._spawn(self._retry_missing())
+        logger.info(f"Pre-rendered {len(self._audio)}/{len(self._texts)} canned messages.")
+
+    async def shutdown(self) -> None:
+        """Cancels background rendering."""
+        self._renderer = None
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Single instance of the registry
+canned_responses = CannedResponseRegistry(offline_dir=settings.CANNED_AUDIO_DIR)
+
+# Messages sent by the WebSocket endpoint
+NOT_UNDERSTOOD = canned_responses.register("not_understood", "ごめんなさい、よく聞き取れませんでした。")
+LISTEN_TIMEOUT = canned_responses.register("listen_timeout", "...")
+STT_ERROR = canned_responses.register("stt_error", "音声認識サービスでエラーが発生しました。")
+PROCESSING_ERROR = canned_responses.register("processing_error", "処理中にエラーが発生しました。")
+UNKNOWN_COMMAND = canned_responses.register("unknown_command", "不明なコマンドです。")
+INVALID_MESSAGE = canned_responses.register("invalid_message", "無効なメッセージ形式です。")
+MESSAGE_ERROR = canned_responses.register("message_error", "メッセージ処理中にエラーが発生しました。")
+INTERNAL_ERROR = canned_responses.register("internal_error", "サーバー内部で予期せぬエラーが発生しました。")
+BUSY = canned_responses.register("busy", "ただいま混み合っています。少し待ってから、もう一度話しかけてください。")
+
+# Clips played while a slow reply is on its way (see app.services.filler)
+FILLERS = tuple(canned_responses.register(f"filler_{index}", text) for index, text in enumerate(settings.FILLER_TEXTS))
@@ -1,17 +1,34 @@
 # app/services/chat_service.py
 import speech_recognition as sr
 import google.generativeai as genai
-from openai import AsyncOpenAI
-import pyaudio
+from google.api_core.exceptions import TooManyRequests
+from openai import AsyncOpenAI, RateLimitError
 import logging
 import time
 import asyncio
-from typing import Dict, List, Tuple
+from typing import AsyncIterator, Deque, Dict, List, Tuple
 from pathlib import Path
+from collections import deque
 import datetime
+import uuid
 
 from app.core.config import settings, SAFETY_SETTINGS, GENERATION_CONFIG
 from app.utils.file_utils import ensure_directory_exists
+from app.utils.text_utils import SentenceChunker, split_sentences
+from app.services.offload import BlockingOffloader, blocking_offloader
+from app.services.tts_cache import TTSCache, tts_cache, tts_cache_key
+from app.services.answer_cache import AnswerCache, answer_cache
+from app.services.history import ConversationHistory, MODEL, USER
+from app.services import metrics
+from app.services.session_store import SessionStore, session_store
+from app.services.conversation_store import ConversationStore, conversation_store
+from app.services.session_registry import SessionRegistry, session_registry
+from app.services.provider_scheduler import (
+    LLM, STT, SYSTEM_CLIENT, TTS, ProviderBusy, ProviderScheduler, provider_scheduler,
+)
+from app.services.resilience import ProviderResilience, ProviderTimeout, provider_resilience
+from app.services.stt import STTBackend, STTStream, stt_backend
+from app.services.speculation import SpeculativeReply, Speculator
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +36,32 @@ logger = logging.getLogger(__name__)
 class ChatService:
     """Handles speech recognition, LLM interaction, and TTS."""
 
-    def __init__(self):
-        """Initializes API clients and recognizer."""
+    def __init__(
+        self,
+        offloader: BlockingOffloader = blocking_offloader,
+        audio_cache: TTSCache = tts_cache,
+        llm_answer_cache: AnswerCache = answer_cache,
+        store: SessionStore = session_store,
+        conversations_db: ConversationStore = conversation_store,
+        sessions: SessionRegistry = session_registry,
+        scheduler: ProviderScheduler = provider_scheduler,
+        resilience: ProviderResilience = provider_resilience,
+        stt: STTBackend = stt_backend,
+    ):
+        """
+        Initializes API clients and recognizer.
+
+        Args:
+            offloader: Thread pool used for blocking speech recognition calls.
+            audio_cache: Cache of synthesized speech.
+            llm_answer_cache: Cache of LLM answers keyed by normalized question.
+            store: Session state shared by worker processes.
+            conversations_db: Durable history, resumed when a client reconnects.
+            sessions: In-memory histories with memory budgets and idle eviction.
+            scheduler: Rate limits and fair queueing in front of STT, LLM and TTS.
+            resilience: Timeouts, retries, hedging and circuit breakers around provider calls.
+            stt: Speech recognition backend of captured utterances.
+        """
         # Configure Gemini
         if not settings.GOOGLE_API_KEY:
             logger.warning("GOOGLE_API_KEY not found in environment variables.")
@@ -29,35 +70,145 @@ class ChatService:
             model_name=settings.GEMINI_MODEL_NAME,
             generation_config=GENERATION_CONFIG,
             safety_settings=SAFETY_SETTINGS,
+            system_instruction=settings.LLM_PERSONA_PROMPT,
+        )
+        # Separate model without the persona, used to fold old turns into a summary
+        self.summary_model = genai.GenerativeModel(
+            model_name=settings.GEMINI_MODEL_NAME,
+            safety_settings=SAFETY_SETTINGS,
         )
         logger.info(f"Gemini model '{settings.GEMINI_MODEL_NAME}' initialized.")
+        self.answer_cache = llm_answer_cache
 
         # Configure OpenAI
         if not settings.OPENAI_API_KEY:
             logger.warning("OPENAI_API_KEY not found in environment variables.")
         self.openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         logger.info(f"OpenAI client initialized for TTS model '{settings.TTS_MODEL_NAME}'.")
+        self.tts_cache = audio_cache
 
-        # Configure Speech Recognition
+        # Configure Speech Recognition (the recognizer listens to local sources)
         self.recognizer = sr.Recognizer()
-        logger.info("Speech Recognizer initialized.")
+        self.stt = stt
+        logger.info(f"Speech Recognizer initialized; STT backend '{stt.name}'.")
+        self.offloader = offloader
+        self.scheduler = scheduler
+        self.resilience = resilience
 
-        # Configure PyAudio (for TTS, only need settings here)
-        self._pyaudio_instance = pyaudio.PyAudio()
-        logger.info("PyAudio instance created.")
+        # Conversation histories of the clients connected to this process;
+        # the session store holds the copy other workers can resume from
+        self.sessions = sessions
+        self._compaction_tasks: Dict[str, asyncio.Task] = {}
+        self.store = store
+        self.conversation_store = conversations_db
+        self._owners: Dict[str, str] = {}
+        # Speculative replies of the utterances being captured, by client
+        self._speculators: Dict[str, Speculator] = {}
 
-        # In-memory conversation history store
-        self.conversations: Dict[str, List[Dict]] = {}
-
-    def initialize_conversation(self, client_id: str):
+    def initialize_conversation(self, client_id: str) -> ConversationHistory:
         """
         Initializes or resets the conversation history for a client.
 
+        The client's stored conversation is deleted too, so a later resume
+        cannot mix the previous conversation into the new one.
+
         Args:
             client_id: The unique identifier for the client.
+
+        Returns:
+            The new history.
         """
-        self.conversations[client_id] = []
+        history = self.sessions.create(client_id)
+        self.conversation_store.record_reset(client_id)
         logger.info(f"Initialized conversation history for client: {client_id}")
+        return history
+
+    def _history(self, client_id: str) -> ConversationHistory:
+        """
+        Returns the history a request of a client should use.
+
+        A connected client whose history was evicted starts a new one. Requests
+        finishing after the client disconnected get a detached history, so they
+        cannot re-register a session nobody will close.
+
+        Args:
+            client_id: The client identifier.
+
+        Returns:
+            The client's history.
+        """
+        history = self.sessions.get(client_id)
+        if history is not None:
+            return history
+        if client_id in self._owners:
+            return self.initialize_conversation(client_id)
+        logger.info(f"No session for {client_id}; answering without history")
+        return ConversationHistory(settings.HISTORY_CHAR_BUDGET, settings.HISTORY_SUMMARY_MAX_CHARS)
+
+    async def open_session(self, client_id: str) -> str:
+        """
+        Claims a client's session in the shared store and loads its history.
+
+        Args:
+            client_id: The unique identifier for the client.
+
+        Returns:
+            The owner token of this connection, to pass to close_session().
+        """
+        owner = uuid.uuid4().hex
+        self._owners[client_id] = owner
+        source = self.store.name
+        try:
+            state = await self.store.claim(client_id, owner)
+            if state is None:
+                # Reconnect after the previous connection was closed
+                state = await self.conversation_store.load(client_id)
+                source = "conversation"
+        except Exception as e:
+            logger.error(f"Failed to load session for {client_id}; starting a new history: {e}")
+            state = None
+        if state is None:
+            self.initialize_conversation(client_id)
+            return owner
+        self.sessions.create(client_id, state)
+        logger.info(f"Resumed conversation for client {client_id} from the {source} store ({len(state['turns'])} turns)")
+        return owner
+
+    async def save_session(self, client_id: str) -> None:
+        """
+        Writes a client's history to the shared store.
+
+        Args:
+            client_id: The unique identifier for the client.
+        """
+        history = self.sessions.get(client_id)
+        owner = self._owners.get(client_id)
+        if history is None or owner is None:
+            return
+        try:
+            if not await self.store.save(client_id, owner, history.to_dict()):
+                logger.info(f"Session for {client_id} was claimed by another connection; not saved")
+        except Exception as e:
+            logger.error(f"Failed to save session for {client_id}: {e}")
+
+    async def close_session(self, client_id: str, owner: str) -> None:
+        """
+        Releases a client's session in the shared store and clears its history.
+
+        Nothing is cleared if a newer connection of the same client has
+        claimed the session since.
+
+        Args:
+            client_id: The unique identifier for the client.
+            owner: The token returned by open_session().
+        """
+        if self._owners.get(client_id) == owner:
+            del self._owners[client_id]
+            self.clear_conversation(client_id)
+        try:
+            await self.store.release(client_id, owner)
+        except Exception as e:
+            logger.error(f"Failed to release session for {client_id}: {e}")
 
     def clear_conversation(self, client_id: str):
         """
@@ -66,8 +217,10 @@ class ChatService:
         Args:
             client_id: The unique identifier for the client.
         """
-        if client_id in self.conversations:
-            del self.conversations[client_id]
+        task = self._compaction_tasks.pop(client_id, None)
+        if task is not None:
+            task.cancel()
+        if self.sessions.remove(client_id):
             logger.info(f"Cleared conversation history for client: {client_id}")
 
     def _save_debug_audio(self, audio_data: sr.AudioData, client_id: str) -> None:
@@ -104,7 +257,9 @@ class ChatService:
         """
         logger.info(f"Listening for audio... (Timeout: {settings.SR_TIMEOUT}s, Limit: {settings.SR_PHRASE_TIME_LIMIT}s)")
         try:
-            audio = self.recognizer.listen(
+            audio = await self.offloader.run(
+                "stt",
+                self.recognizer.listen,
                 source,
                 timeout=settings.SR_TIMEOUT,
                 phrase_time_limit=settings.SR_PHRASE_TIME_LIMIT
@@ -118,10 +273,61 @@ class ChatService:
             logger.error(f"Could not request results from speech recognition service; {e}")
             raise
 
+    def open_transcription(self, client_id: str, sample_rate: int) -> STTStream:
+        """
+        Starts transcribing an utterance as it is captured.
+
+        When LLM_SPECULATION_ENABLED and the backend streams partial
+        transcripts, the reply is requested as soon as a partial transcript
+        has been stable for LLM_SPECULATION_STABLE_MS; the LLM call of the
+        turn adopts it if the final transcript matches.
+
+        Args:
+            client_id: The client identifier.
+            sample_rate: Sample rate of the PCM that will be fed to the stream.
+
+        Returns:
+            The stream to feed; pass it to process_audio_to_text at the end of the utterance.
+        """
+        transcription = self.stt.open(client_id, sample_rate)
+        if settings.LLM_SPECULATION_ENABLED and self.stt.streaming:
+            previous = self._speculators.pop(client_id, None)
+            if previous is not None:
+                previous.close()
+            speculator = Speculator(
+                transcription,
+                lambda text: self._speculate(text, client_id),
+                settings.LLM_SPECULATION_STABLE_MS / 1000,
+            )
+            self._speculators[client_id] = speculator
+
+            def forget() -> None:
+                if self._speculators.get(client_id) is speculator:
+                    del self._speculators[client_id]
+
+            transcription.close_callbacks.append(forget)
+        return transcription
+
+    async def _recognize_attempt(self, audio_data: sr.AudioData, client_id: str, transcription: STTStream) -> str:
+        """
+        Waits for the final transcript, holding an STT rate limiter slot.
+
+        Args:
+            audio_data: The audio data to process.
+            client_id: The client identifier.
+            transcription: The utterance's transcription stream.
+
+        Returns:
+            The recognized text.
+        """
+        async with self.scheduler.slot(STT, client_id):
+            return await transcription.finish(audio_data)
+
     async def process_audio_to_text(
         self,
         audio_data: sr.AudioData,
-        client_id: str
+        client_id: str,
+        transcription: STTStream | None = None,
     ) -> str | None:
         """
         Processes audio data to text using Speech Recognition and handles debug saving.
@@ -129,31 +335,174 @@ class ChatService:
         Args:
             audio_data: The audio data to process.
             client_id: The client identifier.
+            transcription: The stream the utterance was fed to while it was
+                captured (see open_transcription); the caller closes it.
+                Without one, the whole utterance is recognized now.
 
         Returns:
             The recognized text, or None if recognition fails.
 
         Raises:
-            sr.RequestError: Forwarded from recognize_google.
+            sr.RequestError: Forwarded from the STT backend, also raised when recognition timed out.
+            ProviderBusy: If STT is saturated, rate limited us or its circuit is open.
         """
-        try:
-            # Save audio if in debug mode BEFORE attempting recognition
-            self._save_debug_audio(audio_data, client_id)
+        start_time = time.perf_counter()
+        if settings.DEBUG_MODE:
+            await self.offloader.run("stt", self._save_debug_audio, audio_data, client_id)
+        owned: List[STTStream] = [] # streams opened here, closed when done
+        if transcription is None:
+            transcription = self.stt.open(client_id, audio_data.sample_rate)
+            owned.append(transcription)
+        streams = [transcription]
+
+        async def attempt() -> str:
+            # A stream recognizes once; retry a failed recognition on a fresh stream fed the whole utterance
+            if streams[-1].failed:
+                streams.append(self.stt.open(client_id, audio_data.sample_rate))
+                owned.append(streams[-1])
+            return await self._recognize_attempt(audio_data, client_id, streams[-1])
 
-            text = self.recognizer.recognize_google(audio_data, language=settings.SR_LANGUAGE)
+        try:
+            text = await self.resilience.call(STT, attempt)
+            metrics.STT_SECONDS.observe(time.perf_counter() - start_time)
             logger.info(f"Recognized text for {client_id}: {text}")
             return text
         except sr.UnknownValueError:
+            metrics.STT_SECONDS.observe(time.perf_counter() - start_time)
             logger.warning(f"Speech Recognition could not understand audio for client {client_id}.")
             return None
+        except ProviderTimeout as e:
+            logger.error(f"Speech recognition timed out for client {client_id}; {e}")
+            raise sr.RequestError(str(e)) from e
         except sr.RequestError as e:
-            logger.error(f"Could not request results from Google Speech Recognition service for client {client_id}; {e}")
+            logger.error(f"Could not request results from the {self.stt.name} STT backend for client {client_id}; {e}")
+            if "Too Many Requests" in str(e):
+                self.scheduler.penalize(STT)
+                raise ProviderBusy(STT, "rate limited by the provider") from e
             raise # Re-raise to be handled by the endpoint
+        finally:
+            for stream in owned:
+                stream.close()
+
+    def _answer_cache_key(self, text: str, history: ConversationHistory) -> str | None:
+        """
+        Returns the answer cache key for a question, or None if the cache must not be used.
+
+        Args:
+            text: The user's input text.
+            history: The client's history.
+
+        Returns:
+            The cache key, or None when caching is disabled or the conversation
+            already has history and ANSWER_CACHE_WITH_HISTORY is off.
+        """
+        if not settings.ANSWER_CACHE_ENABLED:
+            return None
+        if history and not settings.ANSWER_CACHE_WITH_HISTORY:
+            return None
+        return self.answer_cache.make_key(text)
+
+    def _use_cached_answer(
+        self, cache_key: str | None, text: str, client_id: str, history: ConversationHistory
+    ) -> str | None:
+        """
+        Looks up a cached answer and records the turn in the history on a hit.
+
+        Args:
+            cache_key: The answer cache key, or None.
+            text: The user's input text.
+            client_id: The client identifier.
+            history: The client's history.
+
+        Returns:
+            The cached answer, or None on a miss.
+        """
+        if cache_key is None:
+            return None
+        start_time = time.perf_counter()
+        answer = self.answer_cache.get(cache_key)
+        if answer is None:
+            return None
+        history.append(USER, text)
+        history.append(MODEL, answer)
+        self._persist_exchange(client_id, text, answer)
+        elapsed = time.perf_counter() - start_time
+        self.answer_cache.record_hit(elapsed)
+        logger.info(f"Answer cache hit for {client_id} in {elapsed * 1000:.2f}ms: {answer}")
+        return answer
+
+    def _persist_exchange(self, client_id: str, text: str, answer: str) -> None:
+        """
+        Queues an answered question for durable storage; failed turns are never stored.
+
+        Also updates the client's memory accounting, which may drop old turns.
+
+        Args:
+            client_id: The client identifier.
+            text: The user's input text.
+            answer: The model's answer.
+        """
+        self.conversation_store.record_turn(client_id, USER, text)
+        self.conversation_store.record_turn(client_id, MODEL, answer)
+        self._account_history(client_id)
+
+    def _account_history(self, client_id: str) -> None:
+        """
+        Updates the memory accounting of a client's changed history.
+
+        Args:
+            client_id: The client identifier.
+        """
+        dropped = self.sessions.account(client_id)
+        if dropped:
+            # Keep the stored turns in step with the history, as compaction does
+            self.conversation_store.record_summary(client_id, self.sessions.get(client_id).summary, dropped)
+
+    def _speculate(self, text: str, client_id: str) -> SpeculativeReply | None:
+        """
+        Requests the reply to a partial transcript ahead of the final one.
+
+        Args:
+            text: The stable partial transcript.
+            client_id: The client identifier.
+
+        Returns:
+            The speculative reply, or None if the answer cache will answer the question.
+        """
+        history = self._history(client_id)
+        cache_key = self._answer_cache_key(text, history)
+        if cache_key is not None and self.answer_cache.get(cache_key) is not None:
+            return None
+        contents = history.to_contents()
+        logger.info(f"Speculative LLM request for {client_id}: {text}")
+        pieces = self.resilience.stream(LLM, lambda: self._stream_llm_attempt(contents, text, client_id))
+        return SpeculativeReply(text, history, contents, pieces)
+
+    def _take_speculation(self, text: str, client_id: str, history: ConversationHistory) -> SpeculativeReply | None:
+        """
+        Ends speculation on the client's utterance.
+
+        Args:
+            text: The final transcript.
+            client_id: The client identifier.
+            history: The client's history.
+
+        Returns:
+            The speculative reply that answers text, or None (a reply in
+            flight that does not is discarded).
+        """
+        speculator = self._speculators.pop(client_id, None)
+        if speculator is None:
+            return None
+        return speculator.take(text, history)
 
     async def get_llm_response(self, text: str, client_id: str) -> str:
         """
         Gets a response from the configured LLM (Gemini).
 
+        A reply requested speculatively during the utterance (see
+        open_transcription) is used if it answers text.
+
         Args:
             text: The user's input text.
             client_id: The client identifier for managing conversation history.
@@ -162,71 +511,590 @@ class ChatService:
             The LLM's response text.
 
         Raises:
+            ProviderBusy: If the LLM is saturated, rate limited us or its circuit is open.
             Exception: If the LLM API call fails.
         """
-        if client_id not in self.conversations:
-            self.initialize_conversation(client_id) # Ensure history exists
+        history = self._history(client_id)
+        cache_key = self._answer_cache_key(text, history)
+        cached_answer = self._use_cached_answer(cache_key, text, client_id, history)
+        if cached_answer is not None:
+            return cached_answer
+        speculation = self._take_speculation(text, client_id, history)
 
-        # Prepend prompt instructions
-        prompt = f"""
-        あなたはてぃ先生です。保育士のプロです。
-        質問に対し3~4歳児向けに回答し、150~200文字程度に要約し端的に回答してください。質問は次です。
-        {text}
-        """
-        self.conversations[client_id].append({"role": "user", "parts": [prompt]})
-        logger.debug(f"Conversation history for {client_id} before LLM call: {self.conversations[client_id]}")
+        # The persona is the model's system instruction; only the raw text is sent
+        contents = history.to_contents()
+        history.append(USER, text)
+        logger.debug(f"Conversation history for {client_id} before LLM call: {contents}")
 
         try:
-            chat = self.gemini_model.start_chat(history=self.conversations[client_id][:-1]) # Exclude the last user message from history passed to start_chat
-            response = await chat.send_message_async(prompt) # Send the actual prompt
-            llm_response = response.text
+            start_time = time.perf_counter()
+            if speculation is not None:
+                llm_response = "".join([piece async for piece in speculation.pieces()])
+            else:
+                response = await self.resilience.call(LLM, lambda: self._send_llm_message(contents, text, client_id))
+                llm_response = response.text
+            metrics.LLM_TOTAL_SECONDS.observe(time.perf_counter() - start_time)
             logger.info(f"LLM response for {client_id}: {llm_response}")
 
             # Add LLM response to history
-            self.conversations[client_id].append({"role": "model", "parts": [llm_response]})
+            history.append(MODEL, llm_response)
+            self._persist_exchange(client_id, text, llm_response)
+            if cache_key is not None:
+                self.answer_cache.record_miss(time.perf_counter() - start_time)
+                self.answer_cache.put(cache_key, llm_response)
             return llm_response
         except Exception as e:
             logger.error(f"Error getting LLM response for {client_id}: {e}")
-            # Remove the failed user prompt from history
-            if self.conversations[client_id] and self.conversations[client_id][-1]["role"] == "user":
-                self.conversations[client_id].pop()
-            raise Exception("LLM API call failed.") from e
+            # Remove the failed user turn from history
+            history.pop_pending_user()
+            raise self._llm_error(e) from e
 
-    async def synthesize_speech(self, text: str) -> bytes:
+    async def stream_llm_response(self, text: str, client_id: str) -> AsyncIterator[str]:
         """
-        Synthesizes speech from text using OpenAI TTS API asynchronously.
+        Streams a response from the configured LLM (Gemini) as text deltas.
+
+        The full reply is appended to the conversation history once the
+        stream has finished. A reply requested speculatively during the
+        utterance (see open_transcription) is continued if it answers text.
+
+        Args:
+            text: The user's input text.
+            client_id: The client identifier for managing conversation history.
+
+        Yields:
+            Pieces of the LLM's response text in order.
+
+        Raises:
+            ProviderBusy: If the LLM is saturated, rate limited us or its circuit is open.
+            Exception: If the LLM API call fails.
+        """
+        history = self._history(client_id)
+        cache_key = self._answer_cache_key(text, history)
+        cached_answer = self._use_cached_answer(cache_key, text, client_id, history)
+        if cached_answer is not None:
+            yield cached_answer
+            return
+        speculation = self._take_speculation(text, client_id, history)
+
+        contents = history.to_contents()
+        history.append(USER, text)
+        parts: List[str] = []
+        completed = False
+        start_counter = time.perf_counter()
+        if speculation is not None:
+            # The reply was requested before the utterance ended; continue its stream
+            pieces = speculation.pieces()
+        else:
+            pieces = self.resilience.stream(LLM, lambda: self._stream_llm_attempt(contents, text, client_id))
+
+        try:
+            async for piece in pieces:
+                if not parts:
+                    first_token = time.perf_counter() - start_counter
+                    metrics.LLM_FIRST_TOKEN_SECONDS.observe(first_token)
+                    logger.info(f"Time to first token (LLM): {int(first_token * 1000)}ms")
+                parts.append(piece)
+                yield piece
+            completed = True
+        except Exception as e:
+            logger.error(f"Error streaming LLM response for {client_id}: {e}")
+            raise self._llm_error(e) from e
+        finally:
+            if completed:
+                metrics.LLM_TOTAL_SECONDS.observe(time.perf_counter() - start_counter)
+                llm_response = "".join(parts)
+                logger.info(f"LLM response for {client_id}: {llm_response}")
+                history.append(MODEL, llm_response)
+                self._persist_exchange(client_id, text, llm_response)
+                if cache_key is not None:
+                    self.answer_cache.record_miss(time.perf_counter() - start_counter)
+                    self.answer_cache.put(cache_key, llm_response)
+            else:
+                # Remove the failed or abandoned user turn from history
+                history.pop_pending_user()
+                await pieces.aclose()
+
+    async def _send_llm_message(self, contents: List, text: str, client_id: str):
+        """
+        Makes one non-streaming Gemini request, holding an LLM rate limiter slot.
+
+        Args:
+            contents: The history sent with the request.
+            text: The user's input text.
+            client_id: The client identifier.
+
+        Returns:
+            The Gemini response.
+        """
+        async with self.scheduler.slot(LLM, client_id):
+            chat = self.gemini_model.start_chat(history=contents)
+            return await chat.send_message_async(text)
+
+    async def _stream_llm_attempt(self, contents: List, text: str, client_id: str) -> AsyncIterator[str]:
+        """
+        Makes one streaming Gemini request, holding an LLM rate limiter slot until it ends.
+
+        Args:
+            contents: The history sent with the request.
+            text: The user's input text.
+            client_id: The client identifier.
+
+        Yields:
+            Pieces of the response text in order.
+        """
+        async with self.scheduler.slot(LLM, client_id):
+            chat = self.gemini_model.start_chat(history=contents)
+            response = await chat.send_message_async(text, stream=True)
+            completed = False
+            try:
+                async for chunk in response:
+                    yield chunk.text
+                completed = True
+            finally:
+                if not completed:
+                    await self._close_llm_stream(response)
+
+    def _llm_error(self, error: Exception) -> Exception:
+        """
+        Maps an LLM failure to the exception raised to the caller.
+
+        Args:
+            error: The exception raised by the scheduler or the Gemini SDK.
+
+        Returns:
+            ProviderBusy for refusals and provider rate limits (after backing
+            off), otherwise a generic failure.
+        """
+        if isinstance(error, ProviderBusy):
+            return error
+        if isinstance(error, TooManyRequests):
+            self.scheduler.penalize(LLM)
+            return ProviderBusy(LLM, "rate limited by the provider")
+        return Exception("LLM API call failed.")
+
+    @staticmethod
+    async def _close_llm_stream(response) -> None:
+        """
+        Closes an abandoned Gemini stream so the underlying call is cancelled.
+
+        Args:
+            response: The streaming response returned by send_message_async.
+        """
+        # The SDK keeps the gRPC stream in a private iterator; close it if present.
+        iterator = getattr(response, "_iterator", None)
+        try:
+            if hasattr(iterator, "cancel"):
+                iterator.cancel()
+            elif hasattr(iterator, "aclose"):
+                await iterator.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing abandoned LLM stream: {e}")
+
+    def schedule_history_compaction(self, client_id: str) -> None:
+        """
+        Folds old turns into the rolling summary in the background if needed.
+
+        Call this after the response has been sent so summarization stays off
+        the critical path. At most one compaction runs per client.
+
+        Args:
+            client_id: The client identifier.
+        """
+        history = self.sessions.get(client_id)
+        if history is None or not history.needs_compaction():
+            return
+        if client_id in self._compaction_tasks:
+            return
+        task = asyncio.create_task(self._compact_history(client_id, history))
+        self._compaction_tasks[client_id] = task
+
+        def _forget(done: asyncio.Task) -> None:
+            if self._compaction_tasks.get(client_id) is done:
+                del self._compaction_tasks[client_id]
+
+        task.add_done_callback(_forget)
+
+    async def _compact_history(self, client_id: str, history: ConversationHistory) -> None:
+        """
+        Summarizes the oldest turns of a history and folds them away.
+
+        Args:
+            client_id: The client identifier.
+            history: The history to compact.
+        """
+        folded = history.compaction_batch()
+        if not folded:
+            return
+        start_time = time.time()
+        prompt = history.summary_prompt(folded)
+
+        async def summarize():
+            async with self.scheduler.slot(LLM, client_id):
+                return await self.summary_model.generate_content_async(prompt)
+
+        try:
+            # Off the critical path: retried, but never hedged
+            response = await self.resilience.call(LLM, summarize, hedge=False)
+            summary = response.text.strip()
+        except Exception as e:
+            logger.warning(f"History summarization failed for {client_id}; keeping turns: {e}")
+            return
+        if history.apply_summary(summary, folded):
+            self.conversation_store.record_summary(client_id, history.summary, len(folded))
+            if self.sessions.get(client_id) is history:
+                self._account_history(client_id)
+            logger.info(
+                f"Folded {len(folded)} turns into summary for {client_id} in "
+                f"{int((time.time() - start_time) * 1000)}ms ({history.chars} chars remain)"
+            )
+            await self.save_session(client_id)
+
+    def _prefetch_speech(
+        self, text: str, client_id: str, chunks: asyncio.Queue, audio_format: str | None = None
+    ) -> asyncio.Task:
+        """
+        Starts streaming TTS for text in the background.
 
         Args:
             text: The text to synthesize.
+            client_id: The client the speech is for.
+            chunks: Filled with the audio chunks, then None, or the exception
+                that stopped synthesis.
+            audio_format: TTS response format (TTS_RESPONSE_FORMAT by default).
 
         Returns:
-            The synthesized audio data in PCM format as bytes.
+            The background task.
+        """
+        async def pump() -> None:
+            try:
+                async for chunk in self._synthesize_cached(text, client_id, audio_format):
+                    chunks.put_nowait(chunk)
+                chunks.put_nowait(None)
+            except Exception as e:
+                chunks.put_nowait(e)
+
+        return asyncio.create_task(pump())
+
+    async def _speak_in_order(
+        self, segments: AsyncIterator[str], client_id: str, audio_format: str | None = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Synthesizes text segments concurrently and streams their audio in order.
+
+        Segments are synthesized as soon as they arrive, at most
+        TTS_SEGMENT_FANOUT at once, in arrival order. The current segment is
+        streamed through as its audio arrives; later ones are buffered until
+        their turn. PCM segments are kept sample aligned and separated by
+        TTS_SEGMENT_GAP_MS of silence.
+
+        Args:
+            segments: The text segments in playback order.
+            client_id: The client the speech is for.
+            audio_format: TTS response format (TTS_RESPONSE_FORMAT by default).
+
+        Yields:
+            Synthesized audio chunks in segment order.
 
         Raises:
+            Exception: If producing the segments or their synthesis fails.
+        """
+        pcm = (audio_format or settings.TTS_RESPONSE_FORMAT) == "pcm"
+        gap = bytes(settings.TTS_SAMPLE_RATE * settings.TTS_SEGMENT_GAP_MS // 1000 * 2) if pcm else b""
+        pending: asyncio.Queue[asyncio.Queue | None] = asyncio.Queue()
+        waiting: Deque[Tuple[str, asyncio.Queue]] = deque()
+        started: List[asyncio.Task] = []
+        in_flight = 0
+        closing = False
+
+        def start_waiting(done: asyncio.Task | None = None) -> None:
+            nonlocal in_flight
+            if done is not None:
+                in_flight -= 1
+            while waiting and in_flight < settings.TTS_SEGMENT_FANOUT and not closing:
+                segment, chunks = waiting.popleft()
+                task = self._prefetch_speech(segment, client_id, chunks, audio_format)
+                task.add_done_callback(start_waiting)
+                started.append(task)
+                in_flight += 1
+
+        async def produce() -> None:
+            try:
+                async for segment in segments:
+                    chunks: asyncio.Queue = asyncio.Queue()
+                    waiting.append((segment, chunks))
+                    pending.put_nowait(chunks)
+                    start_waiting()
+            finally:
+                pending.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            first = True
+            while True:
+                chunks = await pending.get()
+                if chunks is None:
+                    break
+                if gap and not first:
+                    yield gap
+                first = False
+                carry = b""
+                while True:
+                    chunk = await chunks.get()
+                    if chunk is None:
+                        break
+                    if isinstance(chunk, Exception):
+                        raise chunk
+                    if pcm and (carry or len(chunk) % 2):
+                        # Keep 16-bit samples whole across chunk and segment boundaries
+                        chunk = carry + bytes(chunk)
+                        carry = chunk[len(chunk) - len(chunk) % 2:]
+                        chunk = chunk[:len(chunk) - len(carry)]
+                    if chunk:
+                        yield chunk
+                if carry:
+                    logger.warning("Dropped a trailing odd byte of a TTS segment to keep samples aligned")
+            await producer # Surface errors raised after the last segment
+        finally:
+            closing = True
+            producer.cancel()
+            for task in started:
+                task.cancel()
+            # Wait for the cancelled LLM/TTS streams to close their HTTP responses
+            await asyncio.gather(producer, *started, return_exceptions=True)
+            if hasattr(segments, "aclose"):
+                await segments.aclose()
+
+    async def respond_with_speech(
+        self, text: str, client_id: str, audio_format: str | None = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Streams the LLM reply into sentence-chunked TTS.
+
+        Each sentence is handed to TTS as soon as the LLM has completed it, so
+        synthesis of early sentences overlaps with generation of later ones.
+
+        Args:
+            text: The user's input text.
+            client_id: The client identifier for managing conversation history.
+            audio_format: TTS response format (TTS_RESPONSE_FORMAT by default).
+
+        Yields:
+            Synthesized audio chunks (PCM by default) in sentence order.
+
+        Raises:
+            Exception: If the LLM or TTS API call fails.
+        """
+        async def sentences() -> AsyncIterator[str]:
+            chunker = SentenceChunker(settings.TTS_SENTENCE_MIN_CHARS)
+            async for delta in self.stream_llm_response(text, client_id):
+                for sentence in chunker.feed(delta):
+                    yield sentence
+            rest = chunker.flush()
+            if rest:
+                yield rest
+
+        async for chunk in self._speak_in_order(sentences(), client_id, audio_format):
+            yield chunk
+
+    async def synthesize_speech_stream(
+        self, text: str, client_id: str = SYSTEM_CLIENT, audio_format: str | None = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Streams synthesized speech of a complete text.
+
+        With TTS_SEGMENTED, text of several sentences is split at sentence
+        boundaries and the segments are synthesized concurrently, so the first
+        sentence plays while later ones are still rendering and the total
+        time no longer grows with the length of the reply.
+
+        Args:
+            text: The text to synthesize.
+            client_id: The client the speech is for, for fair queueing.
+            audio_format: TTS response format (TTS_RESPONSE_FORMAT by default).
+
+        Yields:
+            Chunks of synthesized audio (PCM by default) in order.
+
+        Raises:
+            ProviderBusy: If TTS is saturated or rate limited us.
+            Exception: If the TTS API call fails.
+        """
+        segments = split_sentences(text, settings.TTS_SENTENCE_MIN_CHARS) if settings.TTS_SEGMENTED else []
+        if len(segments) < 2:
+            async for chunk in self._synthesize_cached(text, client_id, audio_format):
+                yield chunk
+            return
+
+        async def listed() -> AsyncIterator[str]:
+            for segment in segments:
+                yield segment
+
+        async for chunk in self._speak_in_order(listed(), client_id, audio_format):
+            yield chunk
+
+    async def _synthesize_cached(
+        self, text: str, client_id: str = SYSTEM_CLIENT, audio_format: str | None = None, background: bool = False
+    ) -> AsyncIterator[bytes]:
+        """
+        Streams synthesized speech, served from the TTS cache when possible.
+
+        On a miss the upstream stream is passed through while it is recorded
+        for the cache. Concurrent requests for the same rendering wait for the
+        first one instead of calling the API again.
+
+        Args:
+            text: The text to synthesize.
+            client_id: The client the speech is for, for fair queueing.
+            audio_format: TTS response format (TTS_RESPONSE_FORMAT by default).
+            background: True for renderings no client is waiting for; see ProviderGuard.
+
+        Yields:
+            Chunks of synthesized audio (PCM by default) of up to TTS_CHUNK_SIZE bytes.
+
+        Raises:
+            ProviderBusy: If TTS is saturated or rate limited us.
+            Exception: If the TTS API call fails.
+        """
+        if not settings.TTS_CACHE_ENABLED:
+            async for chunk in self._synthesize_upstream(text, client_id, audio_format, background):
+                yield chunk
+            return
+
+        key = tts_cache_key(text, audio_format)
+        cached = self.tts_cache.get(key)
+        producing = None
+        while cached is None and producing is None:
+            inflight, producer = self.tts_cache.begin(key)
+            if producer:
+                producing = inflight
+            else:
+                cached = await asyncio.shield(inflight) # None if the producer failed; try again
+        if cached is not None:
+            view = memoryview(cached)
+            for offset in range(0, len(view), settings.TTS_CHUNK_SIZE):
+                yield view[offset:offset + settings.TTS_CHUNK_SIZE]
+            return
+
+        recorded = bytearray()
+        try:
+            async for chunk in self._synthesize_upstream(text, client_id, audio_format, background):
+                recorded.extend(chunk)
+                yield chunk
+        except BaseException:
+            self.tts_cache.abandon(key, producing)
+            raise
+        self.tts_cache.complete(key, bytes(recorded), producing)
+
+    async def _synthesize_upstream(
+        self, text: str, client_id: str = SYSTEM_CLIENT, audio_format: str | None = None, background: bool = False
+    ) -> AsyncIterator[bytes]:
+        """
+        Streams synthesized speech from OpenAI TTS as it arrives, bypassing the cache.
+
+        Args:
+            text: The text to synthesize.
+            client_id: The client the speech is for, for fair queueing.
+            audio_format: TTS response format (TTS_RESPONSE_FORMAT by default).
+            background: True for renderings no client is waiting for; see ProviderGuard.
+
+        Yields:
+            Chunks of synthesized audio (PCM by default) of up to TTS_CHUNK_SIZE bytes.
+
+        Raises:
+            ProviderBusy: If TTS is saturated, rate limited us or its circuit is open.
             Exception: If the TTS API call fails.
         """
         logger.info(f"Synthesizing speech for text: '{text[:50]}...'")
-        start_time = time.time()
-        accumulated_audio = bytearray()
+        total_bytes = 0
+        start_time = time.perf_counter()
+        chunks = self.resilience.stream(
+            TTS, lambda: self._tts_attempt(text, client_id, audio_format), background=background
+        )
 
         try:
+            async for chunk in chunks:
+                if not total_bytes:
+                    first_byte = time.perf_counter() - start_time
+                    metrics.TTS_FIRST_BYTE_SECONDS.observe(first_byte)
+                    logger.info(f"Time to first byte (TTS): {int(first_byte * 1000)}ms")
+                total_bytes += len(chunk)
+                yield chunk
+            total = time.perf_counter() - start_time
+            metrics.TTS_TOTAL_SECONDS.observe(total)
+            logger.info(f"TTS synthesis done in {int(total * 1000)}ms. Size: {total_bytes} bytes.")
+        except ProviderBusy:
+            raise
+        except RateLimitError as e:
+            self.scheduler.penalize(TTS)
+            raise ProviderBusy(TTS, "rate limited by the provider") from e
+        except Exception as e:
+            logger.error(f"Error during TTS synthesis: {e}")
+            raise Exception("TTS API call failed.") from e
+        finally:
+            await chunks.aclose()
+
+    async def _tts_attempt(self, text: str, client_id: str, audio_format: str | None = None) -> AsyncIterator[bytes]:
+        """
+        Makes one OpenAI TTS request, holding a TTS rate limiter slot until it ends.
+
+        Args:
+            text: The text to synthesize.
+            client_id: The client the speech is for.
+            audio_format: TTS response format (TTS_RESPONSE_FORMAT by default).
+
+        Yields:
+            Chunks of synthesized audio of up to TTS_CHUNK_SIZE bytes.
+        """
+        async with self.scheduler.slot(TTS, client_id):
             async with self.openai_client.audio.speech.with_streaming_response.create(
                 model=settings.TTS_MODEL_NAME,
                 voice=settings.TTS_VOICE,
                 input=text,
                 instructions=settings.TTS_INSTRUCTIONS,
-                response_format=settings.TTS_RESPONSE_FORMAT,
+                response_format=audio_format or settings.TTS_RESPONSE_FORMAT,
             ) as response:
-                first_byte_time = time.time()
-                logger.info(f"Time to first byte (TTS): {int((first_byte_time - start_time) * 1000)}ms")
                 async for chunk in response.iter_bytes(chunk_size=settings.TTS_CHUNK_SIZE):
-                    accumulated_audio.extend(chunk)
-            end_time = time.time()
-            logger.info(f"TTS synthesis done in {int((end_time - start_time) * 1000)}ms. Size: {len(accumulated_audio)} bytes.")
-            return bytes(accumulated_audio)
-        except Exception as e:
-            logger.error(f"Error during TTS synthesis: {e}")
-            raise Exception("TTS API call failed.") from e
+                    yield chunk
+
+    async def synthesize_speech(self, text: str) -> bytes:
+        """
+        Synthesizes speech from text using OpenAI TTS API asynchronously.
+
+        Args:
+            text: The text to synthesize.
+
+        Returns:
+            The synthesized audio data in PCM format as bytes.
+
+        Raises:
+            Exception: If the TTS API call fails.
+        """
+        accumulated_audio = bytearray()
+        async for chunk in self.synthesize_speech_stream(text):
+            accumulated_audio.extend(chunk)
+        return bytes(accumulated_audio)
+
+    async def render_canned(self, text: str) -> bytes:
+        """
+        Synthesizes a canned system message ahead of use (see canned_audio).
+
+        The rendering is not split into sentences and bypasses the TTS
+        circuit breaker, so failures of startup pre-rendering and its
+        periodic retries never refuse client turns.
+
+        Args:
+            text: The message text.
+
+        Returns:
+            The synthesized audio data in PCM format as bytes.
+
+        Raises:
+            Exception: If the TTS API call fails.
+        """
+        accumulated_audio = bytearray()
+        async for chunk in self._synthesize_cached(text, background=True):
+            accumulated_audio.extend(chunk)
+        return bytes(accumulated_audio)
 
 
 # Single instance of the service
@@ -0,0 +1,326 @@
+# app/services/conversation_store.py
+import asyncio
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.core.config import settings
+from app.utils.file_utils import ensure_directory_exists
+from app.services.offload import BlockingOffloader, blocking_offloader
+
+logger = logging.getLogger(__name__)
+
+# Write operations, applied by the writer in the order they were recorded
+_TURN = "turn"
+_SUMMARY = "summary"
+_RESET = "reset"
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS turns ("
+    "id INTEGER PRIMARY KEY, client_id TEXT NOT NULL, role TEXT NOT NULL, "
+    "text TEXT NOT NULL, created_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS turns_client ON turns (client_id, id)",
+    "CREATE INDEX IF NOT EXISTS turns_created ON turns (created_at)",
+    "CREATE TABLE IF NOT EXISTS summaries ("
+    "client_id TEXT PRIMARY KEY, summary TEXT NOT NULL, updated_at REAL NOT NULL)",
+)
+
+
+class ConversationStore:
+    """Durable conversation history in SQLite with write-behind batching.
+
+    record_turn() and record_summary() only append to an in-memory list; a
+    single writer task flushes it every flush_interval (or once batch_size
+    operations are pending) in WAL transactions of up to batch_size bulk
+    inserts, on the "conversation_store" offload stage. Folding turns into a summary deletes
+    them, and starting a new conversation deletes the client's stored one, so
+    the stored turns always match the unsummarized in-memory turns.
+    Rows older than retention_seconds are purged periodically.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        flush_interval: float,
+        batch_size: int,
+        max_pending: int,
+        resume_seconds: float,
+        retention_seconds: float,
+        purge_interval: float,
+        offloader: BlockingOffloader = blocking_offloader,
+    ):
+        """
+        Initializes the store. Call start() from the event loop to open it.
+
+        Args:
+            path: The database file.
+            flush_interval: Seconds between flushes of pending writes.
+            batch_size: Pending operations that trigger an early flush.
+            max_pending: Pending operations kept while the database lags;
+                older ones are dropped beyond this.
+            resume_seconds: Conversations idle for longer are not resumed.
+            retention_seconds: Rows older than this are purged.
+            purge_interval: Seconds between purges.
+            offloader: Thread pool the database work runs on.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.resume_seconds = resume_seconds
+        self.retention_seconds = retention_seconds
+        self.purge_interval = purge_interval
+        self.offloader = offloader
+        self._conn: sqlite3.Connection | None = None
+        self._pending: List[Tuple] = []
+        self._wakeup: asyncio.Event | None = None
+        self._writer: asyncio.Task | None = None
+        self._closing = False
+        self._last_purge = 0.0
+        self.turns_written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.resumed = 0
+        self.purged = 0
+
+    @property
+    def running(self) -> bool:
+        """True while the writer task is accepting writes."""
+        return self._writer is not None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Only used from the single-threaded "conversation_store" stage.
+        if self._conn is None:
+            ensure_directory_exists(self.path.parent)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    async def start(self) -> None:
+        """Opens the database and starts the writer task."""
+        if self._writer is not None:
+            return
+        await self.offloader.run("conversation_store", self._connection)
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._writer = asyncio.get_running_loop().create_task(self._write_loop(), name="conversation-writer")
+        logger.info(f"Conversation store opened at {self.path}")
+
+    def record_turn(self, client_id: str, role: str, text: str) -> None:
+        """
+        Queues a turn for writing. Never blocks.
+
+        Args:
+            client_id: The client identifier.
+            role: USER or MODEL.
+            text: The message text.
+        """
+        self._record((_TURN, client_id, role, text, time.time()))
+
+    def record_summary(self, client_id: str, summary: str, folded: int) -> None:
+        """
+        Queues a summary update that replaces the oldest stored turns. Never blocks.
+
+        Args:
+            client_id: The client identifier.
+            summary: The new rolling summary.
+            folded: Number of oldest turns folded into it.
+        """
+        self._record((_SUMMARY, client_id, summary, folded, time.time()))
+
+    def record_reset(self, client_id: str) -> None:
+        """
+        Queues the deletion of a client's stored turns and summary, for a
+        conversation that starts over. Never blocks.
+
+        Args:
+            client_id: The client identifier.
+        """
+        self._record((_RESET, client_id))
+
+    def _record(self, operation: Tuple) -> None:
+        if self._writer is None:
+            return
+        self._pending.append(operation)
+        if len(self._pending) > self.max_pending:
+            del self._pending[0]
+            self.dropped += 1
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _write_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._closing:
+            # A timer rather than asyncio.wait_for, which starts a task every flush interval
+            timer = loop.call_later(self.flush_interval, self._wakeup.set)
+            try:
+                await self._wakeup.wait()
+            finally:
+                timer.cancel()
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                if time.monotonic() - self._last_purge >= self.purge_interval:
+                    self._last_purge = time.monotonic()
+                    await self.purge()
+            except sqlite3.Error as e:
+                logger.error(f"Conversation store write failed: {e}")
+
+    async def flush(self) -> None:
+        """Writes every pending operation, batch_size operations per transaction."""
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            try:
+                await self.offloader.run("conversation_store", self._write_batch, batch)
+            except sqlite3.Error:
+                # Keep the batch for the next attempt, ahead of newer writes
+                self._pending[:0] = batch
+                raise
+            self.batches += 1
+            self.turns_written += sum(1 for operation in batch if operation[0] == _TURN)
+
+    def _write_batch(self, batch: List[Tuple]) -> None:
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            rows: List[Tuple] = []
+            for operation in batch:
+                if operation[0] == _TURN:
+                    rows.append(operation[1:])
+                    continue
+                # Turns recorded before the summary or reset must be stored before they are deleted
+                if rows:
+                    conn.executemany(
+                        "INSERT INTO turns (client_id, role, text, created_at) VALUES (?, ?, ?, ?)", rows
+                    )
+                    rows = []
+                if operation[0] == _RESET:
+                    conn.execute("DELETE FROM turns WHERE client_id = ?", (operation[1],))
+                    conn.execute("DELETE FROM summaries WHERE client_id = ?", (operation[1],))
+                    continue
+                _, client_id, summary, folded, updated_at = operation
+                conn.execute(
+                    "DELETE FROM turns WHERE id IN "
+                    "(SELECT id FROM turns WHERE client_id = ? ORDER BY id LIMIT ?)",
+                    (client_id, folded),
+                )
+                conn.execute(
+                    "INSERT INTO summaries (client_id, summary, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(client_id) DO UPDATE SET summary = excluded.summary, updated_at = excluded.updated_at",
+                    (client_id, summary, updated_at),
+                )
+            if rows:
+                conn.executemany("INSERT INTO turns (client_id, role, text, created_at) VALUES (?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def load(self, client_id: str) -> Dict[str, Any] | None:
+        """
+        Loads a client's stored conversation if it was active recently.
+
+        Pending writes of this process are flushed first.
+
+        Args:
+            client_id: The client identifier.
+
+        Returns:
+            {"summary": str, "turns": [[role, text], ...]}, or None if there
+            is nothing to resume within resume_seconds.
+        """
+        if self._writer is None:
+            return None
+        await self.flush()
+        state = await self.offloader.run("conversation_store", self._load, client_id, time.time() - self.resume_seconds)
+        if state is not None:
+            self.resumed += 1
+        return state
+
+    def _load(self, client_id: str, active_since: float) -> Dict[str, Any] | None:
+        conn = self._connection()
+        row = conn.execute("SELECT summary, updated_at FROM summaries WHERE client_id = ?", (client_id,)).fetchone()
+        summary, last_active = row if row else ("", 0.0)
+        turns = conn.execute(
+            "SELECT role, text, created_at FROM turns WHERE client_id = ? ORDER BY id", (client_id,)
+        ).fetchall()
+        if turns:
+            last_active = max(last_active, turns[-1][2])
+        if last_active < active_since or not (summary or turns):
+            return None
+        return {"summary": summary, "turns": [[role, text] for role, text, _ in turns]}
+
+    async def purge(self) -> int:
+        """
+        Deletes rows older than retention_seconds.
+
+        Returns:
+            The number of deleted turns.
+        """
+        deleted = await self.offloader.run("conversation_store", self._purge, time.time() - self.retention_seconds)
+        if deleted:
+            self.purged += deleted
+            logger.info(f"Purged {deleted} conversation turns older than {self.retention_seconds}s")
+        return deleted
+
+    def _purge(self, cutoff: float) -> int:
+        conn = self._connection()
+        deleted = conn.execute("DELETE FROM turns WHERE created_at < ?", (cutoff,)).rowcount
+        conn.execute(
+            "DELETE FROM summaries WHERE updated_at < ? AND client_id NOT IN (SELECT client_id FROM turns)",
+            (cutoff,),
+        )
+        return deleted
+
+    async def close(self) -> None:
+        """Stops the writer after flushing pending writes, and closes the database."""
+        if self._writer is None:
+            return
+        # Let the writer finish its current batch rather than cancelling it mid-write
+        self._closing = True
+        self._wakeup.set()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        self._writer = None
+        try:
+            await self.flush()
+        except sqlite3.Error as e:
+            logger.error(f"Conversation store final flush failed: {e}")
+        if self._conn is not None:
+            await self.offloader.run("conversation_store", self._conn.close)
+            self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns write-behind counters.
+
+        Returns:
+            A JSON-serializable dict of counters.
+        """
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "turns_written": self.turns_written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "resumed": self.resumed,
+            "purged": self.purged,
+        }
+
+
+# Single instance of the conversation store
+conversation_store = ConversationStore(
+    path=settings.CONVERSATION_STORE_PATH,
+    flush_interval=settings.CONVERSATION_FLUSH_INTERVAL,
+    batch_size=settings.CONVERSATION_BATCH_SIZE,
+    max_pending=settings.CONVERSATION_MAX_PENDING,
+    resume_seconds=settings.CONVERSATION_RESUME_SECONDS,
+    retention_seconds=settings.CONVERSATION_RETENTION_SECONDS,
+    purge_interval=settings.CONVERSATION_PURGE_INTERVAL,
+)
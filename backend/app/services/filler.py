@@ -0,0 +1,118 @@
+# app/services/filler.py
+import asyncio
+import itertools
+import logging
+import time
+from typing import AsyncIterator
+
+import numpy as np
+
+from app.core.config import settings
+from app.services import metrics
+from app.services.canned_audio import FILLERS, canned_responses
+
+logger = logging.getLogger(__name__)
+
+_rotation = itertools.count()
+
+
+def next_filler_clip() -> bytes | None:
+    """
+    Returns the next pre-rendered filler clip, rotating through the pool.
+
+    Returns:
+        The PCM clip, or None if no filler has been rendered yet.
+    """
+    clips = [audio for audio in map(canned_responses.audio, FILLERS) if audio]
+    if not clips:
+        return None
+    return clips[next(_rotation) % len(clips)]
+
+
+def fade_out(frame: bytes) -> bytes:
+    """
+    Fades a 16-bit PCM frame linearly to silence, so a cut clip does not click.
+
+    Args:
+        frame: The PCM frame (an even number of bytes).
+
+    Returns:
+        The faded frame.
+    """
+    samples = np.frombuffer(frame, dtype="<i2")
+    return (samples * np.linspace(1.0, 0.0, len(samples))).astype("<i2").tobytes()
+
+
+class FillerSplicer:
+    """Plays a filler clip ahead of a reply whose first audio is late.
+
+    splice() passes the reply through unchanged if its first chunk arrives
+    before the deadline. Otherwise it plays the next filler clip from the pool
+    in whole frames, paced at playback speed with only lead_seconds queued
+    ahead, and cuts it at the next frame boundary once the reply's first
+    chunk is ready: that frame is faded out and the reply follows it. A clip
+    that ends first is followed by silence until the reply arrives.
+    """
+
+    def __init__(self, deadline: float, frame_bytes: int, lead_seconds: float):
+        """
+        Initializes the splicer for one reply.
+
+        Args:
+            deadline: time.perf_counter() after which the filler starts.
+            frame_bytes: Bytes per outbound frame (16-bit mono PCM).
+            lead_seconds: Filler audio queued ahead of playback.
+        """
+        self.deadline = deadline
+        self.frame_bytes = frame_bytes
+        self.frame_seconds = frame_bytes / (settings.TTS_SAMPLE_RATE * 2)
+        self.lead_seconds = lead_seconds
+        self.playing = False # the chunk just yielded is filler
+        self.played = False
+
+    def _frames(self, clip: bytes) -> list[bytes]:
+        clip += bytes(-len(clip) % self.frame_bytes) # pad the last frame with silence
+        return [clip[offset:offset + self.frame_bytes] for offset in range(0, len(clip), self.frame_bytes)]
+
+    async def splice(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        Yields the reply audio, preceded by filler frames if it is late.
+
+        Args:
+            chunks: The reply's PCM audio chunks.
+
+        Yields:
+            Whole filler frames, then the reply's chunks.
+        """
+        first = asyncio.ensure_future(chunks.__anext__())
+        try:
+            # Give the reply at least one frame, so a cached answer is never masked
+            await asyncio.wait({first}, timeout=max(self.deadline - time.perf_counter(), self.frame_seconds))
+            clip = None if first.done() else next_filler_clip()
+            if clip:
+                metrics.FILLER_PLAYED.inc()
+                self.played = True
+                started = time.perf_counter()
+                self.playing = True
+                for index, frame in enumerate(self._frames(clip)):
+                    wait = started + index * self.frame_seconds - self.lead_seconds - time.perf_counter()
+                    if wait > 0:
+                        await asyncio.wait({first}, timeout=wait)
+                    if first.done():
+                        yield fade_out(frame)
+                        break
+                    yield frame
+                self.playing = False
+            try:
+                chunk = await first
+            except StopAsyncIteration:
+                return
+            yield chunk
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            self.playing = False
+            if not first.done():
+                first.cancel()
+                await asyncio.gather(first, return_exceptions=True)
+            await chunks.aclose()
@@ -0,0 +1,149 @@
+# app/services/framing.py
+import struct
+import time
+from typing import Dict, NamedTuple
+
+# WebSocket subprotocol offered by clients that speak the framed protocol;
+# connections without it keep JSON text commands and raw PCM binary messages
+SUBPROTOCOL = "voicechat.v1"
+VERSION = 1
+
+# Every binary message starts with this little-endian header:
+#   version u8, type u8, flags u16, stream id u32, sequence u32, timestamp u32
+# The payload is the rest of the message. A client starts an utterance with
+# a CONTROL start_recording frame and sends its audio as AUDIO frames on the
+# same stream, the last one flagged FLAG_END. Each reply is a new server
+# stream: CONTROL audio_start, AUDIO frames, CONTROL audio_end.
+HEADER = struct.Struct("<BBHIII")
+HEADER_SIZE = HEADER.size
+SEQUENCE_OFFSET = 8
+
+# Frame types
+AUDIO = 1 # PCM audio of a stream (an utterance upstream, a reply downstream)
+CONTROL = 2 # UTF-8 JSON command or event, the same messages as the text protocol
+TEXT = 3 # UTF-8 text to show or speak (canned message fallback)
+
+# Flags
+FLAG_END = 0x1 # last frame of a stream; the payload may be empty
+
+
+class FramingError(ValueError):
+    """Raised for a binary message that is not a valid frame."""
+
+
+class Frame(NamedTuple):
+    """A decoded frame; payload is a view into the received message, not a copy."""
+
+    type: int
+    flags: int
+    stream: int
+    sequence: int
+    timestamp: int
+    payload: memoryview
+
+
+def decode(message: bytes) -> Frame:
+    """
+    Decodes a binary message without copying its payload.
+
+    Args:
+        message: The received binary message.
+
+    Returns:
+        The frame.
+
+    Raises:
+        FramingError: If the message is shorter than a header or of another version.
+    """
+    if len(message) < HEADER_SIZE:
+        raise FramingError(f"{len(message)} byte message is shorter than the {HEADER_SIZE} byte header")
+    version, frame_type, flags, stream, sequence, timestamp = HEADER.unpack_from(message)
+    if version != VERSION:
+        raise FramingError(f"Unsupported frame version {version}")
+    return Frame(frame_type, flags, stream, sequence, timestamp, memoryview(message)[HEADER_SIZE:])
+
+
+def encode(
+    frame_type: int, payload: bytes | memoryview, stream: int = 0, sequence: int = 0, timestamp: int = 0, flags: int = 0
+) -> bytes:
+    """
+    Builds a frame; the payload is copied once, into the message.
+
+    Args:
+        frame_type: AUDIO, CONTROL or TEXT.
+        payload: The payload bytes (a memoryview slice is fine).
+        stream: The stream id (0 for connection-level messages).
+        sequence: The frame's number within its stream.
+        timestamp: Sender's clock in milliseconds (wraps at 2**32).
+        flags: Bitwise or of FLAG_* values.
+
+    Returns:
+        The binary message.
+    """
+    return HEADER.pack(VERSION, frame_type, flags, stream, sequence, timestamp) + payload
+
+
+def coalesce(queued: bytes, frame: bytes) -> bytes | None:
+    """
+    Merges an audio frame into the audio frame queued before it.
+
+    The merged frame keeps the first header but takes the later sequence
+    number, so a receiver sees a sequence gap only where frames were dropped.
+
+    Args:
+        queued: The frame already queued.
+        frame: The frame being queued.
+
+    Returns:
+        The merged frame, or None if the frames belong to different streams
+        or are not plain audio frames.
+    """
+    # Version, type, flags and stream must match, and only plain audio frames are merged
+    if queued[:SEQUENCE_OFFSET] != frame[:SEQUENCE_OFFSET] or queued[1:4] != bytes((AUDIO, 0, 0)):
+        return None
+    merged = bytearray(queued)
+    merged[SEQUENCE_OFFSET:SEQUENCE_OFFSET + 4] = frame[SEQUENCE_OFFSET:SEQUENCE_OFFSET + 4]
+    merged += memoryview(frame)[HEADER_SIZE:]
+    return bytes(merged)
+
+
+class FrameEncoder:
+    """Numbers and timestamps the frames one connection sends.
+
+    Sequence numbers count per stream from 0. Stream 0 carries
+    connection-level messages; open_stream() hands out ids for replies.
+    """
+
+    def __init__(self):
+        """Initializes the encoder; timestamps count from now."""
+        self._epoch = time.monotonic()
+        self._sequences: Dict[int, int] = {}
+        self._next_stream = 1
+
+    def open_stream(self) -> int:
+        """Returns a new stream id."""
+        stream = self._next_stream
+        self._next_stream += 1
+        return stream
+
+    def close_stream(self, stream: int) -> None:
+        """Forgets the sequence counter of a finished stream."""
+        self._sequences.pop(stream, None)
+
+    def encode(self, frame_type: int, payload: bytes | memoryview, stream: int = 0, flags: int = 0) -> bytes:
+        """
+        Builds the next frame of a stream.
+
+        Args:
+            frame_type: AUDIO, CONTROL or TEXT.
+            payload: The payload bytes.
+            stream: The stream id.
+            flags: Bitwise or of FLAG_* values.
+
+        Returns:
+            The binary message.
+        """
+        sequence = self._sequences.get(stream, 0)
+        self._sequences[stream] = (sequence + 1) & 0xFFFFFFFF
+        timestamp = int((time.monotonic() - self._epoch) * 1000) & 0xFFFFFFFF
+        return encode(frame_type, payload, stream, sequence, timestamp, flags)
@@ -0,0 +1,218 @@
+# app/services/history.py
+import logging
+import sys
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+USER = "user"
+MODEL = "model"
+
+
+class Turn:
+    """One message of a conversation."""
+
+    __slots__ = ("role", "text")
+
+    def __init__(self, role: str, text: str):
+        self.role = role
+        self.text = text
+
+    def to_content(self) -> Dict:
+        """Returns the turn in the Gemini content format."""
+        return {"role": self.role, "parts": [self.text]}
+
+
+# Memory held per turn besides its text: the slotted object and its list slot
+TURN_OVERHEAD_BYTES = sys.getsizeof(Turn(USER, "")) + 8
+
+
+class ConversationHistory:
+    """Raw conversation turns plus a rolling summary of folded older turns.
+
+    Only the user's raw text is stored; the persona is sent separately as the
+    model's system instruction. to_contents() always fits within char_budget:
+    recent turns are included newest first, preceded by the summary. Once the
+    stored turns exceed the budget, compaction_batch() hands out the oldest
+    turns to be summarized and apply_summary() folds them away. nbytes tracks
+    the memory held by the texts incrementally, for the session registry.
+    """
+
+    def __init__(self, char_budget: int, summary_max_chars: int):
+        """
+        Initializes an empty history.
+
+        Args:
+            char_budget: Maximum characters of history sent with a request.
+            summary_max_chars: Maximum length kept of the rolling summary.
+        """
+        self.char_budget = char_budget
+        self.summary_max_chars = summary_max_chars
+        self.turns: List[Turn] = []
+        self.summary = ""
+        self._chars = 0
+        self._text_bytes = 0
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any], char_budget: int, summary_max_chars: int) -> "ConversationHistory":
+        """
+        Restores a history saved with to_dict().
+
+        Args:
+            state: The saved state.
+            char_budget: Maximum characters of history sent with a request.
+            summary_max_chars: Maximum length kept of the rolling summary.
+
+        Returns:
+            The restored history.
+        """
+        history = cls(char_budget, summary_max_chars)
+        history.summary = state.get("summary", "")
+        for role, text in state.get("turns", []):
+            history.append(role, text)
+        return history
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the summary and turns as a JSON-serializable dict."""
+        return {"summary": self.summary, "turns": [[turn.role, turn.text] for turn in self.turns]}
+
+    def __len__(self) -> int:
+        return len(self.turns) + (1 if self.summary else 0)
+
+    @property
+    def chars(self) -> int:
+        """Characters held in unsummarized turns."""
+        return self._chars
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the turns and the summary."""
+        return self._text_bytes + len(self.turns) * TURN_OVERHEAD_BYTES + sys.getsizeof(self.summary)
+
+    def append(self, role: str, text: str) -> None:
+        """
+        Adds a turn.
+
+        Args:
+            role: USER or MODEL.
+            text: The raw message text.
+        """
+        self.turns.append(Turn(role, text))
+        self._chars += len(text)
+        self._text_bytes += sys.getsizeof(text)
+
+    def pop_pending_user(self) -> None:
+        """Removes the last turn if it is an unanswered user message."""
+        if self.turns and self.turns[-1].role == USER:
+            self._remove(self.turns.pop())
+
+    def _remove(self, turn: Turn) -> None:
+        self._chars -= len(turn.text)
+        self._text_bytes -= sys.getsizeof(turn.text)
+
+    def drop_oldest(self, max_bytes: int) -> int:
+        """
+        Discards the oldest turns, in user/model pairs, until nbytes fits max_bytes.
+
+        The newest turn is always kept. Used when compaction cannot keep up.
+
+        Args:
+            max_bytes: The memory budget of this history.
+
+        Returns:
+            The number of discarded turns.
+        """
+        count = 0
+        excess = self.nbytes - max_bytes
+        while count + 2 < len(self.turns) and excess > 0:
+            for turn in self.turns[count:count + 2]:
+                excess -= sys.getsizeof(turn.text) + TURN_OVERHEAD_BYTES
+            count += 2
+        for turn in self.turns[:count]:
+            self._remove(turn)
+        del self.turns[:count]
+        return count
+
+    def to_contents(self) -> List[Dict]:
+        """
+        Builds the history sent to the model, within the character budget.
+
+        Returns:
+            Gemini contents: the summary exchange (if any) followed by as many
+            recent turns as fit, starting with a user turn.
+        """
+        budget = self.char_budget
+        contents: List[Dict] = []
+        if self.summary:
+            budget -= len(self.summary)
+        start = len(self.turns)
+        while start > 0 and len(self.turns[start - 1].text) <= budget:
+            start -= 1
+            budget -= len(self.turns[start].text)
+        # Gemini expects the history to alternate starting with the user.
+        while start < len(self.turns) and self.turns[start].role != USER:
+            start += 1
+        if self.summary:
+            contents.append({"role": USER, "parts": [f"これまでの会話の要約: {self.summary}"]})
+            contents.append({"role": MODEL, "parts": ["わかりました。"]})
+        contents.extend(turn.to_content() for turn in self.turns[start:])
+        return contents
+
+    def needs_compaction(self) -> bool:
+        """Returns True when stored turns exceed the character budget."""
+        return self._chars + len(self.summary) > self.char_budget
+
+    def compaction_batch(self) -> List[Turn]:
+        """
+        Selects the oldest turns to fold into the summary.
+
+        Turns are taken in complete user/model pairs until the rest fits in
+        half of the budget, leaving room for new turns before the next pass.
+
+        Returns:
+            The turns to summarize (possibly empty).
+        """
+        target = self.char_budget // 2
+        remaining = self._chars
+        count = 0
+        while count + 1 < len(self.turns) and remaining > target:
+            remaining -= len(self.turns[count].text) + len(self.turns[count + 1].text)
+            count += 2
+        return self.turns[:count]
+
+    def apply_summary(self, summary: str, folded: List[Turn]) -> bool:
+        """
+        Replaces folded turns with a new summary.
+
+        Args:
+            summary: Summary of the previous summary plus the folded turns.
+            folded: The turns returned by compaction_batch().
+
+        Returns:
+            False if the history changed underneath and nothing was applied.
+        """
+        count = len(folded)
+        if self.turns[:count] != folded:
+            return False
+        del self.turns[:count]
+        for turn in folded:
+            self._remove(turn)
+        self.summary = summary[: self.summary_max_chars]
+        return True
+
+    def summary_prompt(self, folded: List[Turn]) -> str:
+        """
+        Builds the summarization request for folded turns.
+
+        Args:
+            folded: The turns returned by compaction_batch().
+
+        Returns:
+            The prompt for the summarizer model.
+        """
+        lines = [f"{'子ども' if turn.role == USER else '先生'}: {turn.text}" for turn in folded]
+        previous = f"これまでの要約: {self.summary}\n" if self.summary else ""
+        return (
+            f"{previous}次の会話を、後の会話で必要な事実が残るように"
+            f"{self.summary_max_chars}文字以内で要約してください。\n" + "\n".join(lines)
+        )
@@ -0,0 +1,256 @@
+# app/services/metrics.py
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence
+
+# Upper bounds in seconds, from sub-frame latencies up to a full utterance
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0)
+# Queue waits are mostly zero; finer low buckets keep their quantiles meaningful
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.005) + LATENCY_BUCKETS
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus exposition format.
+
+    Counts are kept per bucket in a preallocated list; observe() is a bisect
+    and two additions, so recording allocates nothing. Bucket counts are only
+    made cumulative when rendered. Must be used from the event loop thread.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Initializes the histogram.
+
+        Args:
+            name: The metric name.
+            help_text: The HELP line of the metric.
+            buckets: Sorted bucket upper bounds; +Inf is implied.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Records one observation.
+
+        Args:
+            value: The observed value (seconds for latency histograms).
+        """
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile by linear interpolation within its bucket.
+
+        Args:
+            q: The quantile in [0, 1].
+
+        Returns:
+            The estimate (the largest finite bound if it falls in +Inf), or 0.0
+            without observations.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets, self._counts):
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        """
+        Renders the histogram as exposition format lines.
+
+        Returns:
+            The HELP, TYPE, bucket, sum and count lines.
+        """
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for upper, count in zip(self.buckets, self._counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{upper}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.sum:.6f}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from a callback when rendered, so updating costs nothing."""
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        """
+        Initializes the gauge.
+
+        Args:
+            name: The metric name.
+            help_text: The HELP line of the metric.
+            read: Returns the current value.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def render(self) -> List[str]:
+        """
+        Renders the gauge as exposition format lines.
+
+        Returns:
+            The HELP, TYPE and value lines.
+        """
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {self.read()}"]
+
+
+class Counter:
+    """Monotonic counter; inc() is a single addition."""
+
+    def __init__(self, name: str, help_text: str):
+        """
+        Initializes the counter at zero.
+
+        Args:
+            name: The metric name (by convention ending in _total).
+            help_text: The HELP line of the metric.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        """Adds to the counter."""
+        self.value += amount
+
+    def render(self) -> List[str]:
+        """
+        Renders the counter as exposition format lines.
+
+        Returns:
+            The HELP, TYPE and value lines.
+        """
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter", f"{self.name} {self.value}"]
+
+
+class MetricsRegistry:
+    """Named histograms, counters and gauges rendered together at /metrics."""
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Counter] = {}
+        self._gauges: Dict[str, Gauge] = {}
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """
+        Returns the histogram with this name, creating it on first use.
+
+        Args:
+            name: The metric name.
+            help_text: The HELP line of the metric.
+            buckets: Sorted bucket upper bounds.
+
+        Returns:
+            The registered histogram.
+        """
+        if name not in self._histograms:
+            self._histograms[name] = Histogram(name, help_text, buckets)
+        return self._histograms[name]
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        """
+        Returns the counter with this name, creating it on first use.
+
+        Args:
+            name: The metric name.
+            help_text: The HELP line of the metric.
+
+        Returns:
+            The registered counter.
+        """
+        if name not in self._counters:
+            self._counters[name] = Counter(name, help_text)
+        return self._counters[name]
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> Gauge:
+        """
+        Registers a gauge, replacing any previous one with this name.
+
+        Args:
+            name: The metric name.
+            help_text: The HELP line of the metric.
+            read: Returns the current value.
+
+        Returns:
+            The registered gauge.
+        """
+        self._gauges[name] = Gauge(name, help_text, read)
+        return self._gauges[name]
+
+    def render(self) -> str:
+        """
+        Renders every registered metric.
+
+        Returns:
+            The Prometheus text exposition (version 0.0.4).
+        """
+        lines: List[str] = []
+        for histogram in self._histograms.values():
+            lines.extend(histogram.render())
+        for counter in self._counters.values():
+            lines.extend(counter.render())
+        for gauge in self._gauges.values():
+            lines.extend(gauge.render())
+        return "\n".join(lines) + "\n"
+
+
+# Single registry for the application
+metrics_registry = MetricsRegistry()
+
+# Per-turn pipeline spans
+LISTEN_SECONDS = metrics_registry.histogram(
+    "voice_listen_seconds", "Recording start until the utterance was endpointed."
+)
+STT_SECONDS = metrics_registry.histogram(
+    "voice_stt_seconds", "Speech recognition of one utterance, including queueing for a worker."
+)
+LLM_FIRST_TOKEN_SECONDS = metrics_registry.histogram(
+    "voice_llm_first_token_seconds", "LLM request until the first streamed token (cache misses only)."
+)
+LLM_TOTAL_SECONDS = metrics_registry.histogram(
+    "voice_llm_total_seconds", "LLM request until the complete reply (cache misses only)."
+)
+TTS_FIRST_BYTE_SECONDS = metrics_registry.histogram(
+    "voice_tts_first_byte_seconds", "TTS request until the first audio byte (cache misses only)."
+)
+TTS_TOTAL_SECONDS = metrics_registry.histogram(
+    "voice_tts_total_seconds", "TTS request until the last audio byte (cache misses only)."
+)
+FIRST_AUDIO_SECONDS = metrics_registry.histogram(
+    "voice_first_audio_seconds",
+    "End of the utterance until the first reply audio frame was queued to the client (filler excluded).",
+)
+FILLER_PLAYED = metrics_registry.counter(
+    "voice_filler_played_total", "Replies preceded by filler audio because their first audio frame was late."
+)
+
+# Speculative LLM requests on partial transcripts (LLM_SPECULATION_ENABLED)
+LLM_SPECULATIONS = metrics_registry.counter(
+    "voice_llm_speculations_total", "LLM requests started for a stable partial transcript."
+)
+LLM_SPECULATION_HITS = metrics_registry.counter(
+    "voice_llm_speculation_hits_total", "Speculative LLM requests adopted because the final transcript matched."
+)
+LLM_SPECULATION_WASTED = metrics_registry.counter(
+    "voice_llm_speculation_wasted_total", "Speculative LLM requests cancelled or discarded unused."
+)
+LLM_SPECULATION_SAVED_SECONDS = metrics_registry.histogram(
+    "voice_llm_speculation_saved_seconds",
+    "Head start of an adopted speculative reply: its request until the final transcript or its first token.",
+)
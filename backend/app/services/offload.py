@@ -0,0 +1,173 @@
+# app/services/offload.py
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    """Counters for one offload stage."""
+
+    __slots__ = ("lock", "limit", "queued", "running", "started", "completed", "failed", "total_wait", "max_wait")
+
+    def __init__(self, limit: int):
+        self.lock = threading.Lock()
+        self.limit = limit
+        self.queued = 0
+        self.running = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Returns the counters as a JSON-serializable dict."""
+        return {
+            "limit": self.limit,
+            "queue_depth": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait / self.started * 1000, 2) if self.started else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+        }
+
+
+class BlockingOffloader:
+    """Runs blocking calls on a bounded thread pool with per-stage concurrency caps.
+
+    Each stage (e.g. "stt") has its own semaphore so that a burst in one stage
+    cannot occupy every worker thread. Queue depth and the time a call waits
+    before it starts running are tracked per stage.
+    """
+
+    def __init__(self, max_workers: int, stage_limits: Dict[str, int] | None = None):
+        """
+        Initializes the offloader.
+
+        Args:
+            max_workers: Size of the shared thread pool.
+            stage_limits: Maximum concurrent calls per stage name. Stages not
+                listed are only bounded by the pool size.
+        """
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._stage_limits = dict(stage_limits or {})
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, StageStats] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created lazily so the offloader can be restarted after shutdown().
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="offload")
+        return self._executor
+
+    def _stage(self, stage: str) -> tuple[asyncio.Semaphore, StageStats]:
+        if stage not in self._stats:
+            limit = min(self._stage_limits.get(stage, self.max_workers), self.max_workers)
+            self._semaphores[stage] = asyncio.Semaphore(limit)
+            self._stats[stage] = StageStats(limit)
+        return self._semaphores[stage], self._stats[stage]
+
+    async def run(self, stage: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs a blocking function in the thread pool without blocking the event loop.
+
+        The stage slot is held until the worker thread actually finishes, so a
+        cancelled caller cannot push the stage over its concurrency cap.
+
+        Args:
+            stage: The stage name used for the concurrency cap and stats.
+            func: The blocking callable.
+            *args: Positional arguments for func.
+            **kwargs: Keyword arguments for func.
+
+        Returns:
+            The return value of func.
+
+        Raises:
+            Exception: Whatever func raises is propagated unchanged.
+        """
+        semaphore, stats = self._stage(stage)
+        enqueued_at = time.perf_counter()
+        with stats.lock:
+            stats.queued += 1
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            with stats.lock:
+                stats.queued -= 1
+            raise
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._get_executor().submit(self._timed_call, stats, enqueued_at, func, *args, **kwargs)
+        except BaseException:
+            semaphore.release()
+            with stats.lock:
+                stats.queued -= 1
+            raise
+
+        def _on_done(done) -> None:
+            with stats.lock:
+                if done.cancelled():
+                    stats.queued -= 1
+                elif done.exception() is not None:
+                    stats.failed += 1
+                else:
+                    stats.completed += 1
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass # Event loop already closed (shutdown)
+
+        future.add_done_callback(_on_done)
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def _timed_call(stats: StageStats, enqueued_at: float, func: Callable[..., Any], *args, **kwargs) -> Any:
+        # Runs in the worker thread: the wait ends when the call actually starts.
+        wait = time.perf_counter() - enqueued_at
+        with stats.lock:
+            stats.queued -= 1
+            stats.running += 1
+            stats.total_wait += wait
+            stats.started += 1
+            if wait > stats.max_wait:
+                stats.max_wait = wait
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with stats.lock:
+                stats.running -= 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns a snapshot of the per-stage counters.
+
+        Returns:
+            A dict mapping stage name to its counters.
+        """
+        return {stage: stage_stats.as_dict() for stage, stage_stats in self._stats.items()}
+
+    def shutdown(self) -> None:
+        """Stops accepting work and releases idle worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        logger.info("Blocking offloader shut down.")
+
+
+# Single instance of the offloader
+blocking_offloader = BlockingOffloader(
+    max_workers=settings.OFFLOAD_MAX_WORKERS,
+    # The conversation store relies on a single writer thread
+    stage_limits={"stt": settings.STT_MAX_CONCURRENCY, "conversation_store": 1},
+)
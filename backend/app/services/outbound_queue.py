@@ -0,0 +1,267 @@
+# app/services/outbound_queue.py
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Tuple
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to clients that cannot keep up ("Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+# Close code sent to clients whose session was evicted as idle or over budget ("Going Away")
+EVICTED_CLOSE_CODE = 1001
+
+
+def wire_size(message: str | bytes) -> int:
+    """
+    Returns the bytes a message occupies on the wire.
+
+    Args:
+        message: A text message or a binary frame.
+
+    Returns:
+        The UTF-8 length of a text message, or the length of a binary frame.
+    """
+    return len(message.encode("utf-8")) if isinstance(message, str) else len(message)
+
+
+class OutboundQueue:
+    """Bounded send queue drained by a dedicated writer task per connection.
+
+    Pipelines enqueue instead of awaiting the socket, so a slow client cannot
+    stall them for longer than put_timeout per audio frame. Control messages
+    (text, or binary frames of the framed protocol) are never dropped and are
+    not held back by the byte budget; audio frames wait briefly for space and
+    are dropped when none frees up, and are coalesced into the last queued
+    frame once max_messages is reached. A client
+    that stays over budget for slow_consumer_seconds, or whose socket blocks a
+    single send for send_timeout, is disconnected.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        max_bytes: int,
+        max_messages: int,
+        put_timeout: float,
+        send_timeout: float,
+        slow_consumer_seconds: float,
+        coalesce: Callable[[bytes, bytes], bytes | None] | None = None,
+    ):
+        """
+        Initializes the queue. Call start() to launch the writer task.
+
+        Args:
+            websocket: The accepted WebSocket.
+            client_id: The client identifier (for logging).
+            max_bytes: Byte budget of queued audio.
+            max_messages: Queue length after which audio frames are coalesced.
+            put_timeout: Seconds an audio frame waits for space before it is dropped.
+            send_timeout: Seconds a single send may block before disconnecting.
+            slow_consumer_seconds: Seconds over budget before disconnecting.
+            coalesce: Merges an audio frame into the queued frame before it,
+                returning None when they cannot be merged. Defaults to
+                concatenation (raw PCM).
+        """
+        self.websocket = websocket
+        self.client_id = client_id
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self.put_timeout = put_timeout
+        self.send_timeout = send_timeout
+        self.slow_consumer_seconds = slow_consumer_seconds
+        self.closed = False
+        self.slow_consumer = False
+        self.coalesce = coalesce or bytes.__add__
+        self._queue: Deque[Tuple[str | bytes, bool]] = deque() # (message, is audio)
+        self._bytes = 0
+        self._in_flight = 0
+        self._over_since: float | None = None
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._writer: asyncio.Task | None = None
+        self._closer: asyncio.Task | None = None
+        self.max_depth = 0
+        self.sent_messages = 0
+        self.sent_bytes = 0
+        self.dropped_frames = 0
+        self.dropped_bytes = 0
+        self.flushed_frames = 0
+        self.coalesced = 0
+
+    def start(self) -> None:
+        """Launches the writer task."""
+        self._writer = asyncio.get_running_loop().create_task(self._write(), name=f"writer:{self.client_id}")
+
+    def _append(self, message: str | bytes, audio: bool) -> None:
+        self._queue.append((message, audio))
+        self._bytes += wire_size(message)
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._wakeup.set()
+
+    def put_text(self, message: str | bytes, flush_audio: bool = False) -> None:
+        """
+        Enqueues a control message. Never blocks and never drops.
+
+        Args:
+            message: The text message, or a binary control frame.
+            flush_audio: Drop audio frames still queued ahead of this message,
+                e.g. when the reply they belong to was interrupted.
+        """
+        if self.closed:
+            return
+        if flush_audio:
+            kept = deque(entry for entry in self._queue if not entry[1])
+            self.flushed_frames += len(self._queue) - len(kept)
+            self._queue = kept
+            self._bytes = sum(wire_size(message) for message, _ in kept)
+            self._space.set()
+        self._append(message, audio=False)
+
+    async def put_audio(self, frame: bytes) -> bool:
+        """
+        Enqueues an audio frame, waiting up to put_timeout for space.
+
+        Args:
+            frame: The binary audio frame.
+
+        Returns:
+            False if the frame was dropped.
+        """
+        size = len(frame)
+        if self._bytes + size > self.max_bytes and not self.closed:
+            self._mark_over_budget()
+            deadline = time.monotonic() + self.put_timeout
+            while self._bytes + size > self.max_bytes and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._space.clear()
+                try:
+                    await asyncio.wait_for(self._space.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        if self.closed or self._bytes + size > self.max_bytes:
+            self.dropped_frames += 1
+            self.dropped_bytes += size
+            return False
+        if len(self._queue) >= self.max_messages and self._queue[-1][1]:
+            queued = self._queue[-1][0]
+            merged = self.coalesce(queued, frame)
+            if merged is not None:
+                self._queue[-1] = (merged, True)
+                self._bytes += len(merged) - len(queued)
+                self.coalesced += 1
+                self._wakeup.set()
+                return True
+        self._append(frame, audio=True)
+        return True
+
+    def _mark_over_budget(self) -> None:
+        now = time.monotonic()
+        if self._over_since is None:
+            self._over_since = now
+        elif now - self._over_since >= self.slow_consumer_seconds:
+            self._close_slow_consumer(f"over its {self.max_bytes} byte send budget for {self.slow_consumer_seconds}s")
+
+    async def _write(self) -> None:
+        # close() also cancels the task, but wait_for() can swallow a cancellation
+        # that arrives as the send completes, so the closed flag ends the loop
+        while not self.closed:
+            while not self._queue and not self.closed:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            if self.closed:
+                return
+            message, _ = self._queue.popleft()
+            size = wire_size(message)
+            self._bytes -= size
+            self._in_flight = size
+            try:
+                if isinstance(message, bytes):
+                    await asyncio.wait_for(self.websocket.send_bytes(message), self.send_timeout)
+                else:
+                    await asyncio.wait_for(self.websocket.send_text(message), self.send_timeout)
+            except asyncio.TimeoutError:
+                self._close_slow_consumer(f"blocked a send for {self.send_timeout}s")
+                return
+            except Exception as e:
+                logger.error(f"Error sending to {self.client_id}, dropping its send queue: {e}")
+                self._stop()
+                return
+            finally:
+                self._in_flight = 0
+            self.sent_messages += 1
+            self.sent_bytes += size
+            # Hysteresis: a client hovering at the budget is still a slow consumer
+            if self._bytes <= self.max_bytes // 2:
+                self._over_since = None
+            if self._bytes < self.max_bytes:
+                self._space.set()
+
+    def _stop(self) -> None:
+        self.closed = True
+        self._queue.clear()
+        self._bytes = 0
+        self._space.set()
+        self._wakeup.set()
+
+    def _close_slow_consumer(self, reason: str) -> None:
+        if self.closed:
+            return
+        logger.warning(f"Disconnecting slow consumer {self.client_id}: {reason}")
+        self.slow_consumer = True
+        self._stop()
+        self._closer = asyncio.get_running_loop().create_task(self._close_socket(SLOW_CONSUMER_CLOSE_CODE))
+
+    def evict(self) -> None:
+        """Closes the connection of an evicted session; the endpoint then cleans up as on any disconnect."""
+        if self.closed:
+            return
+        self._stop()
+        self._closer = asyncio.get_running_loop().create_task(self._close_socket(EVICTED_CLOSE_CODE))
+
+    async def _close_socket(self, code: int) -> None:
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), self.send_timeout)
+        except Exception as e:
+            logger.debug(f"Closing connection of {self.client_id} with code {code} failed: {e}")
+
+    def close(self) -> None:
+        """Stops the writer task and discards queued messages."""
+        self._stop()
+        if self._writer is not None:
+            self._writer.cancel()
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes queued plus the frame being sent."""
+        return self._bytes + self._in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns queue depth, bytes queued and in flight, and drop counters.
+
+        Returns:
+            A JSON-serializable dict of counters.
+        """
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self.max_depth,
+            "queued_bytes": self._bytes,
+            "in_flight_bytes": self._in_flight,
+            "sent_messages": self.sent_messages,
+            "sent_bytes": self.sent_bytes,
+            "dropped_frames": self.dropped_frames,
+            "dropped_bytes": self.dropped_bytes,
+            "flushed_frames": self.flushed_frames,
+            "coalesced_frames": self.coalesced,
+            "over_budget_ms": int((time.monotonic() - self._over_since) * 1000) if self._over_since else 0,
+            "slow_consumer": self.slow_consumer,
+        }
@@ -0,0 +1,393 @@
+# app/services/provider_scheduler.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict
+
+from app.core.config import settings
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Provider names
+STT = "stt"
+LLM = "llm"
+TTS = "tts"
+
+# Requests not made on behalf of a client (e.g. canned message rendering)
+SYSTEM_CLIENT = "_system"
+
+
+class ProviderBusy(Exception):
+    """Raised when a provider is saturated and a request is refused instead of queued."""
+
+    def __init__(self, provider: str, reason: str):
+        super().__init__(f"{provider} is busy: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate tokens per second, up to burst."""
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Initializes a full bucket.
+
+        Args:
+            rate: Tokens added per second.
+            burst: Bucket capacity.
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self, now: float) -> bool:
+        """Returns True if a token can be taken now."""
+        self._refill(now)
+        return self._tokens >= 1.0
+
+    def take(self, now: float) -> None:
+        """Takes one token; call available() first."""
+        self._refill(now)
+        self._tokens -= 1.0
+
+    def wait_time(self, now: float, tokens: int = 1) -> float:
+        """
+        Returns the seconds until the given number of tokens are available.
+
+        Args:
+            now: The current monotonic time.
+            tokens: Tokens needed.
+        """
+        self._refill(now)
+        return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def drain(self, now: float) -> None:
+        """Empties the bucket, e.g. after the provider itself rate limited us."""
+        self._refill(now)
+        self._tokens = 0.0
+
+
+class ProviderLimiter:
+    """Rate limit, concurrency cap and fair queue in front of one provider.
+
+    A request proceeds at once when a token and a concurrency slot are free
+    and nobody is queued. Otherwise it waits in its client's queue; clients
+    are served round robin, so one chatty client cannot starve the others.
+    Requests are refused with ProviderBusy instead of queued when the queue
+    is full or the expected wait exceeds max_wait. The expected wait is
+    derived from the token rate and the average time a slot is held.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_concurrency: int,
+        max_queue: int,
+        max_wait: float,
+        wait_histogram: metrics.Histogram,
+    ):
+        """
+        Initializes the limiter.
+
+        Args:
+            name: The provider name, used in errors and stats.
+            rate: Requests per second allowed on average.
+            burst: Requests allowed at once after an idle period.
+            max_concurrency: Requests in flight at once.
+            max_queue: Requests waiting at once; further ones are refused.
+            max_wait: Longest expected or actual wait before a request is refused.
+            wait_histogram: Records the queue wait of every admitted request.
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.wait_histogram = wait_histogram
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        self._active = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._avg_hold = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.throttled = 0
+
+    def expected_wait(self, client_id: str) -> float:
+        """
+        Estimates how long a request of a client arriving now would wait.
+
+        With round robin service, a client's request only waits for as many
+        requests of each other client as the client itself has queued, plus one.
+
+        Args:
+            client_id: The client making the request.
+        """
+        now = time.monotonic()
+        own = len(self._waiting.get(client_id, ()))
+        ahead = sum(min(len(waiters), own + 1) for waiters in self._waiting.values()) + 1
+        by_rate = self.bucket.wait_time(now, ahead)
+        over = self._active + ahead - self.max_concurrency
+        by_concurrency = over / self.max_concurrency * self._avg_hold if over > 0 else 0.0
+        return max(by_rate, by_concurrency)
+
+    def has_capacity(self) -> bool:
+        """Returns True if a request arriving now would be admitted without queueing."""
+        return not self._waiting and self._active < self.max_concurrency and self.bucket.available(time.monotonic())
+
+    def check(self, client_id: str) -> None:
+        """
+        Refuses a request that would be queued for too long.
+
+        Args:
+            client_id: The client making the request.
+
+        Raises:
+            ProviderBusy: If the queue is full or the expected wait exceeds max_wait.
+        """
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise ProviderBusy(self.name, f"{self._queued} requests queued")
+        expected = self.expected_wait(client_id)
+        if expected > self.max_wait:
+            self.rejected += 1
+            raise ProviderBusy(self.name, f"expected wait {expected:.1f}s")
+
+    async def acquire(self, client_id: str) -> float:
+        """
+        Waits for a slot; pair every successful call with release().
+
+        Args:
+            client_id: The client the request is made for.
+
+        Returns:
+            The seconds spent waiting.
+
+        Raises:
+            ProviderBusy: If the request was refused or waited for max_wait.
+        """
+        now = time.monotonic()
+        if self.has_capacity():
+            self.bucket.take(now)
+            self._admit(0.0)
+            return 0.0
+        self.check(client_id)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(client_id, deque()).append(future)
+        self._queued += 1
+        self._dispatch()
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            self._forget(client_id, future)
+            self.timed_out += 1
+            raise ProviderBusy(self.name, f"waited {self.max_wait}s") from None
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller was cancelled: hand the slot on
+                self._active -= 1
+                self._dispatch()
+            else:
+                self._forget(client_id, future)
+            raise
+        waited = time.monotonic() - now
+        self._admit(waited)
+        return waited
+
+    def _admit(self, waited: float) -> None:
+        self.admitted += 1
+        self.wait_histogram.observe(waited)
+
+    def _forget(self, client_id: str, future: asyncio.Future) -> None:
+        waiters = self._waiting.get(client_id)
+        if waiters is None:
+            return
+        if future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+        if not waiters:
+            del self._waiting[client_id]
+
+    def release(self, acquired_at: float) -> None:
+        """
+        Frees the slot of a finished request and admits the next waiter.
+
+        Args:
+            acquired_at: Monotonic time the slot was acquired, for the average hold time.
+        """
+        self._active -= 1
+        hold = time.monotonic() - acquired_at
+        self._avg_hold = hold if not self._avg_hold else 0.9 * self._avg_hold + 0.1 * hold
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while self._waiting and self._active < self.max_concurrency:
+            if not self.bucket.available(now):
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(self.bucket.wait_time(now), self._on_timer)
+                return
+            # Serve the client at the head, then move it behind the others
+            client_id, waiters = next(iter(self._waiting.items()))
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._waiting.move_to_end(client_id)
+            else:
+                del self._waiting[client_id]
+            if future.done():
+                continue # Timed out or cancelled; its token and slot stay free
+            self.bucket.take(now)
+            self._active += 1
+            future.set_result(None)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def penalize(self) -> None:
+        """Empties the token bucket after the provider answered with a rate limit error."""
+        self.throttled += 1
+        self.bucket.drain(time.monotonic())
+        logger.warning(f"{self.name} rate limited us; pausing new requests for {1 / self.bucket.rate:.2f}s")
+
+    @asynccontextmanager
+    async def slot(self, client_id: str) -> AsyncIterator[float]:
+        """
+        Holds a slot for the duration of the block.
+
+        Args:
+            client_id: The client the request is made for.
+
+        Yields:
+            The seconds spent waiting.
+        """
+        waited = await self.acquire(client_id)
+        acquired_at = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(acquired_at)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns queue depth, slots in use and admission counters.
+
+        Returns:
+            A JSON-serializable dict of counters.
+        """
+        return {
+            "rate_per_second": self.bucket.rate,
+            "burst": self.bucket.burst,
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queued": self._queued,
+            "queued_clients": len(self._waiting),
+            "expected_wait_ms": int(self.expected_wait(SYSTEM_CLIENT) * 1000), # for a client with nothing queued
+            "avg_hold_ms": int(self._avg_hold * 1000),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "throttled": self.throttled,
+            "wait_p50_ms": round(self.wait_histogram.quantile(0.5) * 1000, 1),
+            "wait_p95_ms": round(self.wait_histogram.quantile(0.95) * 1000, 1),
+        }
+
+
+class ProviderScheduler:
+    """The limiters of all providers, with admission control for whole turns."""
+
+    def __init__(self, limiters: Dict[str, ProviderLimiter]):
+        """
+        Initializes the scheduler.
+
+        Args:
+            limiters: Limiter per provider name.
+        """
+        self.limiters = limiters
+        self.refused_turns = 0
+
+    def admit(self, client_id: str) -> None:
+        """
+        Refuses a new turn up front if any provider it needs is saturated.
+
+        A turn needs every provider, so refusing it before STT saves the
+        earlier stages' quota when a later one would refuse anyway.
+
+        Args:
+            client_id: The client starting the turn.
+
+        Raises:
+            ProviderBusy: If a provider would refuse the turn's request.
+        """
+        for limiter in self.limiters.values():
+            try:
+                limiter.check(client_id)
+            except ProviderBusy as e:
+                self.refused_turns += 1
+                logger.warning(f"Refusing turn of {client_id}: {e}")
+                raise
+
+    def slot(self, provider: str, client_id: str):
+        """
+        Returns a context manager holding a slot of a provider.
+
+        Args:
+            provider: STT, LLM or TTS.
+            client_id: The client the request is made for.
+        """
+        return self.limiters[provider].slot(client_id)
+
+    def penalize(self, provider: str) -> None:
+        """
+        Backs off a provider after it answered with a rate limit error.
+
+        Args:
+            provider: STT, LLM or TTS.
+        """
+        self.limiters[provider].penalize()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the counters of every provider.
+
+        Returns:
+            A JSON-serializable dict of counters.
+        """
+        return {"refused_turns": self.refused_turns, **{name: l.stats() for name, l in self.limiters.items()}}
+
+
+def _limiter(name: str, rate: float, burst: int, max_concurrency: int) -> ProviderLimiter:
+    return ProviderLimiter(
+        name,
+        rate=rate,
+        burst=burst,
+        max_concurrency=max_concurrency,
+        max_queue=settings.PROVIDER_MAX_QUEUE,
+        max_wait=settings.PROVIDER_MAX_WAIT_SECONDS,
+        wait_histogram=metrics.metrics_registry.histogram(
+            f"voice_{name}_queue_wait_seconds",
+            f"Wait for a {name.upper()} rate limit or concurrency slot (admitted requests).",
+            metrics.QUEUE_WAIT_BUCKETS,
+        ),
+    )
+
+
+# Single instance of the scheduler
+provider_scheduler = ProviderScheduler({
+    STT: _limiter(STT, settings.STT_RATE_PER_SECOND, settings.STT_BURST, settings.STT_MAX_CONCURRENCY),
+    LLM: _limiter(LLM, settings.LLM_RATE_PER_SECOND, settings.LLM_BURST, settings.LLM_MAX_CONCURRENCY),
+    TTS: _limiter(TTS, settings.TTS_RATE_PER_SECOND, settings.TTS_BURST, settings.TTS_MAX_CONCURRENCY),
+})
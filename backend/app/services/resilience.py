@@ -0,0 +1,589 @@
+# app/services/resilience.py
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, Tuple, TypeVar
+
+import speech_recognition as sr
+from google.api_core.exceptions import ServerError
+from openai import APIConnectionError, InternalServerError
+
+from app.core.config import settings
+from app.services.provider_scheduler import LLM, STT, TTS, ProviderBusy, ProviderScheduler, provider_scheduler
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Marks an attempt whose stream ended before producing anything
+_END = object()
+
+
+class ProviderTimeout(Exception):
+    """Raised when a provider produced no result, or stalled mid-stream, for too long."""
+
+    def __init__(self, provider: str, seconds: float):
+        super().__init__(f"{provider} did not respond within {seconds}s")
+        self.provider = provider
+        self.seconds = seconds
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Returns True for failures worth retrying: timeouts, connection errors and 5xx answers.
+
+    Rate limits are not transient here; the provider scheduler backs off instead.
+
+    Args:
+        error: The exception raised by a provider call.
+    """
+    if isinstance(error, (ProviderTimeout, ServerError, APIConnectionError, InternalServerError)):
+        return True
+    return isinstance(error, sr.RequestError) and "Too Many Requests" not in str(error)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Closed, calls pass. After failure_threshold transient failures in a row the
+    circuit opens and calls are refused for reset_seconds. Then it is half
+    open: a single trial call passes, and its outcome closes or reopens the
+    circuit. A trial that never reports back (e.g. it was cancelled) is
+    replaced after another reset_seconds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        """
+        Initializes a closed circuit.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit.
+            reset_seconds: Seconds calls are refused before a trial call.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._changed_at = 0.0
+        self.opened = 0
+
+    def allow(self) -> bool:
+        """Returns True if a call may be made now; in the half-open state this starts the trial."""
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if now - self._changed_at < self.reset_seconds:
+            return False
+        # Open long enough, or the previous trial never reported back
+        self.state = self.HALF_OPEN
+        self._changed_at = now
+        return True
+
+    def would_allow(self) -> bool:
+        """Returns True if allow() would pass, without starting a trial."""
+        return self.state == self.CLOSED or time.monotonic() - self._changed_at >= self.reset_seconds
+
+    def record_success(self) -> None:
+        """Closes the circuit and resets the failure count."""
+        self._failures = 0
+        if self.state != self.CLOSED:
+            logger.info("Circuit closed after a successful trial call")
+            self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        """Counts a transient failure; opens the circuit at the threshold or on a failed trial."""
+        self._failures += 1
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self._changed_at = time.monotonic()
+            self.opened += 1
+
+
+class LatencyWindow:
+    """The most recent latencies, for quantiles that follow the provider's current behaviour."""
+
+    def __init__(self, size: int = 200):
+        """
+        Initializes an empty window.
+
+        Args:
+            size: Observations kept.
+        """
+        self._values: Deque[float] = deque(maxlen=size)
+        self._sorted: list = []
+        self._stale = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def observe(self, value: float) -> None:
+        """Records one latency in seconds."""
+        self._values.append(value)
+        self._stale += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns a quantile of the window, re-sorted at most every tenth of the window.
+
+        Args:
+            q: The quantile in [0, 1].
+        """
+        if not self._values:
+            return 0.0
+        if self._stale * 10 >= self._values.maxlen or not self._sorted:
+            self._sorted = sorted(self._values)
+            self._stale = 0
+        return self._sorted[min(len(self._sorted) - 1, int(q * len(self._sorted)))]
+
+
+class _StallTimer:
+    """Times out single awaits on a stream with one lazily re-armed timer.
+
+    A timer per await (asyncio.wait_for) costs a task per chunk. Here the
+    timer is only re-armed when it fires, so arming an await is a clock read.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._loop = asyncio.get_running_loop()
+        self._task: asyncio.Task | None = None
+        self._since = 0.0
+        self._handle: asyncio.TimerHandle | None = None
+        self._fired = False
+
+    async def next(self, iterator: AsyncIterator[T]) -> T:
+        """
+        Awaits the next item of an iterator.
+
+        Raises:
+            TimeoutError: If the item took longer than timeout.
+            StopAsyncIteration: At the end of the iterator.
+        """
+        self._task = asyncio.current_task()
+        self._since = self._loop.time()
+        if self._handle is None:
+            self._handle = self._loop.call_at(self._since + self.timeout, self._check)
+        try:
+            return await iterator.__anext__()
+        except asyncio.CancelledError:
+            if self._fired and self._task.uncancel() == 0:
+                raise TimeoutError() from None
+            raise
+        finally:
+            self._task = None
+
+    def _check(self) -> None:
+        self._handle = None
+        if self._task is None:
+            return # Not waiting; the next await re-arms
+        due = self._since + self.timeout
+        if self._loop.time() >= due:
+            self._fired = True
+            self._task.cancel()
+        else:
+            self._handle = self._loop.call_at(due, self._check)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+
+async def _single(start: Callable[[], Awaitable[T]]) -> AsyncIterator[T]:
+    yield await start()
+
+
+class ProviderGuard:
+    """Timeouts, retries, hedging and a circuit breaker around the calls to one provider.
+
+    Each attempt must produce its first result (first token, first audio
+    byte or the whole response) within timeout. A transient failure or
+    timeout is retried after a jittered exponential backoff, up to retries
+    times. With hedging on, a second attempt is started when the first has
+    not produced its first result within the hedge quantile of recent
+    attempts, and whichever answers first is used; the other is cancelled.
+    Only one hedge is sent per call, and only while the provider's rate
+    limiter has spare capacity.
+
+    Retries and hedges only happen before the first result is passed on, so
+    a caller never sees a result twice. After that, a stalled or failed
+    stream is an error.
+
+    Background calls (e.g. pre-rendering canned audio at startup) get the
+    same timeouts and retries but are never hedged, and neither consult nor
+    update the circuit breaker, so they cannot refuse or admit client turns.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        stall_timeout: float,
+        retries: int,
+        retry_base: float,
+        retry_max: float,
+        hedge: bool,
+        hedge_quantile: float,
+        hedge_min_samples: int,
+        breaker: CircuitBreaker,
+        has_capacity: Callable[[], bool] = lambda: True,
+    ):
+        """
+        Initializes the guard.
+
+        Args:
+            name: The provider name, used in errors and stats.
+            timeout: Seconds an attempt may take to produce its first result.
+            stall_timeout: Seconds a stream may take for each later item.
+            retries: Attempts made after a transient failure or timeout.
+            retry_base: Backoff scale; retry n waits uniformly up to retry_base * 2**(n - 1).
+            retry_max: Longest backoff.
+            hedge: Whether to send hedged requests.
+            hedge_quantile: Quantile of recent first-result latencies after which to hedge.
+            hedge_min_samples: Observed latencies needed before hedging.
+            breaker: The provider's circuit breaker.
+            has_capacity: Returns True if the provider can take another request without queueing.
+        """
+        self.name = name
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.retries = retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker
+        self.has_capacity = has_capacity
+        self.latencies = LatencyWindow()
+        self.calls = 0
+        self.attempts = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.refused = 0
+
+    def hedge_delay(self) -> float | None:
+        """Returns the seconds after which to hedge, or None while hedging is off or unwarranted."""
+        if not self.hedge or len(self.latencies) < self.hedge_min_samples:
+            return None
+        return self.latencies.quantile(self.hedge_quantile)
+
+    def backoff(self, retry: int) -> float:
+        """
+        Returns a full-jitter backoff before a retry.
+
+        Args:
+            retry: The retry number, from 1.
+        """
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** (retry - 1)))
+
+    def check(self) -> None:
+        """
+        Refuses calls while the circuit is open.
+
+        Raises:
+            ProviderBusy: If the circuit is open.
+        """
+        if not self.breaker.would_allow():
+            raise ProviderBusy(self.name, "circuit open")
+
+    async def call(self, start: Callable[[], Awaitable[T]], hedge: bool = True, background: bool = False) -> T:
+        """
+        Makes a single-result call with timeouts, retries and hedging.
+
+        Args:
+            start: Starts one attempt; called again for every retry and hedge.
+            hedge: False for calls off the critical path, or with a latency
+                unlike the provider's usual calls; they are neither hedged nor
+                counted in the hedge quantile.
+            background: True for calls made on no client's behalf; they are
+                not hedged and bypass the circuit breaker.
+
+        Returns:
+            The result of the first attempt to succeed.
+
+        Raises:
+            ProviderBusy: If the circuit is open.
+            ProviderTimeout: If the last attempt timed out.
+            Exception: The error of the last failed attempt.
+        """
+        results = self.stream(lambda: _single(start), hedge, background)
+        try:
+            return await results.__anext__()
+        finally:
+            await results.aclose()
+
+    async def stream(
+        self, start: Callable[[], AsyncIterator[T]], hedge: bool = True, background: bool = False
+    ) -> AsyncIterator[T]:
+        """
+        Streams the items of a call with timeouts, retries and hedging.
+
+        Args:
+            start: Starts one attempt and returns its items; called again for
+                every retry and hedge. Attempts should hold their rate limiter
+                slot while iterated.
+            hedge: As for call().
+            background: As for call().
+
+        Yields:
+            The items of the attempt that produced its first item first.
+
+        Raises:
+            ProviderBusy: If the circuit is open.
+            ProviderTimeout: If no attempt produced a first item in time, or the stream stalled.
+            Exception: The error of the last failed attempt, or of the stream after its first item.
+        """
+        self.calls += 1
+        if not background and not self.breaker.allow():
+            self.refused += 1
+            raise ProviderBusy(self.name, "circuit open")
+        iterator, first = await self._first_item(start, hedge and not background, background)
+        stall = _StallTimer(self.stall_timeout)
+        try:
+            if not background:
+                self.breaker.record_success()
+            if first is _END:
+                return
+            yield first
+            while True:
+                try:
+                    item = await stall.next(iterator)
+                except StopAsyncIteration:
+                    return
+                except TimeoutError:
+                    self.timeouts += 1
+                    self._failed(background)
+                    raise ProviderTimeout(self.name, self.stall_timeout) from None
+                except Exception as e:
+                    if is_transient(e):
+                        self._failed(background)
+                    raise
+                yield item
+        finally:
+            stall.close()
+            await self._discard(None, iterator)
+
+    def _failed(self, background: bool = False) -> None:
+        self.failures += 1
+        if background:
+            return
+        self.breaker.record_failure()
+        if self.breaker.state == CircuitBreaker.OPEN:
+            logger.warning(f"{self.name} circuit open after {self.failures} failures; refusing calls")
+
+    async def _first_item(
+        self, start: Callable[[], AsyncIterator[T]], hedge: bool, background: bool
+    ) -> Tuple[AsyncIterator[T], Any]:
+        """Runs attempts until one produces its first item; returns its iterator and the item (or _END)."""
+        loop = asyncio.get_running_loop()
+        running: Dict[asyncio.Future, Tuple[AsyncIterator[T], float, bool]] = {}
+        hedge_delay = self.hedge_delay() if hedge else None
+        hedge_pending = hedge_delay is not None
+        failures = 0
+        retry_at: float | None = None
+        error: BaseException | None = None
+
+        def launch(hedge: bool) -> None:
+            self.attempts += 1
+            iterator = start()
+            running[asyncio.ensure_future(iterator.__anext__())] = (iterator, loop.time(), hedge)
+
+        def failed(failure: BaseException) -> None:
+            nonlocal failures, retry_at, error
+            error = failure
+            if not is_transient(failure):
+                if not running:
+                    raise failure
+                return # The other attempt may still succeed
+            failures += 1
+            self._failed(background)
+            if running:
+                return
+            if failures > self.retries:
+                raise failure
+            if not background and not self.breaker.allow():
+                self.refused += 1
+                raise ProviderBusy(self.name, "circuit open") from failure
+            retry_at = loop.time() + self.backoff(failures)
+
+        launch(False)
+        try:
+            while True:
+                now = loop.time()
+                if retry_at is not None and now >= retry_at:
+                    retry_at = None
+                    self.retried += 1
+                    launch(False)
+                wake = [started + self.timeout for _, started, _ in running.values()]
+                if retry_at is not None:
+                    wake.append(retry_at)
+                if hedge_pending and len(running) == 1:
+                    (_, started, _), = running.values()
+                    if now >= started + hedge_delay:
+                        hedge_pending = False
+                        if self.has_capacity() and self.breaker.state == CircuitBreaker.CLOSED:
+                            self.hedged += 1
+                            launch(True)
+                        continue
+                    wake.append(started + hedge_delay)
+                timeout = max(0.0, min(wake) - now)
+                if not running:
+                    await asyncio.sleep(timeout)
+                    continue
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    iterator, started, is_hedge = running.pop(future)
+                    failure = future.exception()
+                    if failure is None or isinstance(failure, StopAsyncIteration):
+                        now = loop.time()
+                        if hedge:
+                            self.latencies.observe(now - started)
+                            for _, other_started, _ in running.values():
+                                # A lower bound of the loser's latency keeps the quantile honest
+                                self.latencies.observe(now - other_started)
+                        self.hedge_wins += is_hedge
+                        return iterator, (_END if failure is not None else future.result())
+                    await self._discard(None, iterator)
+                    failed(failure)
+                now = loop.time()
+                for future, (iterator, started, _) in list(running.items()):
+                    if now >= started + self.timeout:
+                        del running[future]
+                        await self._discard(future, iterator)
+                        self.timeouts += 1
+                        failed(ProviderTimeout(self.name, self.timeout))
+                if error is not None and not running and retry_at is None:
+                    raise error
+        finally:
+            for future, (iterator, _, _) in running.items():
+                await self._discard(future, iterator)
+
+    @staticmethod
+    async def _discard(future: asyncio.Future | None, iterator: AsyncIterator) -> None:
+        """Cancels an attempt and closes its stream, releasing its rate limiter slot and connection."""
+        if future is not None and not future.done():
+            future.cancel()
+            await asyncio.gather(future, return_exceptions=True)
+        try:
+            await iterator.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing abandoned provider stream: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns attempt, retry, hedge and failure counters and the circuit state.
+
+        Returns:
+            A JSON-serializable dict of counters.
+        """
+        hedge_delay = self.hedge_delay()
+        return {
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retried": self.retried,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_after_ms": round(hedge_delay * 1000, 1) if hedge_delay is not None else None,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "refused": self.refused,
+        }
+
+
+class ProviderResilience:
+    """The guards of all providers, with admission control for whole turns."""
+
+    def __init__(self, guards: Dict[str, ProviderGuard]):
+        """
+        Initializes the guards.
+
+        Args:
+            guards: Guard per provider name.
+        """
+        self.guards = guards
+
+    def admit(self, providers: Iterable[str]) -> None:
+        """
+        Refuses a new turn up front while the circuit of a provider it needs is open.
+
+        Args:
+            providers: The providers the turn will call.
+
+        Raises:
+            ProviderBusy: If a circuit is open.
+        """
+        for provider in providers:
+            self.guards[provider].check()
+
+    def call(
+        self, provider: str, start: Callable[[], Awaitable[T]], hedge: bool = True, background: bool = False
+    ) -> Awaitable[T]:
+        """
+        Makes a single-result provider call through its guard.
+
+        Args:
+            provider: STT, LLM or TTS.
+            start: Starts one attempt.
+            hedge: See ProviderGuard.call().
+            background: See ProviderGuard.call().
+        """
+        return self.guards[provider].call(start, hedge, background)
+
+    def stream(
+        self, provider: str, start: Callable[[], AsyncIterator[T]], hedge: bool = True, background: bool = False
+    ) -> AsyncIterator[T]:
+        """
+        Makes a streaming provider call through its guard.
+
+        Args:
+            provider: STT, LLM or TTS.
+            start: Starts one attempt and returns its items.
+            hedge: See ProviderGuard.call().
+            background: See ProviderGuard.call().
+        """
+        return self.guards[provider].stream(start, hedge, background)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the counters of every provider.
+
+        Returns:
+            A JSON-serializable dict of counters.
+        """
+        return {name: guard.stats() for name, guard in self.guards.items()}
+
+
+def _guard(name: str, timeout: float, hedge: bool, scheduler: ProviderScheduler) -> ProviderGuard:
+    return ProviderGuard(
+        name,
+        timeout=timeout,
+        stall_timeout=settings.PROVIDER_STALL_SECONDS,
+        retries=settings.PROVIDER_RETRIES,
+        retry_base=settings.PROVIDER_RETRY_BASE_SECONDS,
+        retry_max=settings.PROVIDER_RETRY_MAX_SECONDS,
+        hedge=hedge,
+        hedge_quantile=settings.HEDGE_QUANTILE,
+        hedge_min_samples=settings.HEDGE_MIN_SAMPLES,
+        breaker=CircuitBreaker(settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_RESET_SECONDS),
+        has_capacity=scheduler.limiters[name].has_capacity,
+    )
+
+
+# Single instance of the provider guards
+provider_resilience = ProviderResilience({
+    STT: _guard(STT, settings.STT_TIMEOUT_SECONDS, settings.STT_HEDGE_ENABLED, provider_scheduler),
+    LLM: _guard(LLM, settings.LLM_TIMEOUT_SECONDS, settings.LLM_HEDGE_ENABLED, provider_scheduler),
+    TTS: _guard(TTS, settings.TTS_TIMEOUT_SECONDS, settings.TTS_HEDGE_ENABLED, provider_scheduler),
+})
@@ -0,0 +1,257 @@
+# app/services/session_registry.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+from app.core.config import settings
+from app.services.history import ConversationHistory
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Session:
+    """Registry entry of one client."""
+
+    __slots__ = ("history", "last_active", "nbytes")
+
+    def __init__(self, history: ConversationHistory, last_active: float):
+        self.history = history
+        self.last_active = last_active
+        self.nbytes = history.nbytes
+
+
+class SessionRegistry:
+    """Conversation histories of the clients of this process, with memory budgets.
+
+    Entries are kept in least recently active order, so the idle sweep and the
+    global budget only look at the entries they evict. Every history is held
+    to session_max_bytes by dropping its oldest turns (the conversation store
+    keeps the durable copy); beyond max_bytes in total, the least recently
+    active sessions are evicted. A background sweeper evicts sessions idle for
+    idle_seconds. on_evict is called for every evicted session, so the
+    connection of an abandoned tab can be closed as well.
+    """
+
+    def __init__(
+        self,
+        idle_seconds: float,
+        sweep_interval: float,
+        session_max_bytes: int,
+        max_bytes: int,
+    ):
+        """
+        Initializes an empty registry. Call start() from the event loop to run the sweeper.
+
+        Args:
+            idle_seconds: Sessions without activity for longer are evicted.
+            sweep_interval: Seconds between idle sweeps.
+            session_max_bytes: Memory budget of one history.
+            max_bytes: Memory budget of all histories together.
+        """
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        self.session_max_bytes = session_max_bytes
+        self.max_bytes = max_bytes
+        self.on_evict: Callable[[str], None] | None = None
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._bytes = 0
+        self._sweeper: asyncio.Task | None = None
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_budget = 0
+        self.trimmed_turns = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self._sessions
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by all histories."""
+        return self._bytes
+
+    def create(self, client_id: str, state: Dict[str, Any] | None = None) -> ConversationHistory:
+        """
+        Registers a new history for a client, replacing any previous one.
+
+        Args:
+            client_id: The client identifier.
+            state: A saved history to restore (ConversationHistory.to_dict()), or None.
+
+        Returns:
+            The registered history.
+        """
+        if state is None:
+            history = ConversationHistory(settings.HISTORY_CHAR_BUDGET, settings.HISTORY_SUMMARY_MAX_CHARS)
+        else:
+            history = ConversationHistory.from_dict(
+                state, settings.HISTORY_CHAR_BUDGET, settings.HISTORY_SUMMARY_MAX_CHARS
+            )
+        self.remove(client_id)
+        history.drop_oldest(self.session_max_bytes)
+        session = _Session(history, time.monotonic())
+        self._sessions[client_id] = session
+        self._bytes += session.nbytes
+        self.created += 1
+        self._enforce_budget()
+        return history
+
+    def get(self, client_id: str) -> ConversationHistory | None:
+        """
+        Returns a client's history.
+
+        Args:
+            client_id: The client identifier.
+
+        Returns:
+            The history, or None if the client has none (never created or evicted).
+        """
+        session = self._sessions.get(client_id)
+        return session.history if session is not None else None
+
+    def touch(self, client_id: str) -> None:
+        """
+        Marks a client as active, postponing its idle eviction.
+
+        Args:
+            client_id: The client identifier.
+        """
+        session = self._sessions.get(client_id)
+        if session is not None:
+            session.last_active = time.monotonic()
+            self._sessions.move_to_end(client_id)
+
+    def account(self, client_id: str) -> int:
+        """
+        Updates a client's memory usage after its history changed, enforcing the budgets.
+
+        Args:
+            client_id: The client identifier.
+
+        Returns:
+            The number of turns dropped to fit the per-session budget.
+        """
+        session = self._sessions.get(client_id)
+        if session is None:
+            return 0
+        dropped = session.history.drop_oldest(self.session_max_bytes)
+        if dropped:
+            self.trimmed_turns += dropped
+            logger.warning(f"Dropped {dropped} old turns of {client_id} over its {self.session_max_bytes} byte budget")
+        nbytes = session.history.nbytes
+        self._bytes += nbytes - session.nbytes
+        session.nbytes = nbytes
+        self.touch(client_id)
+        self._enforce_budget()
+        return dropped
+
+    def remove(self, client_id: str) -> bool:
+        """
+        Drops a client's history.
+
+        Args:
+            client_id: The client identifier.
+
+        Returns:
+            True if the client had a history.
+        """
+        session = self._sessions.pop(client_id, None)
+        if session is None:
+            return False
+        self._bytes -= session.nbytes
+        return True
+
+    def _enforce_budget(self) -> None:
+        # The most recently active session is never evicted for the budget
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            client_id, session = self._sessions.popitem(last=False)
+            self._bytes -= session.nbytes
+            self.evicted_budget += 1
+            logger.warning(f"Evicted session {client_id}: sessions hold over {self.max_bytes} bytes")
+            self._notify_evicted(client_id)
+
+    def _notify_evicted(self, client_id: str) -> None:
+        if self.on_evict is not None:
+            try:
+                self.on_evict(client_id)
+            except Exception as e:
+                logger.error(f"Eviction handler failed for {client_id}: {e}")
+
+    def sweep(self) -> int:
+        """
+        Evicts sessions idle for longer than idle_seconds.
+
+        Returns:
+            The number of evicted sessions.
+        """
+        cutoff = time.monotonic() - self.idle_seconds
+        evicted = 0
+        while self._sessions:
+            client_id, session = next(iter(self._sessions.items()))
+            if session.last_active > cutoff:
+                break
+            self.remove(client_id)
+            evicted += 1
+            self._notify_evicted(client_id)
+        if evicted:
+            self.evicted_idle += evicted
+            logger.info(f"Evicted {evicted} sessions idle for over {self.idle_seconds}s ({len(self)} remain)")
+        return evicted
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
+
+    def start(self) -> None:
+        """Starts the idle sweeper task."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop(), name="session-sweeper")
+
+    async def close(self) -> None:
+        """Stops the idle sweeper task."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns session count, bytes held and eviction counters.
+
+        Returns:
+            A JSON-serializable dict of counters.
+        """
+        oldest = next(iter(self._sessions.values()), None)
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "session_max_bytes": self.session_max_bytes,
+            "idle_seconds": self.idle_seconds,
+            "oldest_idle_seconds": round(time.monotonic() - oldest.last_active, 1) if oldest else 0.0,
+            "created": self.created,
+            "evicted_idle": self.evicted_idle,
+            "evicted_budget": self.evicted_budget,
+            "trimmed_turns": self.trimmed_turns,
+        }
+
+
+# Single instance of the session registry
+session_registry = SessionRegistry(
+    idle_seconds=settings.SESSION_IDLE_SECONDS,
+    sweep_interval=settings.SESSION_SWEEP_INTERVAL,
+    session_max_bytes=settings.SESSION_MAX_BYTES,
+    max_bytes=settings.SESSIONS_MAX_BYTES,
+)
+metrics.metrics_registry.gauge(
+    "voice_sessions", "Conversation histories held in memory.", lambda: len(session_registry)
+)
+metrics.metrics_registry.gauge(
+    "voice_session_bytes", "Approximate memory held by conversation histories.", lambda: session_registry.nbytes
+)
@@ -0,0 +1,221 @@
+# app/services/session_store.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from app.core.config import settings
+from app.utils.file_utils import ensure_directory_exists
+from app.services.offload import BlockingOffloader, blocking_offloader
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """Per-client session state shared by every worker process.
+
+    The base class keeps state in process memory, which is only correct with a
+    single worker. Each WebSocket connection claims its client id with an owner
+    token; saves and releases by a connection that has since been superseded
+    (e.g. a reconnect routed to another worker) are ignored.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._sessions: Dict[str, tuple[str, Dict[str, Any]]] = {}
+        self.claims = 0
+        self.saves = 0
+        self.stale_writes = 0
+
+    async def claim(self, client_id: str, owner: str) -> Dict[str, Any] | None:
+        """
+        Takes ownership of a client's session.
+
+        Args:
+            client_id: The client identifier.
+            owner: A token unique to the claiming connection.
+
+        Returns:
+            The stored state, or None for a new session.
+        """
+        self.claims += 1
+        _, state = self._sessions.get(client_id, (owner, None))
+        self._sessions[client_id] = (owner, state)
+        return state
+
+    async def save(self, client_id: str, owner: str, state: Dict[str, Any]) -> bool:
+        """
+        Stores a client's state if the connection still owns the session.
+
+        Args:
+            client_id: The client identifier.
+            owner: The token passed to claim().
+            state: A JSON-serializable state snapshot.
+
+        Returns:
+            False if another connection has claimed the session since.
+        """
+        current = self._sessions.get(client_id)
+        if current is None or current[0] != owner:
+            self.stale_writes += 1
+            return False
+        self._sessions[client_id] = (owner, state)
+        self.saves += 1
+        return True
+
+    async def release(self, client_id: str, owner: str) -> None:
+        """
+        Drops a client's session if the connection still owns it.
+
+        Args:
+            client_id: The client identifier.
+            owner: The token passed to claim().
+        """
+        current = self._sessions.get(client_id)
+        if current is not None and current[0] == owner:
+            del self._sessions[client_id]
+
+    def count(self) -> int:
+        """Returns the number of stored sessions."""
+        return len(self._sessions)
+
+    def close(self) -> None:
+        """Releases resources held by the store."""
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns store counters.
+
+        Returns:
+            A JSON-serializable dict of counters.
+        """
+        return {
+            "backend": self.name,
+            "sessions": self.count(),
+            "claims": self.claims,
+            "saves": self.saves,
+            "stale_writes": self.stale_writes,
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    """Session state in a SQLite database in WAL mode, shared by workers on one host.
+
+    Each process keeps one connection; queries run on the "session_store"
+    offload stage so they never block the event loop.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Path, offloader: BlockingOffloader = blocking_offloader):
+        """
+        Initializes the store. The database is opened on first use.
+
+        Args:
+            path: The database file.
+            offloader: Thread pool the queries run on.
+        """
+        super().__init__()
+        self.path = path
+        self.offloader = offloader
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            ensure_directory_exists(self.path.parent)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "client_id TEXT PRIMARY KEY, owner TEXT NOT NULL, state TEXT, updated_at REAL NOT NULL)"
+            )
+            self._conn = conn
+            logger.info(f"SQLite session store opened at {self.path}")
+        return self._conn
+
+    def _run(self, func, *args) -> Any:
+        # Runs in a worker thread; the lock serializes use of the shared connection.
+        with self._lock:
+            return func(self._connection(), *args)
+
+    @staticmethod
+    def _claim(conn: sqlite3.Connection, client_id: str, owner: str) -> str | None:
+        row = conn.execute(
+            "INSERT INTO sessions (client_id, owner, state, updated_at) VALUES (?, ?, NULL, ?) "
+            "ON CONFLICT(client_id) DO UPDATE SET owner = excluded.owner, updated_at = excluded.updated_at "
+            "RETURNING state",
+            (client_id, owner, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _save(conn: sqlite3.Connection, client_id: str, owner: str, state: str) -> bool:
+        cursor = conn.execute(
+            "UPDATE sessions SET state = ?, updated_at = ? WHERE client_id = ? AND owner = ?",
+            (state, time.time(), client_id, owner),
+        )
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def _release(conn: sqlite3.Connection, client_id: str, owner: str) -> None:
+        conn.execute("DELETE FROM sessions WHERE client_id = ? AND owner = ?", (client_id, owner))
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    async def claim(self, client_id: str, owner: str) -> Dict[str, Any] | None:
+        self.claims += 1
+        state = await self.offloader.run("session_store", self._run, self._claim, client_id, owner)
+        return json.loads(state) if state else None
+
+    async def save(self, client_id: str, owner: str, state: Dict[str, Any]) -> bool:
+        encoded = json.dumps(state, ensure_ascii=False)
+        saved = await self.offloader.run("session_store", self._run, self._save, client_id, owner, encoded)
+        if saved:
+            self.saves += 1
+        else:
+            self.stale_writes += 1
+        return saved
+
+    async def release(self, client_id: str, owner: str) -> None:
+        await self.offloader.run("session_store", self._run, self._release, client_id, owner)
+
+    def count(self) -> int:
+        return self._run(self._count)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_session_store(backend: str = settings.SESSION_STORE) -> SessionStore:
+    """
+    Builds the configured session store.
+
+    Args:
+        backend: "memory" (single worker only) or "sqlite".
+
+    Returns:
+        The session store.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend == "memory":
+        return SessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore(settings.SESSION_STORE_PATH)
+    raise ValueError(f"Unknown session store backend: {backend}")
+
+
+# Single instance of the session store
+session_store = create_session_store()
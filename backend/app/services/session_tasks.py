@@ -0,0 +1,92 @@
+# app/services/session_tasks.py
+import asyncio
+import logging
+from typing import Coroutine, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SessionTaskManager:
+    """Tracks the in-flight STT→LLM→TTS pipeline of each client.
+
+    At most one pipeline runs per client. Starting a new one cancels the
+    previous pipeline and waits for it to unwind before the new one begins, so
+    two replies never interleave on the same socket.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.cancelled = 0
+
+    def start(self, client_id: str, coro: Coroutine) -> asyncio.Task:
+        """
+        Runs a pipeline for a client, replacing any pipeline already running.
+
+        Args:
+            client_id: The client identifier.
+            coro: The pipeline coroutine.
+
+        Returns:
+            The task running the pipeline.
+        """
+        previous = self._tasks.get(client_id)
+        if previous is not None and not previous.done():
+            previous.cancel()
+            self.cancelled += 1
+            logger.info(f"Cancelled in-flight pipeline for {client_id} (new utterance)")
+        task = asyncio.create_task(self._run_after(previous, coro), name=f"pipeline:{client_id}")
+        self._tasks[client_id] = task
+        self.started += 1
+
+        def _forget(done: asyncio.Task) -> None:
+            if self._tasks.get(client_id) is done:
+                del self._tasks[client_id]
+
+        task.add_done_callback(_forget)
+        return task
+
+    @staticmethod
+    async def _run_after(previous: asyncio.Task | None, coro: Coroutine) -> None:
+        try:
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+        except asyncio.CancelledError:
+            coro.close()
+            raise
+        await coro
+
+    async def cancel(self, client_id: str) -> bool:
+        """
+        Cancels the client's pipeline and waits until it has unwound.
+
+        Args:
+            client_id: The client identifier.
+
+        Returns:
+            True if a running pipeline was cancelled.
+        """
+        task = self._tasks.pop(client_id, None)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        self.cancelled += 1
+        try:
+            await task
+        except asyncio.CancelledError:
+            # Re-raise if the caller itself is being cancelled, not just the pipeline
+            current = asyncio.current_task()
+            if current is not None and current.cancelling():
+                raise
+        except Exception as e:
+            logger.error(f"Pipeline for {client_id} failed while cancelling: {e}")
+        logger.info(f"Cancelled in-flight pipeline for {client_id}")
+        return True
+
+    def active_count(self) -> int:
+        """Returns the number of clients with a running pipeline."""
+        return sum(1 for task in self._tasks.values() if not task.done())
+
+
+# Single instance of the task manager
+session_tasks = SessionTaskManager()
@@ -0,0 +1,195 @@
+# app/services/speculation.py
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Callable, List
+
+from app.services import metrics
+from app.services.answer_cache import normalize_question
+from app.services.history import ConversationHistory
+from app.services.stt import STTStream
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeReply:
+    """An LLM reply requested for a partial transcript before the utterance ended.
+
+    The reply is streamed in the background and its pieces are buffered
+    until the turn adopts it; nothing is added to the conversation history
+    until then. A discarded reply closes its upstream stream.
+    """
+
+    def __init__(self, text: str, history: ConversationHistory, contents: List, pieces: AsyncIterator[str]):
+        """
+        Starts buffering the reply.
+
+        Args:
+            text: The partial transcript the reply answers.
+            history: The client's history the request was made from.
+            contents: The history sent with the request.
+            pieces: The reply's text deltas, as streamed by the LLM.
+        """
+        self.text = text
+        self.key = normalize_question(text)
+        self.history = history
+        self.contents = contents
+        self.started_at = time.perf_counter()
+        self.first_token_at: float | None = None
+        self.failed = False
+        self._buffer: asyncio.Queue = asyncio.Queue() # pieces, then None or the exception that stopped the stream
+        self._task = asyncio.create_task(self._pump(pieces))
+        metrics.LLM_SPECULATIONS.inc()
+
+    def matches(self, text: str, history: ConversationHistory) -> bool:
+        """
+        Tells whether the reply answers a final transcript.
+
+        Args:
+            text: The final transcript.
+            history: The client's current history.
+
+        Returns:
+            True if the transcripts are equal after normalization, the history
+            has not changed since the request and the request has not failed.
+        """
+        return (
+            not self.failed
+            and self.key == normalize_question(text)
+            and self.history is history
+            and self.contents == history.to_contents()
+        )
+
+    def adopt(self) -> None:
+        """Records that the turn uses the reply, and the latency that saved."""
+        adopted_at = time.perf_counter()
+        ready_at = adopted_at if self.first_token_at is None else min(self.first_token_at, adopted_at)
+        metrics.LLM_SPECULATION_HITS.inc()
+        metrics.LLM_SPECULATION_SAVED_SECONDS.observe(ready_at - self.started_at)
+        logger.info(f"Adopted the speculative reply started {int((adopted_at - self.started_at) * 1000)}ms ago")
+
+    def discard(self) -> None:
+        """Cancels the reply; its upstream call is counted as wasted."""
+        metrics.LLM_SPECULATION_WASTED.inc()
+        self._task.cancel()
+
+    async def pieces(self) -> AsyncIterator[str]:
+        """
+        Streams the adopted reply, first the buffered pieces, then the rest as it arrives.
+
+        Yields:
+            Pieces of the reply text in order.
+
+        Raises:
+            Exception: The error that stopped the LLM stream.
+        """
+        try:
+            while True:
+                piece = await self._buffer.get()
+                if piece is None:
+                    return
+                if isinstance(piece, Exception):
+                    raise piece
+                yield piece
+        finally:
+            # An abandoned reply stops its upstream stream
+            self._task.cancel()
+
+    async def _pump(self, pieces: AsyncIterator[str]) -> None:
+        try:
+            async for piece in pieces:
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                self._buffer.put_nowait(piece)
+            self._buffer.put_nowait(None)
+        except Exception as e:
+            logger.info(f"Speculative LLM request for '{self.text}' failed: {e}")
+            self.failed = True
+            self._buffer.put_nowait(e)
+        finally:
+            await pieces.aclose()
+
+
+class Speculator:
+    """Requests the reply to an utterance while it is still being spoken.
+
+    Watches the utterance's partial transcripts: once one has been stable
+    for stable_seconds, start() requests a reply for it. A partial that
+    changes (after normalization) discards the reply in flight. At the end
+    of the utterance take() hands over the reply if it answers the final
+    transcript; a closed speculator discards it.
+    """
+
+    def __init__(
+        self,
+        transcription: STTStream,
+        start: Callable[[str], SpeculativeReply | None],
+        stable_seconds: float,
+    ):
+        """
+        Starts watching the utterance.
+
+        Args:
+            transcription: The utterance's transcription stream.
+            start: Requests a speculative reply for a partial transcript;
+                returns None if no request was made.
+            stable_seconds: How long a partial transcript must stay unchanged.
+        """
+        self.transcription = transcription
+        self.start = start
+        self.stable_seconds = stable_seconds
+        self.reply: SpeculativeReply | None = None
+        self.closed = False
+        self._timer: asyncio.TimerHandle | None = None
+        transcription.listeners.append(self._on_partial)
+        transcription.close_callbacks.append(self.close)
+
+    def take(self, text: str, history: ConversationHistory) -> SpeculativeReply | None:
+        """
+        Stops speculating and returns the reply to adopt for the final transcript.
+
+        Args:
+            text: The final transcript.
+            history: The client's current history.
+
+        Returns:
+            The adopted reply, or None if there is none or it does not match
+            (it is then discarded).
+        """
+        reply, self.reply = self.reply, None
+        self.close()
+        if reply is None:
+            return None
+        if reply.matches(text, history):
+            reply.adopt()
+            return reply
+        logger.info(f"Speculative reply for '{reply.text}' does not answer '{text}'; discarded")
+        reply.discard()
+        return None
+
+    def close(self) -> None:
+        """Stops speculating and discards the reply in flight."""
+        self.closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.reply is not None:
+            self.reply.discard()
+            self.reply = None
+
+    def _on_partial(self, text: str) -> None:
+        if self.closed:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        if self.reply is not None and self.reply.key != normalize_question(text):
+            self.reply.discard()
+            self.reply = None
+        self._timer = asyncio.get_running_loop().call_later(self.stable_seconds, self._speculate)
+
+    def _speculate(self) -> None:
+        self._timer = None
+        text = self.transcription.partial
+        if self.closed or self.reply is not None or not normalize_question(text):
+            return
+        self.reply = self.start(text)
@@ -0,0 +1,315 @@
+# app/services/stt.py
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, List
+
+import speech_recognition as sr
+
+from app.core.config import settings
+from app.services.offload import BlockingOffloader, blocking_offloader
+
+logger = logging.getLogger(__name__)
+
+
+class STTStream:
+    """One utterance being transcribed.
+
+    The ingest session feeds the utterance's PCM as it arrives and the
+    pipeline calls finish() at the end of the utterance. Streaming backends
+    recognize while the child is still speaking and publish partial
+    hypotheses, so finish() only has to wait for the last chunk; the base
+    class has a BatchSTTBackend recognize the whole utterance in finish().
+    Recognition errors are raised as speech_recognition's UnknownValueError
+    (nothing understood) and RequestError (service failure) for every backend.
+    """
+
+    def __init__(self, backend: "STTBackend", client_id: str, sample_rate: int):
+        """
+        Initializes the stream.
+
+        Args:
+            backend: The backend that opened the stream.
+            client_id: The client whose utterance this is.
+            sample_rate: Sample rate of the Int16 PCM fed to the stream.
+        """
+        self.backend = backend
+        self.client_id = client_id
+        self.sample_rate = sample_rate
+        self.fed_bytes = 0
+        self.partial = "" # latest partial hypothesis
+        self.partial_at = 0.0 # time.perf_counter() at which it last changed
+        self.listeners: List[Callable[[str], None]] = [] # called with every new partial hypothesis
+        self.close_callbacks: List[Callable[[], None]] = [] # called when the transcript is no longer needed
+        self._final: asyncio.Future | None = None
+
+    def feed(self, pcm: bytes | memoryview) -> None:
+        """
+        Adds the next chunk of the utterance.
+
+        Args:
+            pcm: Little-endian Int16 PCM at sample_rate.
+        """
+        self.fed_bytes += len(pcm)
+
+    async def finish(self, audio_data: sr.AudioData) -> str:
+        """
+        Ends the utterance and returns its final transcript.
+
+        The utterance is recognized once: concurrent and repeated calls
+        (hedges and retries) share the first call's result or error, and
+        cancelling one caller does not stop recognition for the others.
+
+        Args:
+            audio_data: The whole utterance, as buffered by ingest. Streaming
+                backends only use it if nothing was fed.
+
+        Returns:
+            The final transcript.
+
+        Raises:
+            sr.UnknownValueError: If no speech was recognized.
+            sr.RequestError: If the recognition service failed.
+        """
+        if self._final is None:
+            if not self.fed_bytes:
+                self.feed(audio_data.frame_data)
+            self._final = asyncio.ensure_future(self._recognize(audio_data))
+        return await asyncio.shield(self._final)
+
+    @property
+    def failed(self) -> bool:
+        """Whether recognition has ended without a transcript; finish() would raise again."""
+        return self._final is not None and self._final.done() and (
+            self._final.cancelled() or self._final.exception() is not None
+        )
+
+    def close(self) -> None:
+        """Stops recognition of an utterance whose transcript is no longer needed."""
+        if self._final is not None and not self._final.done():
+            self._final.cancel()
+        for callback in self.close_callbacks:
+            callback()
+
+    async def _recognize(self, audio_data: sr.AudioData) -> str:
+        return await self.backend.recognize(audio_data)
+
+    def _set_partial(self, text: str) -> None:
+        if text == self.partial:
+            return
+        self.partial = text
+        self.partial_at = time.perf_counter()
+        logger.debug(f"Partial transcript for {self.client_id}: {text}")
+        for listener in self.listeners:
+            listener(text)
+
+
+class STTBackend(ABC):
+    """A speech recognition engine; opens one STTStream per utterance."""
+
+    name = ""
+    streaming = False # recognizes while audio is fed and publishes partial transcripts
+
+    @abstractmethod
+    def open(self, client_id: str, sample_rate: int) -> STTStream:
+        """
+        Starts transcribing an utterance.
+
+        Args:
+            client_id: The client.
+            sample_rate: Sample rate of the PCM that will be fed.
+
+        Returns:
+            The utterance's stream.
+        """
+
+
+class BatchSTTBackend(STTBackend):
+    """An engine that recognizes whole utterances once they have ended."""
+
+    def open(self, client_id: str, sample_rate: int) -> STTStream:
+        return STTStream(self, client_id, sample_rate)
+
+    @abstractmethod
+    async def recognize(self, audio_data: sr.AudioData) -> str:
+        """
+        Recognizes a whole utterance.
+
+        Args:
+            audio_data: The utterance.
+
+        Returns:
+            The transcript.
+        """
+
+
+class GoogleSTTBackend(BatchSTTBackend):
+    """Google Web Speech recognition of whole utterances, once they have ended."""
+
+    name = "google"
+
+    def __init__(self, offloader: BlockingOffloader = blocking_offloader):
+        """
+        Initializes the backend.
+
+        Args:
+            offloader: Thread pool for the blocking recognition calls.
+        """
+        self.offloader = offloader
+        self.recognizer = sr.Recognizer()
+
+    async def recognize(self, audio_data: sr.AudioData) -> str:
+        return await self.offloader.run(
+            "stt", self.recognizer.recognize_google, audio_data, language=settings.SR_LANGUAGE
+        )
+
+
+class VoskStream(STTStream):
+    """An utterance recognized by Vosk as it is fed.
+
+    Chunks fed while the recognizer is busy are joined and accepted in one
+    call, so a slow recognizer catches up instead of falling further behind.
+    """
+
+    def __init__(self, backend: "VoskSTTBackend", client_id: str, sample_rate: int):
+        super().__init__(backend, client_id, sample_rate)
+        self._recognizer = backend.vosk.KaldiRecognizer(backend.model, sample_rate)
+        self._pending: List[bytes] = []
+        self._segments: List[str] = [] # text of segments the recognizer closed at pauses
+        self._worker: asyncio.Task | None = None
+
+    def feed(self, pcm: bytes | memoryview) -> None:
+        super().feed(pcm)
+        self._pending.append(bytes(pcm))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.ensure_future(self._accept_pending())
+
+    def close(self) -> None:
+        super().close()
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+
+    async def _accept_pending(self) -> None:
+        while self._pending:
+            chunk = b"".join(self._pending)
+            self._pending.clear()
+            segment, partial = await self.backend.offloader.run("stt", self._accept, chunk)
+            if segment:
+                self._segments.append(segment)
+            self._set_partial(" ".join(self._segments + [partial]).strip())
+
+    def _accept(self, chunk: bytes) -> tuple[str, str]:
+        # Runs on a worker thread; returns (closed segment, partial of the open one)
+        if self._recognizer.AcceptWaveform(chunk):
+            return json.loads(self._recognizer.Result()).get("text", ""), ""
+        return "", json.loads(self._recognizer.PartialResult()).get("partial", "")
+
+    async def _recognize(self, audio_data: sr.AudioData) -> str:
+        while self._worker is not None and not self._worker.done():
+            await self._worker
+        last = await self.backend.offloader.run("stt", self._recognizer.FinalResult)
+        text = " ".join(self._segments + [json.loads(last).get("text", "")]).strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class VoskSTTBackend(STTBackend):
+    """Offline recognition on the CPU with Vosk (Kaldi), streaming partial transcripts.
+
+    Needs the vosk package and a model for SR_LANGUAGE at STT_VOSK_MODEL_PATH
+    (e.g. vosk-model-small-ja-0.22); the model is loaded once at startup.
+    """
+
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, offloader: BlockingOffloader = blocking_offloader):
+        """
+        Loads the model.
+
+        Args:
+            offloader: Thread pool for the blocking recognizer calls.
+
+        Raises:
+            ImportError: If the vosk package is not installed.
+        """
+        try:
+            import vosk
+        except ImportError as e:
+            raise ImportError("STT_BACKEND=vosk needs the vosk package (pip install vosk)") from e
+        self.offloader = offloader
+        self.vosk = vosk
+        vosk.SetLogLevel(-1)
+        self.model = vosk.Model(str(settings.STT_VOSK_MODEL_PATH))
+        logger.info(f"Vosk model loaded from {settings.STT_VOSK_MODEL_PATH}")
+
+    def open(self, client_id: str, sample_rate: int) -> STTStream:
+        return VoskStream(self, client_id, sample_rate)
+
+
+class StubStream(STTStream):
+    """A deterministic transcript revealed at a fixed rate as audio is fed."""
+
+    def feed(self, pcm: bytes | memoryview) -> None:
+        super().feed(pcm)
+        seconds = self.fed_bytes / (self.sample_rate * 2)
+        text = self.backend.text
+        self._set_partial(text[:min(len(text), int(seconds * settings.STT_STUB_CHARS_PER_SECOND))])
+
+    async def _recognize(self, audio_data: sr.AudioData) -> str:
+        if not any(audio_data.frame_data):
+            raise sr.UnknownValueError()
+        return self.backend.text
+
+
+class StubSTTBackend(STTBackend):
+    """Deterministic recognition for tests and benchmarks: every utterance with
+    any non-silent audio is transcribed as STT_STUB_TEXT, with partial
+    transcripts growing STT_STUB_CHARS_PER_SECOND characters per second of audio.
+    """
+
+    name = "stub"
+    streaming = True
+
+    def __init__(self, text: str = settings.STT_STUB_TEXT):
+        """
+        Initializes the backend.
+
+        Args:
+            text: The transcript of every utterance.
+        """
+        self.text = text
+
+    def open(self, client_id: str, sample_rate: int) -> STTStream:
+        return StubStream(self, client_id, sample_rate)
+
+
+def create_stt_backend(backend: str = settings.STT_BACKEND) -> STTBackend:
+    """
+    Builds the configured speech recognition backend.
+
+    Args:
+        backend: "google" (batch, Google Web Speech), "vosk" (offline,
+            streaming) or "stub" (deterministic).
+
+    Returns:
+        The backend.
+
+    Raises:
+        ValueError: If the backend is unknown.
+        ImportError: If the backend's package is not installed.
+    """
+    if backend == "google":
+        return GoogleSTTBackend()
+    if backend == "vosk":
+        return VoskSTTBackend()
+    if backend == "stub":
+        return StubSTTBackend()
+    raise ValueError(f"Unknown STT backend: {backend}")
+
+
+# Single instance of the speech recognition backend
+stt_backend = create_stt_backend()
@@ -0,0 +1,285 @@
+# app/services/tts_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict
+
+from app.core.config import settings
+from app.utils.file_utils import ensure_directory_exists
+from app.services.offload import blocking_offloader
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE_SUFFIX = ".audio"
+
+
+def tts_cache_key(text: str, response_format: str | None = None) -> str:
+    """
+    Builds the content address of a TTS rendering.
+
+    Args:
+        text: The text to synthesize.
+        response_format: The requested audio format (TTS_RESPONSE_FORMAT by default).
+
+    Returns:
+        A hex SHA-256 over every setting that affects the audio, plus the text.
+    """
+    material = json.dumps(
+        [
+            settings.TTS_MODEL_NAME,
+            settings.TTS_VOICE,
+            settings.TTS_INSTRUCTIONS,
+            response_format or settings.TTS_RESPONSE_FORMAT,
+            text,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Two-tier cache of synthesized audio keyed by tts_cache_key.
+
+    The memory tier is an LRU bounded by total bytes. The disk tier stores one
+    file per key and serves hits through mmap, so disk hits are not copied into
+    the Python heap. Concurrent misses for the same key can be coalesced with
+    begin()/complete()/abandon().
+    """
+
+    def __init__(
+        self,
+        memory_max_bytes: int,
+        disk_dir: Path | None = None,
+        disk_max_bytes: int = 0,
+        max_entry_bytes: int = settings.TTS_CACHE_MAX_ENTRY_BYTES,
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            memory_max_bytes: Byte budget of the in-memory LRU.
+            disk_dir: Directory of the on-disk tier, or None to disable it.
+            disk_max_bytes: Byte budget of the on-disk tier (0 disables it).
+            max_entry_bytes: Larger renderings are not cached.
+        """
+        self.memory_max_bytes = memory_max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.disk_dir = disk_dir if disk_dir is not None and disk_max_bytes > 0 else None
+        self.disk_max_bytes = disk_max_bytes
+        self._disk_ready = False
+        self._disk_writing: set[str] = set()
+        self._disk_tasks: set[asyncio.Task] = set()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bytes_served = 0
+
+    def load(self) -> None:
+        """
+        Indexes the on-disk tier. Until this is called only the memory tier is used.
+        """
+        if self.disk_dir is None or self._disk_ready:
+            return
+        try:
+            ensure_directory_exists(self.disk_dir)
+        except OSError:
+            logger.error(f"TTS disk cache disabled; cannot use {self.disk_dir}")
+            self.disk_dir = None
+            return
+        files = sorted(self.disk_dir.glob(f"*{CACHE_FILE_SUFFIX}"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self._disk[path.stem] = size
+            self._disk_bytes += size
+        self._evict_disk()
+        self._disk_ready = True
+        logger.info(f"TTS disk cache at {self.disk_dir}: {len(self._disk)} entries, {self._disk_bytes} bytes")
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}{CACHE_FILE_SUFFIX}"
+
+    def get(self, key: str) -> bytes | memoryview | None:
+        """
+        Looks up a rendering in memory, then on disk.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The audio bytes (memory hit), a memoryview over an mmap (disk hit),
+            or None on a miss.
+        """
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.hits_memory += 1
+            self.bytes_served += len(data)
+            return data
+        if self._disk_ready and key in self._disk:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable TTS disk cache entry {key}: {e}")
+                self._disk_bytes -= self._disk.pop(key)
+            else:
+                self._disk.move_to_end(key)
+                self.hits_disk += 1
+                self.bytes_served += len(mapped)
+                return memoryview(mapped)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Stores a rendering in the memory tier and writes it to the disk tier.
+
+        Must be called from the event loop; the disk write runs in the background.
+
+        Args:
+            key: The cache key.
+            data: The complete audio bytes.
+        """
+        size = len(data)
+        if not size or size > self.max_entry_bytes:
+            return
+        if key not in self._memory and size <= self.memory_max_bytes:
+            self._memory[key] = data
+            self._memory_bytes += size
+            while self._memory_bytes > self.memory_max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+        if self._disk_ready and key not in self._disk and key not in self._disk_writing:
+            self._disk_writing.add(key)
+            task = asyncio.get_running_loop().create_task(self._store_disk(key, data))
+            self._disk_tasks.add(task)
+            task.add_done_callback(self._disk_tasks.discard)
+
+    async def _store_disk(self, key: str, data: bytes) -> None:
+        try:
+            await blocking_offloader.run("cache_io", self._write_file, self._disk_path(key), data)
+        except OSError as e:
+            logger.error(f"Failed to write TTS disk cache entry {key}: {e}")
+            return
+        finally:
+            self._disk_writing.discard(key)
+        self._disk[key] = len(data)
+        self._disk_bytes += len(data)
+        self._evict_disk()
+
+    @staticmethod
+    def _write_file(path: Path, data: bytes) -> None:
+        # Runs in a worker thread; the rename makes the entry appear atomically.
+        # The pid keeps workers sharing the cache directory from clobbering each other.
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _evict_disk(self) -> None:
+        while self._disk_bytes > self.disk_max_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                self._disk_path(key).unlink()
+            except OSError as e:
+                logger.warning(f"Failed to evict TTS disk cache entry {key}: {e}")
+
+    def begin(self, key: str) -> tuple[asyncio.Future, bool]:
+        """
+        Registers the caller as the producer of a missing key, unless one exists.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The key's in-flight future and whether the caller is its producer.
+            A producer synthesizes and then passes the future to complete() or
+            abandon(); any other caller awaits it for the producer's audio.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return future, False
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future, True
+
+    def _release(self, key: str, future: asyncio.Future, data: bytes | None) -> None:
+        """
+        Resolves a producer's future and unregisters it if it is still the key's in-flight entry.
+
+        Args:
+            key: The cache key.
+            future: The future begin() returned to the producer.
+            data: The audio for waiters, or None if they must synthesize themselves.
+        """
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.done():
+            future.set_result(data)
+
+    def complete(self, key: str, data: bytes, future: asyncio.Future) -> None:
+        """
+        Stores a finished rendering and wakes coalesced waiters.
+
+        Args:
+            key: The cache key.
+            data: The complete audio bytes.
+            future: The future begin() returned to the producer.
+        """
+        self.put(key, data)
+        self._release(key, future, data)
+
+    def abandon(self, key: str, future: asyncio.Future) -> None:
+        """
+        Releases a key whose synthesis failed or was cancelled.
+
+        Waiters are resolved with None and call begin() again.
+
+        Args:
+            key: The cache key.
+            future: The future begin() returned to the producer.
+        """
+        self._release(key, future, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns hit/miss counters and the bytes held by each tier.
+
+        Returns:
+            A JSON-serializable dict of counters.
+        """
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0,
+            "bytes_served": self.bytes_served,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "inflight": len(self._inflight),
+        }
+
+
+# Single instance of the TTS cache
+tts_cache = TTSCache(
+    memory_max_bytes=settings.TTS_CACHE_MEMORY_BYTES,
+    disk_dir=settings.TTS_CACHE_DIR,
+    disk_max_bytes=settings.TTS_CACHE_DISK_BYTES,
+)
@@ -0,0 +1,180 @@
+# app/services/vad.py
+import numpy as np
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Events returned by StreamingEndpointer.process
+SPEECH_START = "speech_start"
+END_OF_UTTERANCE = "end_of_utterance"
+NO_SPEECH_TIMEOUT = "no_speech_timeout"
+
+
+def _run_lengths(flags: np.ndarray, carry: int) -> np.ndarray:
+    """
+    Returns, for every position, the length of the run of True values ending there.
+
+    Args:
+        flags: Boolean array.
+        carry: Length of the True run that ended just before flags[0].
+
+    Returns:
+        An int array of run lengths (0 where flags is False).
+    """
+    idx = np.arange(flags.size)
+    last_false = np.maximum.accumulate(np.where(flags, -1, idx))
+    runs = idx - last_false
+    # Positions before the first False continue the previous run.
+    runs[last_false < 0] += carry
+    return runs
+
+
+class StreamingEndpointer:
+    """Energy/zero-crossing voice activity detector with trailing-silence endpointing.
+
+    Features for all complete frames in a chunk are computed at once with NumPy.
+    A frame counts as speech when its energy exceeds an adaptive noise floor by
+    VAD_ENERGY_RATIO, or exceeds it by VAD_FRICATIVE_RATIO with a high
+    zero-crossing rate (unvoiced consonants). The noise floor tracks non-speech
+    frames with an exponential moving average.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = settings.AUDIO_INPUT_SAMPLE_RATE,
+        frame_ms: int = settings.VAD_FRAME_MS,
+        start_ms: int = settings.VAD_START_MS,
+        hangover_ms: int = settings.VAD_HANGOVER_MS,
+        no_speech_timeout: float = settings.SR_TIMEOUT,
+        max_utterance: float = settings.SR_PHRASE_TIME_LIMIT,
+    ):
+        """
+        Initializes the endpointer.
+
+        Args:
+            sample_rate: Sample rate of the Int16 PCM stream in Hz.
+            frame_ms: Analysis frame length in milliseconds.
+            start_ms: Consecutive speech needed to declare speech start.
+            hangover_ms: Trailing silence after speech that ends the utterance.
+            no_speech_timeout: Seconds without speech before giving up.
+            max_utterance: Seconds of speech after which the utterance is cut.
+        """
+        self.sample_rate = sample_rate
+        self.frame_len = max(1, sample_rate * frame_ms // 1000)
+        self.frame_ms = frame_ms
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.timeout_frames = int(no_speech_timeout * 1000 // frame_ms)
+        self.max_frames = int(max_utterance * 1000 // frame_ms)
+        self.energy_ratio = settings.VAD_ENERGY_RATIO
+        self.fricative_ratio = settings.VAD_FRICATIVE_RATIO
+        self.fricative_zcr = settings.VAD_FRICATIVE_ZCR
+        self.min_energy = settings.VAD_MIN_ENERGY
+        self.noise_alpha = settings.VAD_NOISE_ALPHA
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears per-utterance state. The noise floor estimate is reset too."""
+        self._pending = np.empty(0, dtype=np.int16)
+        self.noise_floor = self.min_energy
+        self.in_speech = False
+        self.ended = False
+        self.frames_seen = 0
+        self.speech_start_frame = -1
+        self._speech_run = 0
+        self._silence_run = 0
+
+    @property
+    def trailing_silence_ms(self) -> int:
+        """Current run of silence after speech in milliseconds."""
+        return self._silence_run * self.frame_ms
+
+    def _features(self, samples: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        frames = samples.reshape(-1, self.frame_len).astype(np.float32)
+        energy = np.einsum("ij,ij->i", frames, frames) / self.frame_len
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_len - 1)
+        return energy, zcr
+
+    def _update_noise_floor(self, energy: np.ndarray) -> None:
+        # Closed form of applying the EMA once per frame, oldest first.
+        if not energy.size:
+            return
+        keep = 1.0 - self.noise_alpha
+        weights = self.noise_alpha * keep ** np.arange(energy.size - 1, -1, -1)
+        floor = self.noise_floor * keep ** energy.size + float(weights @ energy)
+        self.noise_floor = max(floor, self.min_energy)
+
+    def process(self, pcm: bytes | bytearray | memoryview) -> str | None:
+        """
+        Feeds a chunk of Int16 PCM and reports the most significant event.
+
+        Args:
+            pcm: Little-endian Int16 mono PCM. Partial frames are carried over.
+
+        Returns:
+            END_OF_UTTERANCE or NO_SPEECH_TIMEOUT once the utterance is over,
+            SPEECH_START when speech begins, otherwise None.
+        """
+        if self.ended:
+            return None
+        samples = np.frombuffer(pcm, dtype="<i2")
+        if self._pending.size:
+            samples = np.concatenate((self._pending, samples))
+        usable = samples.size - samples.size % self.frame_len
+        self._pending = samples[usable:].copy()
+        if not usable:
+            return None
+
+        energy, zcr = self._features(samples[:usable])
+        if not self.frames_seen:
+            # Seed the floor from the quietest frame of the first chunk.
+            self.noise_floor = max(self.min_energy, float(energy.min()))
+        threshold = self.noise_floor * self.energy_ratio
+        speech = (energy > threshold) | (
+            (energy > self.noise_floor * self.fricative_ratio) & (zcr > self.fricative_zcr)
+        )
+        event = None
+        pos = 0
+        while pos < speech.size:
+            segment = speech[pos:]
+            if not self.in_speech:
+                runs = _run_lengths(segment, self._speech_run)
+                hits = np.flatnonzero(runs >= self.start_frames)
+                if hits.size:
+                    stop = int(hits[0]) + 1
+                    self._update_noise_floor(energy[pos:pos + stop][~segment[:stop]])
+                    self.in_speech = True
+                    self.speech_start_frame = self.frames_seen + pos + stop - self.start_frames
+                    self._speech_run = 0
+                    self._silence_run = 0
+                    event = SPEECH_START
+                    pos += stop
+                    continue
+                self._update_noise_floor(energy[pos:][~segment])
+                self._speech_run = int(runs[-1])
+                if self.frames_seen + speech.size >= self.timeout_frames:
+                    self.ended = True
+                    event = NO_SPEECH_TIMEOUT
+                break
+
+            runs = _run_lengths(~segment, self._silence_run)
+            hits = np.flatnonzero(runs >= self.hangover_frames)
+            spoken = self.frames_seen + pos - self.speech_start_frame
+            if hits.size and (spoken + int(hits[0]) < self.max_frames):
+                self.ended = True
+                self._silence_run = int(runs[hits[0]])
+                event = END_OF_UTTERANCE
+                break
+            if spoken + segment.size >= self.max_frames:
+                self.ended = True
+                event = END_OF_UTTERANCE
+                logger.info("Utterance reached the phrase time limit.")
+                break
+            self._silence_run = int(runs[-1])
+            break
+
+        self.frames_seen += speech.size
+        return event
@@ -0,0 +1,27 @@
+# app/utils/gc_utils.py
+import gc
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def freeze_startup_objects() -> int:
+    """
+    Moves every object alive after startup to the collector's permanent generation.
+
+    The modules, models and clients loaded at startup live as long as the
+    process, yet a full collection traverses all of them on whichever thread
+    triggers it, usually the event loop; with the SDKs loaded that stalls
+    every connection for tens of milliseconds. Frozen objects are skipped by
+    later collections.
+
+    Returns:
+        The number of frozen objects.
+    """
+    start_time = time.perf_counter()
+    gc.collect()
+    gc.freeze()
+    frozen = gc.get_freeze_count()
+    logger.info(f"Froze {frozen} startup objects in {int((time.perf_counter() - start_time) * 1000)}ms")
+    return frozen
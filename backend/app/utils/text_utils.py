@@ -0,0 +1,82 @@
+# app/utils/text_utils.py
+from typing import List
+
+# Characters that end a sentence in the LLM output (Japanese and ASCII)
+SENTENCE_DELIMITERS = frozenset("。！？!?\n")
+
+
+class SentenceChunker:
+    """Cuts streamed text into sentences as soon as they are complete.
+
+    Sentences shorter than min_chars are held back and merged with the
+    following one, so TTS is not called for tiny fragments such as "うん。".
+    Each feed() scans only the text it added, so a long stream is chunked in
+    linear time.
+    """
+
+    def __init__(self, min_chars: int):
+        """
+        Initializes the chunker.
+
+        Args:
+            min_chars: Minimum length of an emitted chunk (excluding whitespace).
+        """
+        self.min_chars = min_chars
+        self._buffer = ""
+        self._scanned = 0 # Buffered characters already checked for delimiters
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Adds streamed text and returns the chunks completed by it.
+
+        Args:
+            text: The next piece of streamed text.
+
+        Returns:
+            Completed chunks in order (possibly empty).
+        """
+        self._buffer += text
+        chunks = []
+        start = 0
+        # Delimiters before _scanned closed only short sentences, which are still too short
+        for i in range(self._scanned, len(self._buffer)):
+            if self._buffer[i] not in SENTENCE_DELIMITERS:
+                continue
+            candidate = self._buffer[start:i + 1].strip()
+            if len(candidate) >= self.min_chars:
+                chunks.append(candidate)
+                start = i + 1
+        self._buffer = self._buffer[start:]
+        self._scanned = len(self._buffer)
+        return chunks
+
+    def flush(self) -> str | None:
+        """
+        Returns whatever text is left once the stream has ended.
+
+        Returns:
+            The remaining text, or None if nothing is left.
+        """
+        rest = self._buffer.strip()
+        self._buffer = ""
+        self._scanned = 0
+        return rest or None
+
+
+def split_sentences(text: str, min_chars: int) -> List[str]:
+    """
+    Splits a complete text into sentence chunks.
+
+    Args:
+        text: The full text.
+        min_chars: Minimum length of a chunk; shorter sentences are merged.
+
+    Returns:
+        The chunks in order.
+    """
+    chunker = SentenceChunker(min_chars)
+    chunks = chunker.feed(text)
+    rest = chunker.flush()
+    if rest:
+        chunks.append(rest)
+    return chunks
@@ -0,0 +1,133 @@
+# benchmarks/bench_audio_formats.py
+"""Bandwidth and CPU per session of each negotiable reply audio format.
+
+A reply of REPLY_SECONDS of 24kHz 16-bit TTS output (a voiced-like signal)
+is fed in TTS_CHUNK_SIZE chunks through the StreamEncoder of each format,
+as in ConnectionManager.send_audio_stream. Reported per format:
+- bytes per second of reply audio sent to the client (kbit/s)
+- CPU time per second of reply audio, i.e. the share of a core one session
+  uses while its reply is streaming
+
+Compressed formats (mp3, opus, aac) are passed through from TTS, so their
+bandwidth is whatever TTS delivers and is not measured offline; only the
+forwarding cost is.
+
+Also checks that the G.711 tables match audioop (when available), that
+resampling in chunks equals resampling at once, and that a 1kHz tone
+survives resampling to 16kHz and 8kHz with at least 60dB SNR. Exits
+non-zero if a check fails or a format needs more than 1% of a core per
+session.
+
+Usage (from backend/):
+    python -m benchmarks.bench_audio_formats
+"""
+import os
+import time
+import warnings
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.core.config import settings  # noqa: E402
+from app.services.audio_codec import ALAW_TABLE, ULAW_TABLE, AudioFormat, StreamEncoder, negotiate  # noqa: E402
+
+REPLY_SECONDS = 10
+REPEATS = 5
+SOURCE_RATE = 24000
+FORMATS = [
+    ("pcm", None),
+    ("pcm", "16000"),
+    ("wav", None),
+    ("ulaw", None),
+    ("ulaw", "16000"),
+    ("alaw", None),
+    ("mp3", None),
+]
+
+
+def voiced(seconds: float, rate: int = SOURCE_RATE) -> bytes:
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * rate)) / rate
+    signal = 6000 * np.sin(2 * np.pi * 180 * t) + 3000 * np.sin(2 * np.pi * 540 * t) + rng.normal(0, 800, t.size)
+    return signal.astype("<i2").tobytes()
+
+
+def stream(audio_format: AudioFormat, pcm: bytes) -> bytes:
+    encoder = StreamEncoder(audio_format, SOURCE_RATE)
+    view = memoryview(pcm)
+    out = [encoder.encode(view[offset:offset + settings.TTS_CHUNK_SIZE])
+           for offset in range(0, len(view), settings.TTS_CHUNK_SIZE)]
+    out.append(encoder.flush())
+    return b"".join(out)
+
+
+def tone_snr(rate: int) -> float:
+    t = np.arange(SOURCE_RATE) / SOURCE_RATE
+    tone = (10000 * np.sin(2 * np.pi * 1000 * t)).astype("<i2").tobytes()
+    out = np.frombuffer(stream(AudioFormat("pcm", rate, 2), tone), dtype="<i2").astype(float)
+    t = np.arange(out.size) / rate
+    basis = np.c_[np.sin(2 * np.pi * 1000 * t), np.cos(2 * np.pi * 1000 * t)][100:-100]
+    fitted = basis @ np.linalg.lstsq(basis, out[100:-100], rcond=None)[0]
+    return 10 * np.log10(np.mean(fitted ** 2) / np.mean((out[100:-100] - fitted) ** 2))
+
+
+def checks() -> bool:
+    results = {}
+    every_sample = np.arange(-32768, 32768, dtype="<i2")
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            import audioop
+        results["mu-law matches audioop"] = (
+            ULAW_TABLE[every_sample.view("<u2")].tobytes() == audioop.lin2ulaw(every_sample.tobytes(), 2)
+        )
+        results["A-law matches audioop"] = (
+            ALAW_TABLE[every_sample.view("<u2")].tobytes() == audioop.lin2alaw(every_sample.tobytes(), 2)
+        )
+    except ImportError:
+        print("  audioop not available; G.711 tables not cross-checked")
+    pcm = voiced(1.0)
+    for rate in (16000, 8000):
+        audio_format = AudioFormat("pcm", rate, 2)
+        whole = StreamEncoder(audio_format, SOURCE_RATE)
+        whole_out = whole.encode(pcm) + whole.flush()
+        odd = StreamEncoder(audio_format, SOURCE_RATE)
+        odd_out = b"".join(odd.encode(pcm[i:i + 1023]) for i in range(0, len(pcm), 1023)) + odd.flush()
+        results[f"chunked equals whole at {rate}Hz"] = odd_out == whole_out
+        snr = tone_snr(rate)
+        results[f"1kHz tone at {rate}Hz: SNR {snr:.0f}dB"] = snr >= 60
+    for name, ok in results.items():
+        print(f"  {name}: {'ok' if ok else 'WRONG'}")
+    return all(results.values())
+
+
+def main() -> int:
+    pcm = voiced(REPLY_SECONDS)
+    print(f"{REPLY_SECONDS}s reply in {settings.TTS_CHUNK_SIZE} byte chunks, best of {REPEATS}:")
+    print(f"  {'format':18s} {'kbit/s':>8s} {'CPU ms per audio s':>20s} {'core share':>11s}")
+    ok = True
+    for name, rate in FORMATS:
+        audio_format = negotiate(name, rate)
+        cpu = min(_timed(audio_format, pcm) for _ in range(REPEATS))
+        out = stream(audio_format, pcm)
+        per_second_ms = cpu / REPLY_SECONDS * 1000
+        share = per_second_ms / 1000
+        ok = ok and share < 0.01
+        kbits = "upstream" if audio_format.passthrough else f"{len(out) * 8 / REPLY_SECONDS / 1000:.0f}"
+        label = f"{audio_format.name}@{audio_format.sample_rate // 1000}k"
+        print(f"  {label:18s} {kbits:>8s} {per_second_ms:20.3f} {share:10.3%}")
+    print("checks:")
+    ok = checks() and ok
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+def _timed(audio_format: AudioFormat, pcm: bytes) -> float:
+    started = time.process_time()
+    stream(audio_format, pcm)
+    return time.process_time() - started
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
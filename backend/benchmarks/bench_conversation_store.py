@@ -0,0 +1,108 @@
+# benchmarks/bench_conversation_store.py
+"""Hot-path cost and write-behind throughput of the SQLite conversation store.
+
+Records turns for many clients the way ChatService does: a user/model pair
+per answered question, with a summary every few turns. Meanwhile the writer
+flushes them in batches on its own thread. Reported:
+- per-turn cost on the event loop
+- the longest event-loop stall seen by a heartbeat task
+- writer throughput
+- resume (load) latency
+
+A resumed conversation must match what was recorded. Exits non-zero if the
+per-turn cost reaches 1ms or the resume is wrong.
+
+Usage (from backend/):
+    python -m benchmarks.bench_conversation_store [turns]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.services.conversation_store import ConversationStore
+from app.services.history import MODEL, USER
+from app.services.offload import BlockingOffloader
+
+CLIENTS = 500
+SUMMARY_EVERY = 6 # turns between compactions of a client
+MAX_TURN_MS = 1.0
+
+
+async def heartbeat(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - started - 0.001)
+
+
+async def main(turns: int) -> int:
+    offloader = BlockingOffloader(max_workers=2, stage_limits={"conversation_store": 1})
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ConversationStore(
+            path=Path(tmp) / "conversations.sqlite3",
+            flush_interval=0.05,
+            batch_size=500,
+            max_pending=1_000_000,
+            resume_seconds=3600,
+            retention_seconds=3600,
+            purge_interval=3600,
+            offloader=offloader,
+        )
+        await store.start()
+        stop = asyncio.Event()
+        lags: list = []
+        beat = asyncio.create_task(heartbeat(stop, lags))
+
+        question = "なんでおそらはあおいの？" * 2
+        answer = "おひさまのひかりがくうきでちらばって、あおいいろがいちばんたくさんとどくからだよ。" * 3
+        expected = {}
+        record_seconds = 0.0
+        started = time.perf_counter()
+        for i in range(turns):
+            client_id = f"client_{i % CLIENTS}"
+            turn_started = time.perf_counter()
+            store.record_turn(client_id, USER, f"{question}{i}")
+            store.record_turn(client_id, MODEL, answer)
+            record_seconds += time.perf_counter() - turn_started
+            history = expected.setdefault(client_id, {"summary": "", "turns": []})
+            history["turns"] += [[USER, f"{question}{i}"], [MODEL, answer]]
+            if len(history["turns"]) >= SUMMARY_EVERY * 2:
+                turn_started = time.perf_counter()
+                store.record_summary(client_id, f"summary {i}", 4)
+                record_seconds += time.perf_counter() - turn_started
+                history["summary"] = f"summary {i}"
+                del history["turns"][:4]
+            if i % 200 == 0:
+                await asyncio.sleep(0) # let the writer and heartbeat run, as request handling would
+        produced = time.perf_counter() - started
+
+        flush_started = time.perf_counter()
+        while store.stats()["pending"]:
+            await store.flush()
+        drain = time.perf_counter() - flush_started
+        stop.set()
+        await beat
+
+        load_started = time.perf_counter()
+        resumed = await store.load("client_7")
+        load_ms = (time.perf_counter() - load_started) * 1000
+        await store.close()
+    offloader.shutdown()
+
+    per_turn_ms = record_seconds / turns * 1000
+    stats = store.stats()
+    print(f"{turns} turns for {CLIENTS} clients in {produced:.2f}s (+{drain:.2f}s final drain)")
+    print(f"hot path: {per_turn_ms * 1000:.2f}us per turn (user + model rows)")
+    print(f"max event loop lag: {max(lags) * 1000:.2f}ms over {len(lags)} heartbeats")
+    print(f"writer: {stats['turns_written']} rows in {stats['batches']} batches "
+          f"({stats['turns_written'] / (produced + drain):.0f} rows/s)")
+    print(f"resume load: {load_ms:.2f}ms for {len(resumed['turns']) if resumed else 0} turns")
+    ok = per_turn_ms < MAX_TURN_MS and resumed == expected["client_7"]
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)))
@@ -0,0 +1,359 @@
+# benchmarks/bench_e2e.py
+"""End-to-end WebSocket load test against the real app with local provider stand-ins.
+
+The app runs under uvicorn in a child process with Gemini, OpenAI TTS and
+Google STT replaced by benchmarks.standins, so it needs no network access.
+Simulated clients connect to /api/v1/ws/{client_id} and, like VoiceChatUI,
+send start_recording followed by real-time Int16 PCM chunks of 4096 samples
+at 48kHz. The utterance is ended with stop_recording (or, with
+--endpoint vad, by streaming silence until the server endpoints it).
+
+Reported:
+- turns per second
+- p50/p95/p99 time to first audio (end of speech to first binary frame)
+- server CPU time per session and per turn
+- the server's own /metrics stage histograms
+
+--slow-fraction and --fail-fraction inject slow and failing LLM and TTS
+calls, to see how retries and hedging hold up the tail. Filler audio counts
+as first audio here (it is what the child hears); the server's
+voice_first_audio_seconds excludes it. --no-filler turns it off.
+
+--framed speaks the binary framing protocol (app.services.framing) instead
+of JSON text and raw PCM, ending each recording with a FLAG_END frame.
+--audio-format and --audio-sample-rate negotiate the reply audio encoding
+(app.services.audio_codec); reply bytes per turn are reported.
+
+Exits non-zero on failed turns or when --max-p95-ms is exceeded, so it can
+gate CI.
+
+Usage (from backend/):
+    python -m benchmarks.bench_e2e --clients 200 --turns 3
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import re
+import socket
+import time
+from collections import defaultdict
+from typing import Dict, List
+from urllib.parse import urlencode
+
+import httpx
+import numpy as np
+from websockets.asyncio.client import connect
+
+from app.services import framing
+
+INPUT_SAMPLE_RATE = 48000
+CHUNK_SAMPLES = 4096 # ScriptProcessorNode buffer size used by VoiceChatUI
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(port: int, args: argparse.Namespace, conn) -> None:
+    """Runs the app with stand-ins installed; answers CPU-time queries over conn."""
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    from benchmarks.standins import NO_PROVIDER_LIMITS, Faults, install
+    for name, value in NO_PROVIDER_LIMITS.items():
+        os.environ.setdefault(name, value)
+    if not args.with_caches:
+        os.environ["TTS_CACHE_ENABLED"] = "false"
+        os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    if args.no_filler:
+        os.environ["FILLER_ENABLED"] = "false"
+    import threading
+    import uvicorn
+    from app.main import app
+    from app.services.chat_service import chat_service
+
+    logging.getLogger().setLevel(args.log_level.upper())
+    install(
+        chat_service,
+        stt_seconds=args.stt_ms / 1000,
+        llm_first_token_seconds=args.llm_ttft_ms / 1000,
+        tts_first_byte_seconds=args.tts_ttfb_ms / 1000,
+        tts_realtime_factor=args.tts_realtime,
+        llm_faults=Faults(args.slow_fraction, args.slow_ms / 1000, args.fail_fraction, seed=1),
+        tts_faults=Faults(args.slow_fraction, args.slow_ms / 1000, args.fail_fraction, seed=2),
+    )
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+
+    def control() -> None:
+        while True:
+            message = conn.recv()
+            if message == "cpu":
+                conn.send(time.process_time())
+            elif message == "stop":
+                server.should_exit = True
+                return
+
+    threading.Thread(target=control, daemon=True).start()
+    server.run()
+
+
+def make_audio(speech_seconds: float) -> tuple[List[bytes], bytes]:
+    """Returns the speech chunks of one utterance and one chunk of background noise."""
+    rng = np.random.default_rng(0)
+    chunks = max(1, round(speech_seconds * INPUT_SAMPLE_RATE / CHUNK_SAMPLES))
+    t = np.arange(chunks * CHUNK_SAMPLES) / INPUT_SAMPLE_RATE
+    # Voiced-like signal: a 180Hz tone with harmonics plus noise, well above the floor
+    voiced = 3000 * np.sin(2 * np.pi * 180 * t) + 1500 * np.sin(2 * np.pi * 540 * t) + rng.normal(0, 500, t.size)
+    speech = voiced.astype("<i2").tobytes()
+    noise = rng.normal(0, 30, CHUNK_SAMPLES).astype("<i2").tobytes()
+    step = CHUNK_SAMPLES * 2
+    # The first chunk is quiet so the endpointer can seed its noise floor
+    return [noise] + [speech[i:i + step] for i in range(0, len(speech), step)], noise
+
+
+class Results:
+    def __init__(self):
+        self.ttfa: List[float] = []
+        self.turns = 0
+        self.failures: Dict[str, int] = defaultdict(int)
+        self.audio_bytes = 0
+
+
+class Protocol:
+    """Client side of either protocol: JSON text and raw PCM, or binary frames."""
+
+    def __init__(self, ws, framed: bool):
+        self.ws = ws
+        self.framed = framed
+        self.stream = 0
+        self.sequence = 0
+
+    def _frame(self, frame_type: int, payload: bytes, flags: int = 0) -> bytes:
+        self.sequence += 1
+        return framing.encode(frame_type, payload, self.stream, self.sequence - 1, flags=flags)
+
+    async def start(self, message: dict) -> None:
+        if not self.framed:
+            await self.ws.send(json.dumps(message))
+            return
+        self.stream += 1
+        self.sequence = 0
+        await self.ws.send(self._frame(framing.CONTROL, json.dumps(message).encode()))
+
+    async def audio(self, chunk: bytes) -> None:
+        await self.ws.send(self._frame(framing.AUDIO, chunk) if self.framed else chunk)
+
+    async def end(self) -> None:
+        if self.framed:
+            await self.ws.send(self._frame(framing.AUDIO, b"", framing.FLAG_END))
+        else:
+            await self.ws.send(json.dumps({"type": "stop_recording"}))
+
+    def parse(self, message: str | bytes) -> tuple[str, int | dict]:
+        """Returns ("audio", payload bytes), ("control", message) or ("text", 0)."""
+        if self.framed:
+            frame = framing.decode(message)
+            if frame.type == framing.AUDIO:
+                return "audio", len(frame.payload)
+            if frame.type == framing.CONTROL:
+                return "control", json.loads(bytes(frame.payload))
+            return "text", 0
+        if isinstance(message, bytes):
+            return "audio", len(message)
+        return ("control", json.loads(message)) if message.startswith("{") else ("text", 0)
+
+
+async def run_turn(
+    protocol: Protocol, args, speech: List[bytes], noise: bytes, trace_id: str, results: Results
+) -> None:
+    chunk_seconds = CHUNK_SAMPLES / INPUT_SAMPLE_RATE
+    await protocol.start({"type": "start_recording", "sample_rate": INPUT_SAMPLE_RATE, "trace_id": trace_id})
+    for chunk in speech:
+        await protocol.audio(chunk)
+        await asyncio.sleep(chunk_seconds)
+    speech_end = time.perf_counter()
+    silence_task = None
+    if args.endpoint == "stop":
+        await protocol.end()
+    else:
+        async def send_silence() -> None:
+            while True:
+                await protocol.audio(noise)
+                await asyncio.sleep(chunk_seconds)
+
+        silence_task = asyncio.create_task(send_silence())
+
+    first_audio = None
+    received = 0
+    try:
+        async with asyncio.timeout(args.turn_timeout):
+            while True:
+                kind, content = protocol.parse(await protocol.ws.recv())
+                if kind == "audio":
+                    if first_audio is None:
+                        first_audio = time.perf_counter() - speech_end
+                        if silence_task is not None:
+                            silence_task.cancel()
+                    received += content
+                    continue
+                if kind == "text":
+                    results.failures["text_fallback"] += 1
+                    return
+                if content["type"] == "audio_end":
+                    break
+    except TimeoutError:
+        results.failures["timeout"] += 1
+        return
+    finally:
+        if silence_task is not None:
+            silence_task.cancel()
+    if first_audio is None:
+        results.failures["no_audio"] += 1
+        return
+    results.ttfa.append(first_audio)
+    results.turns += 1
+    results.audio_bytes += received
+
+
+async def run_client(index: int, url: str, args, speech: List[bytes], noise: bytes, results: Results) -> None:
+    await asyncio.sleep(index * args.ramp_seconds / max(args.clients, 1))
+    try:
+        subprotocols = [framing.SUBPROTOCOL] if args.framed else None
+        query = urlencode({
+            name: value for name, value in (("audio_format", args.audio_format),
+                                            ("audio_sample_rate", args.audio_sample_rate)) if value
+        })
+        uri = f"{url}/api/v1/ws/load_{index}" + (f"?{query}" if query else "")
+        async with connect(uri, max_size=None, subprotocols=subprotocols) as ws:
+            if args.framed and ws.subprotocol != framing.SUBPROTOCOL:
+                raise RuntimeError("The server did not accept the framed protocol")
+            protocol = Protocol(ws, framed=args.framed)
+            for turn in range(args.turns):
+                await run_turn(protocol, args, speech, noise, f"{index:04d}{turn:04d}", results)
+                await asyncio.sleep(args.think_seconds)
+    except Exception as e:
+        results.failures[type(e).__name__] += 1
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) * 1000 if values else 0.0
+
+
+def server_stage_quantiles(metrics_text: str) -> Dict[str, tuple[int, float, float]]:
+    """Returns count, p50 and p95 (ms) of every histogram in a /metrics page."""
+    from app.services.metrics import Histogram
+
+    buckets: Dict[str, List[tuple[float, int]]] = defaultdict(list)
+    for name, bound, count in re.findall(r'^(\w+)_bucket\{le="([^"]+)"\} (\d+)$', metrics_text, re.M):
+        if bound != "+Inf":
+            buckets[name].append((float(bound), int(count)))
+    stages = {}
+    for name, cumulative in buckets.items():
+        histogram = Histogram(name, "", [bound for bound, _ in cumulative])
+        previous = 0
+        for i, (_, count) in enumerate(cumulative):
+            histogram._counts[i] = count - previous
+            previous = count
+        histogram.count = previous
+        stages[name] = (histogram.count, histogram.quantile(0.5) * 1000, histogram.quantile(0.95) * 1000)
+    return stages
+
+
+async def drive(port: int, args) -> tuple[Results, float]:
+    speech, noise = make_audio(args.speech_seconds)
+    results = Results()
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(i, f"ws://127.0.0.1:{port}", args, speech, noise, results) for i in range(args.clients)
+    ))
+    return results, time.perf_counter() - started
+
+
+def wait_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3, help="turns per client")
+    parser.add_argument("--ramp-seconds", type=float, default=5.0)
+    parser.add_argument("--think-seconds", type=float, default=0.5)
+    parser.add_argument("--speech-seconds", type=float, default=1.0)
+    parser.add_argument("--endpoint", choices=("stop", "vad"), default="stop")
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    parser.add_argument("--stt-ms", type=float, default=150.0)
+    parser.add_argument("--llm-ttft-ms", type=float, default=300.0)
+    parser.add_argument("--tts-ttfb-ms", type=float, default=200.0)
+    parser.add_argument("--tts-realtime", type=float, default=4.0, help="TTS audio seconds per second")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="LLM and TTS calls made slow")
+    parser.add_argument("--slow-ms", type=float, default=2000.0, help="extra delay of a slow call")
+    parser.add_argument("--fail-fraction", type=float, default=0.0, help="LLM and TTS calls failing transiently")
+    parser.add_argument("--with-caches", action="store_true", help="keep the answer and TTS caches enabled")
+    parser.add_argument("--no-filler", action="store_true", help="never mask a slow reply with filler audio")
+    parser.add_argument("--framed", action="store_true", help="speak the binary framing protocol")
+    parser.add_argument("--audio-format", help="reply audio formats to offer, e.g. ulaw,pcm")
+    parser.add_argument("--audio-sample-rate", help="reply audio sample rate to ask for")
+    parser.add_argument("--log-level", default="warning", help="server log level")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if p95 time to first audio exceeds this")
+    args = parser.parse_args()
+
+    port = free_port()
+    parent_conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.get_context("spawn").Process(target=serve, args=(port, args, child_conn))
+    server.start()
+    try:
+        wait_ready(port)
+        parent_conn.send("cpu")
+        cpu_before = parent_conn.recv()
+        results, elapsed = asyncio.run(drive(port, args))
+        parent_conn.send("cpu")
+        cpu_used = parent_conn.recv() - cpu_before
+        metrics_text = httpx.get(f"http://127.0.0.1:{port}/metrics").text
+    finally:
+        parent_conn.send("stop")
+        server.join(timeout=10)
+        if server.is_alive():
+            server.terminate()
+
+    failed = sum(results.failures.values())
+    print(f"clients {args.clients}, turns/client {args.turns}, endpoint {args.endpoint}, "
+          f"protocol {'framed' if args.framed else 'json/raw'}")
+    print(f"completed turns {results.turns}, failed {failed} {dict(results.failures) or ''}")
+    print(f"wall {elapsed:.1f}s, throughput {results.turns / elapsed:.1f} turns/s")
+    print(
+        f"time to first audio ms: p50 {percentile(results.ttfa, 50):.0f}  "
+        f"p95 {percentile(results.ttfa, 95):.0f}  p99 {percentile(results.ttfa, 99):.0f}"
+    )
+    print(f"reply audio {results.audio_bytes / max(results.turns, 1) / 1024:.0f}KiB/turn")
+    print(
+        f"server CPU {cpu_used:.2f}s: {cpu_used / args.clients * 1000:.1f}ms/session, "
+        f"{cpu_used / max(results.turns, 1) * 1000:.1f}ms/turn"
+    )
+    fillers = re.search(r"^voice_filler_played_total (\d+)$", metrics_text, re.M)
+    print(f"replies preceded by filler: {fillers.group(1) if fillers else 0}")
+    print("server stages (count, p50 ms, p95 ms):")
+    for name, (count, p50, p95) in server_stage_quantiles(metrics_text).items():
+        print(f"  {name:34s} {count:6d} {p50:8.0f} {p95:8.0f}")
+
+    ok = failed == 0
+    if args.max_p95_ms is not None and percentile(results.ttfa, 95) > args.max_p95_ms:
+        print(f"p95 time to first audio above {args.max_p95_ms}ms")
+        ok = False
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
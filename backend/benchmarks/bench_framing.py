@@ -0,0 +1,119 @@
+# benchmarks/bench_framing.py
+"""Encode/decode cost per WebSocket message, framed vs JSON text and raw PCM.
+
+Measured per message:
+- reply audio frame (TTS_FRAME_MS of 24kHz PCM cut from the frame buffer):
+  raw copies the slice; framed encodes header and slice in one copy
+- uplink audio chunk (4096 samples): raw is used as received; framed is
+  decoded to a view of the payload
+- control message (audio_start): JSON text dumps/loads vs a CONTROL frame
+- coalescing two queued audio frames
+
+Also checks that frames round-trip, that decoded payloads are views into
+the received message, and that coalescing keeps the later sequence number.
+Exits non-zero if a check fails or framed audio costs more than 1% of the
+audio's duration to encode and decode.
+
+Usage (from backend/):
+    python -m benchmarks.bench_framing [iterations]
+"""
+import json
+import sys
+import time
+
+from app.services import framing
+from app.services.framing import FrameEncoder
+
+REPLY_FRAME_BYTES = 24000 * 2 * 40 // 1000
+UPLINK_CHUNK_BYTES = 4096 * 2
+CONTROL = {"type": "audio_start", "format": "pcm", "sample_rate": 24000, "trace_id": "0123456789abcdef"}
+
+
+def per_call_ns(fn, iterations: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter_ns() - started) / iterations
+
+
+def checks() -> bool:
+    encoder = FrameEncoder()
+    stream = encoder.open_stream()
+    audio = bytes(range(256)) * 8
+    message = encoder.encode(framing.AUDIO, memoryview(audio)[:1000], stream)
+    frame = framing.decode(message)
+    round_trip = frame.type == framing.AUDIO and frame.stream == stream and frame.sequence == 0
+    round_trip = round_trip and bytes(frame.payload) == audio[:1000]
+    zero_copy = frame.payload.obj is message
+    second = encoder.encode(framing.AUDIO, audio[1000:], stream)
+    merged = framing.decode(framing.coalesce(message, second))
+    coalesced = merged.sequence == 1 and bytes(merged.payload) == audio
+    other_stream = framing.coalesce(message, encoder.encode(framing.AUDIO, b"\0\0", encoder.open_stream())) is None
+    control = framing.coalesce(message, encoder.encode(framing.CONTROL, b"{}", stream)) is None
+    try:
+        framing.decode(b"\x02" + message[1:])
+        version_checked = False
+    except framing.FramingError:
+        version_checked = True
+    results = {
+        "round trip": round_trip,
+        "payload is a view": zero_copy,
+        "coalesce keeps the later sequence": coalesced,
+        "no coalescing across streams or into control frames": other_stream and control,
+        "other versions rejected": version_checked,
+    }
+    for name, ok in results.items():
+        print(f"  {name}: {'ok' if ok else 'WRONG'}")
+    return all(results.values())
+
+
+def main(iterations: int) -> int:
+    encoder = FrameEncoder()
+    stream = encoder.open_stream()
+    buffer = bytearray(REPLY_FRAME_BYTES * 8)
+    view = memoryview(buffer)
+    uplink_raw = bytes(UPLINK_CHUNK_BYTES)
+    uplink_framed = framing.encode(framing.AUDIO, uplink_raw, 1, 0)
+    control_text = json.dumps(CONTROL)
+    control_frame = encoder.encode(framing.CONTROL, control_text.encode(), stream)
+    queued = encoder.encode(framing.AUDIO, view[:REPLY_FRAME_BYTES], stream)
+    frame = encoder.encode(framing.AUDIO, view[:REPLY_FRAME_BYTES], stream)
+
+    rows = {
+        "reply audio frame out": (
+            per_call_ns(lambda: bytes(view[:REPLY_FRAME_BYTES]), iterations),
+            per_call_ns(lambda: encoder.encode(framing.AUDIO, view[:REPLY_FRAME_BYTES], stream), iterations),
+        ),
+        "uplink audio chunk in": (
+            per_call_ns(lambda: memoryview(uplink_raw), iterations),
+            per_call_ns(lambda: framing.decode(uplink_framed).payload, iterations),
+        ),
+        "control message out": (
+            per_call_ns(lambda: json.dumps(CONTROL), iterations),
+            per_call_ns(lambda: encoder.encode(framing.CONTROL, json.dumps(CONTROL).encode(), stream), iterations),
+        ),
+        "control message in": (
+            per_call_ns(lambda: json.loads(control_text), iterations),
+            per_call_ns(lambda: json.loads(bytes(framing.decode(control_frame).payload)), iterations),
+        ),
+        "coalesce two audio frames": (
+            per_call_ns(lambda: queued + frame, iterations),
+            per_call_ns(lambda: framing.coalesce(queued, frame), iterations),
+        ),
+    }
+    print(f"{iterations} iterations, ns per message:")
+    print(f"  {'':28s} {'json/raw':>10s} {'framed':>10s}")
+    for name, (raw, framed) in rows.items():
+        print(f"  {name:28s} {raw:10.0f} {framed:10.0f}")
+    framed_audio_ns = rows["reply audio frame out"][1] + per_call_ns(lambda: framing.decode(frame), iterations)
+    budget_ns = REPLY_FRAME_BYTES / (24000 * 2) * 1e9 / 100
+    print(f"framed reply audio encode + decode: {framed_audio_ns:.0f}ns per {REPLY_FRAME_BYTES} byte frame "
+          f"(budget {budget_ns:.0f}ns)")
+    print("checks:")
+    ok = checks() and framed_audio_ns < budget_ns
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000))
@@ -0,0 +1,107 @@
+# benchmarks/bench_history.py
+"""Prompt size and LLM latency over a 50-turn session against a local stub model.
+
+Compares the previous behaviour (whole history resent every turn, persona
+prompt repeated in every user entry) with ConversationHistory (persona as
+system instruction, history kept under HISTORY_CHAR_BUDGET with background
+summarization). The stub model's latency grows with the characters it is sent.
+
+Usage (from backend/):
+    python -m benchmarks.bench_history
+"""
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.core.config import settings  # noqa: E402
+from app.services.answer_cache import AnswerCache  # noqa: E402
+from app.services.chat_service import ChatService  # noqa: E402
+
+TURNS = 50
+BASE_LATENCY_S = 0.02
+PER_CHAR_LATENCY_S = 0.00002
+REPLY = "そうだね、" + "おそらはとってもひろくて、ひかりがいっぱいあるからあおくみえるんだよ。" * 3
+LEGACY_PROMPT_OVERHEAD = len(
+    "\n        " + settings.LLM_PERSONA_PROMPT + "質問は次です。\n        \n        "
+)
+
+
+def content_chars(contents) -> int:
+    return sum(len(part) for content in contents for part in content["parts"])
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubChat:
+    def __init__(self, model: "StubModel", history):
+        self.model = model
+        self.history = history
+
+    async def send_message_async(self, text: str, stream: bool = False):
+        chars = content_chars(self.history) + len(text) + len(settings.LLM_PERSONA_PROMPT)
+        self.model.sent_chars.append(chars)
+        await asyncio.sleep(BASE_LATENCY_S + chars * PER_CHAR_LATENCY_S)
+        return StubResponse(REPLY)
+
+
+class StubModel:
+    def __init__(self):
+        self.sent_chars: list[int] = []
+
+    def start_chat(self, history):
+        return StubChat(self, history)
+
+    async def generate_content_async(self, prompt: str):
+        await asyncio.sleep(BASE_LATENCY_S + len(prompt) * PER_CHAR_LATENCY_S)
+        return StubResponse("子どもは空の色やほしについて質問し、先生がやさしく説明した。")
+
+
+def legacy_sizes() -> list[int]:
+    """Characters the previous implementation sent on each turn."""
+    sizes = []
+    history_chars = 0
+    for turn in range(TURNS):
+        question = f"しつもん{turn}：なんでおそらはあおいの？"
+        prompt_chars = LEGACY_PROMPT_OVERHEAD + len(question)
+        sizes.append(history_chars + prompt_chars)
+        history_chars += prompt_chars + len(REPLY)
+    return sizes
+
+
+async def main() -> None:
+    service = ChatService(llm_answer_cache=AnswerCache(max_entries=1, ttl_seconds=0))
+    model = StubModel()
+    service.gemini_model = model
+    service.summary_model = model
+    service.initialize_conversation("bench")
+
+    latencies = []
+    for turn in range(TURNS):
+        started = time.perf_counter()
+        await service.get_llm_response(f"しつもん{turn}：なんでおそらはあおいの？", "bench")
+        latencies.append((time.perf_counter() - started) * 1000)
+        service.schedule_history_compaction("bench")
+        await asyncio.sleep(0) # let compaction start after the "response is sent"
+    await asyncio.gather(*service._compaction_tasks.values())
+
+    legacy = legacy_sizes()
+    legacy_latency = [(BASE_LATENCY_S + c * PER_CHAR_LATENCY_S) * 1000 for c in legacy]
+    print(f"{'turn':>5} {'legacy chars':>13} {'new chars':>10} {'legacy ms':>10} {'new ms':>8}")
+    for turn in (0, 9, 19, 29, 39, 49):
+        print(f"{turn + 1:>5} {legacy[turn]:>13} {model.sent_chars[turn]:>10} "
+              f"{legacy_latency[turn]:>10.1f} {latencies[turn]:>8.1f}")
+    print(f"mean chars: legacy {statistics.mean(legacy):.0f}, new {statistics.mean(model.sent_chars):.0f}")
+    print(f"max chars:  legacy {max(legacy)}, new {max(model.sent_chars)} "
+          f"(budget {settings.HISTORY_CHAR_BUDGET} + prompt)")
+    print(f"mean latency (stub): legacy {statistics.mean(legacy_latency):.1f}ms, "
+          f"new {statistics.mean(latencies):.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+# benchmarks/bench_input_conditioning.py
+"""Throughput and behavior of the input conditioning between ingest and STT.
+
+An utterance captured at each common AudioContext rate is fed in chunks of
+4096 samples (the ScriptProcessorNode buffer VoiceChatUI sends) through an
+InputConditioner, as AudioIngestSession.feed does. Reported per capture
+rate: CPU time per chunk and how many times faster than real time one core
+conditions audio.
+
+Also checks, on a quiet 440Hz tone with a DC offset captured at 48kHz:
+- the output is at the STT rate
+- the offset is removed and the level reaches AUDIO_AGC_TARGET_PEAK
+- the steady-state output is a clean tone (chunk boundaries would show up
+  as noise: at least 40dB SNR)
+and that low background noise is not amplified and a loud voice is turned
+down. Exits non-zero if a check fails or a rate is conditioned at less
+than 500x real time.
+
+Usage (from backend/):
+    python -m benchmarks.bench_input_conditioning
+"""
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.core.config import settings  # noqa: E402
+from app.services.audio_conditioning import FULL_SCALE, InputConditioner  # noqa: E402
+
+CHUNK_SAMPLES = 4096
+UTTERANCE_SECONDS = 5
+CAPTURE_RATES = (48000, 44100, 32000, 16000)
+MIN_REALTIME = 500
+
+
+def voiced(seconds: float, rate: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * rate)) / rate
+    signal = 3000 * np.sin(2 * np.pi * 220 * t) + 1500 * np.sin(2 * np.pi * 660 * t) + rng.normal(0, 300, t.size)
+    return signal.astype("<i2")
+
+
+def condition(samples: np.ndarray, rate: int) -> tuple[np.ndarray, InputConditioner]:
+    conditioner = InputConditioner(rate)
+    out = [conditioner.process(samples[offset:offset + CHUNK_SAMPLES].tobytes())
+           for offset in range(0, len(samples), CHUNK_SAMPLES)]
+    out.append(conditioner.flush())
+    return np.frombuffer(b"".join(out), dtype="<i2"), conditioner
+
+
+def tone_snr(samples: np.ndarray, rate: int, frequency: float) -> float:
+    t = np.arange(samples.size) / rate
+    basis = np.c_[np.sin(2 * np.pi * frequency * t), np.cos(2 * np.pi * frequency * t), np.ones(t.size)]
+    fitted = basis @ np.linalg.lstsq(basis, samples.astype(float), rcond=None)[0]
+    return 10 * np.log10(np.mean(fitted ** 2) / np.mean((samples - fitted) ** 2))
+
+
+def checks() -> bool:
+    rate = 48000
+    t = np.arange(4 * rate) / rate
+    quiet = (2000 * np.sin(2 * np.pi * 440 * t) + 400).astype("<i2")
+    out, conditioner = condition(quiet, rate)
+    stt_rate = settings.AUDIO_STT_SAMPLE_RATE
+    steady = out[2 * stt_rate:3 * stt_rate] # after the offset and gain settled
+    peak = np.abs(steady).max() / FULL_SCALE
+    snr = tone_snr(steady, stt_rate, 440)
+    noise = np.random.default_rng(1).normal(0, 100, 2 * rate).astype("<i2")
+    _, noise_conditioner = condition(noise, rate)
+    _, loud_conditioner = condition((voiced(2, rate).astype(float) * 8).clip(-32768, 32767).astype("<i2"), rate)
+    results = {
+        f"output at {stt_rate}Hz": conditioner.output_rate == stt_rate and abs(out.size - quiet.size // 3) < 100,
+        f"DC offset removed (mean {steady.mean():.1f})": abs(steady.mean()) < 0.002 * FULL_SCALE,
+        f"quiet tone peaks at {peak:.2f} of full scale (gain {conditioner.gain:.1f})":
+            abs(peak - settings.AUDIO_AGC_TARGET_PEAK) < 0.05,
+        f"steady tone SNR {snr:.0f}dB": snr >= 40,
+        f"background noise kept at gain {noise_conditioner.gain:.1f}": noise_conditioner.gain == 1.0,
+        f"loud voice turned down to gain {loud_conditioner.gain:.2f}": loud_conditioner.gain < 1.0,
+    }
+    for name, ok in results.items():
+        print(f"  {name}: {'ok' if ok else 'WRONG'}")
+    return all(results.values())
+
+
+def main() -> int:
+    print(f"{UTTERANCE_SECONDS}s utterance in {CHUNK_SAMPLES} sample chunks, "
+          f"conditioned to {settings.AUDIO_STT_SAMPLE_RATE}Hz:")
+    print(f"  {'capture rate':>12s} {'us per chunk':>13s} {'x realtime per core':>20s}")
+    ok = True
+    for rate in CAPTURE_RATES:
+        samples = voiced(UTTERANCE_SECONDS, rate)
+        condition(samples, rate) # warm up
+        cpu = min(_timed(samples, rate) for _ in range(5))
+        chunks = -(-len(samples) // CHUNK_SAMPLES)
+        realtime = UTTERANCE_SECONDS / cpu
+        ok = ok and realtime >= MIN_REALTIME
+        print(f"  {rate:>10d}Hz {cpu / chunks * 1e6:13.0f} {realtime:20.0f}")
+    print("checks:")
+    ok = checks() and ok
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+def _timed(samples: np.ndarray, rate: int) -> float:
+    started = time.process_time()
+    condition(samples, rate)
+    return time.process_time() - started
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
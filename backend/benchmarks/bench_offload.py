@@ -0,0 +1,94 @@
+# benchmarks/bench_offload.py
+"""Event-loop responsiveness while one STT call is stuck.
+
+One session's recognize_google blocks until released; meanwhile a heartbeat
+task measures event-loop lag and other sessions run their own (fast) STT calls.
+Startup objects are frozen first, as the server does (GC_FREEZE_AFTER_STARTUP).
+Exits non-zero if the loop stalls or the other sessions do not complete.
+
+Usage (from backend/):
+    python -m benchmarks.bench_offload
+"""
+import asyncio
+import os
+import threading
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import speech_recognition as sr  # noqa: E402
+
+from app.services.chat_service import ChatService  # noqa: E402
+from app.services.offload import BlockingOffloader  # noqa: E402
+from app.services.stt import GoogleSTTBackend  # noqa: E402
+from app.utils.gc_utils import freeze_startup_objects  # noqa: E402
+
+OTHER_SESSIONS = 20
+MAX_LOOP_LAG_MS = 50.0
+
+
+class BlockingRecognizer(sr.Recognizer):
+    """Recognizer whose first call blocks until released; later calls take 5ms."""
+
+    def __init__(self, release: threading.Event):
+        super().__init__()
+        self._release = release
+        self._first = True
+        self._lock = threading.Lock()
+
+    def recognize_google(self, audio_data, language=None, **kwargs):
+        with self._lock:
+            first, self._first = self._first, False
+        if first:
+            self._release.wait()
+            return "stuck"
+        time.sleep(0.005)
+        return "ok"
+
+
+async def heartbeat(stop: asyncio.Event, lags: list[float], interval: float = 0.01) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - expected) * 1000)
+
+
+async def main() -> int:
+    release = threading.Event()
+    offloader = BlockingOffloader(max_workers=8, stage_limits={"stt": 4})
+    service = ChatService(offloader=offloader, stt=GoogleSTTBackend(offloader))
+    service.stt.recognizer = BlockingRecognizer(release)
+    audio = sr.AudioData(b"\x00\x00" * 1600, 16000, 2)
+    freeze_startup_objects()
+
+    stop = asyncio.Event()
+    lags: list[float] = []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+
+    stuck = asyncio.create_task(service.process_audio_to_text(audio, "stuck_client"))
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(service.process_audio_to_text(audio, f"client_{i}") for i in range(OTHER_SESSIONS))
+    )
+    others_ms = (time.perf_counter() - started) * 1000
+    stats = service.offloader.stats()["stt"]
+
+    release.set()
+    await stuck
+    stop.set()
+    await beat
+
+    max_lag = max(lags)
+    print(f"other sessions completed: {results.count('ok')}/{OTHER_SESSIONS} in {others_ms:.1f}ms")
+    print(f"event loop lag: max {max_lag:.2f}ms over {len(lags)} heartbeats")
+    print(f"stt stage while stuck: {stats}")
+    ok = results.count("ok") == OTHER_SESSIONS and max_lag < MAX_LOOP_LAG_MS
+    print("PASS" if ok else "FAIL")
+    service.offloader.shutdown()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,113 @@
+# benchmarks/bench_provider_scheduler.py
+"""Fairness and fail-fast behaviour of a provider limiter under a chatty client.
+
+One chatty client floods the limiter with CHATTY_REQUESTS requests at once
+while NORMAL_CLIENTS clients each make one request every NORMAL_INTERVAL.
+Each admitted request holds its slot for HOLD_SECONDS, like a provider call.
+The run is repeated with every request filed under the same client id. That
+gives a plain FIFO queue for comparison.
+
+Reported per run:
+- queue wait of the normal clients
+- how many of the chatty client's requests were admitted, refused up front
+  or timed out in the queue
+- the slowest up-front refusal
+
+Exits non-zero if, with fair queueing, a normal client's request was not
+admitted, the normal clients' p95 wait exceeds MAX_NORMAL_P95_MS, or an
+up-front refusal took longer than MAX_REFUSAL_MS.
+
+Usage (from backend/):
+    python -m benchmarks.bench_provider_scheduler
+"""
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.services.metrics import Histogram  # noqa: E402
+from app.services.provider_scheduler import ProviderBusy, ProviderLimiter  # noqa: E402
+
+RATE = 40.0
+BURST = 5
+CONCURRENCY = 4
+MAX_QUEUE = 100
+MAX_WAIT = 2.0
+HOLD_SECONDS = 0.05
+CHATTY_REQUESTS = 300
+NORMAL_CLIENTS = 10
+NORMAL_INTERVAL = 0.5 # together half of the capacity
+DURATION = 4.0
+MAX_NORMAL_P95_MS = 300.0
+MAX_REFUSAL_MS = 5.0
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else 0.0
+
+
+async def request(limiter: ProviderLimiter, client_id: str, waits: list, refusals: list) -> None:
+    started = time.perf_counter()
+    try:
+        async with limiter.slot(client_id):
+            waits.append(time.perf_counter() - started)
+            await asyncio.sleep(HOLD_SECONDS)
+    except ProviderBusy as e:
+        if not e.reason.startswith("waited"):
+            refusals.append(time.perf_counter() - started)
+
+
+async def normal_client(limiter: ProviderLimiter, client_id: str, waits: list, refusals: list) -> None:
+    deadline = time.monotonic() + DURATION
+    tasks = []
+    while time.monotonic() < deadline:
+        tasks.append(asyncio.create_task(request(limiter, client_id, waits, refusals)))
+        await asyncio.sleep(NORMAL_INTERVAL)
+    await asyncio.gather(*tasks)
+
+
+async def run(fair: bool) -> tuple[ProviderLimiter, list, list, list, list]:
+    limiter = ProviderLimiter(
+        "bench", RATE, BURST, CONCURRENCY, MAX_QUEUE, MAX_WAIT, Histogram("bench_wait_seconds", "")
+    )
+    chatty_waits: list = []
+    chatty_refusals: list = []
+    normal_waits: list = []
+    normal_refusals: list = []
+    chatty = [
+        asyncio.create_task(request(limiter, "chatty", chatty_waits, chatty_refusals))
+        for _ in range(CHATTY_REQUESTS)
+    ]
+    await asyncio.sleep(0.01)
+    await asyncio.gather(
+        *(normal_client(limiter, f"normal_{i}" if fair else "chatty", normal_waits, normal_refusals)
+          for i in range(NORMAL_CLIENTS)),
+        *chatty,
+    )
+    return limiter, normal_waits, normal_refusals, chatty_waits, chatty_refusals
+
+
+async def main() -> int:
+    ok = True
+    for fair in (True, False):
+        limiter, normal_waits, normal_refusals, chatty_waits, chatty_refusals = await run(fair)
+        normal_total = NORMAL_CLIENTS * round(DURATION / NORMAL_INTERVAL)
+        slowest_refusal = max(chatty_refusals + normal_refusals, default=0.0) * 1000
+        normal_p95 = percentile(normal_waits, 95) * 1000
+        print(f"{'fair queue' if fair else 'single FIFO'}:")
+        print(f"  normal clients: {len(normal_waits)}/{normal_total} admitted, "
+              f"wait p50 {percentile(normal_waits, 50) * 1000:.0f}ms p95 {normal_p95:.0f}ms")
+        print(f"  chatty client:  {len(chatty_waits)}/{CHATTY_REQUESTS} admitted")
+        print(f"  refused up front {limiter.rejected}, timed out in queue {limiter.timed_out}, "
+              f"slowest refusal {slowest_refusal:.2f}ms")
+        if fair:
+            ok = (len(normal_waits) == normal_total and normal_p95 <= MAX_NORMAL_P95_MS
+                  and slowest_refusal <= MAX_REFUSAL_MS)
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,133 @@
+# benchmarks/bench_resilience.py
+"""Tail latency of the reply pipeline with slow and failing providers.
+
+ChatService.respond_with_speech is driven in-process with provider stand-ins,
+with turns started at a fixed rate so both runs see the same load. A fraction of the Gemini and TTS calls is made slow (SLOW_FRACTION, by
+SLOW_SECONDS) and a smaller fraction fails before answering (FAIL_FRACTION).
+The same turns run twice:
+- single attempt: no retries, no hedging
+- resilient: the configured retries and hedging
+
+Reported per run:
+- p50/p95/p99 time to first audio
+- failed turns
+- hedges, hedge wins and retries
+
+Exits non-zero unless the resilient run at least halves the p99 and fails
+at most a tenth as many turns as the single attempt run. A turn still fails
+when a call and its retry both fail.
+
+Usage (from backend/):
+    python -m benchmarks.bench_resilience [turns]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+
+from benchmarks.standins import NO_PROVIDER_LIMITS, Faults, install
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.update(NO_PROVIDER_LIMITS, TTS_CACHE_ENABLED="false", ANSWER_CACHE_ENABLED="false")
+
+from app.core.config import settings  # noqa: E402
+from app.services.chat_service import chat_service  # noqa: E402
+from app.services.provider_scheduler import LLM, STT, TTS, provider_scheduler  # noqa: E402
+from app.services.resilience import CircuitBreaker, ProviderGuard, ProviderResilience  # noqa: E402
+
+TURNS_PER_SECOND = 50
+CLIENTS = 20
+FIRST_TOKEN_SECONDS = 0.1
+FIRST_BYTE_SECONDS = 0.1
+SLOW_FRACTION = 0.03
+SLOW_SECONDS = 1.5
+FAIL_FRACTION = 0.01
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else 0.0
+
+
+def guards(resilient: bool) -> ProviderResilience:
+    def guard(name: str, timeout: float) -> ProviderGuard:
+        return ProviderGuard(
+            name,
+            timeout=timeout,
+            stall_timeout=settings.PROVIDER_STALL_SECONDS,
+            retries=settings.PROVIDER_RETRIES if resilient else 0,
+            retry_base=settings.PROVIDER_RETRY_BASE_SECONDS,
+            retry_max=settings.PROVIDER_RETRY_MAX_SECONDS,
+            hedge=resilient,
+            hedge_quantile=settings.HEDGE_QUANTILE,
+            hedge_min_samples=settings.HEDGE_MIN_SAMPLES,
+            # Kept closed: one percent of failures must not shed the whole load
+            breaker=CircuitBreaker(settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_RESET_SECONDS),
+            has_capacity=provider_scheduler.limiters[name].has_capacity,
+        )
+
+    return ProviderResilience({
+        STT: guard(STT, settings.STT_TIMEOUT_SECONDS),
+        LLM: guard(LLM, settings.LLM_TIMEOUT_SECONDS),
+        TTS: guard(TTS, settings.TTS_TIMEOUT_SECONDS),
+    })
+
+
+async def turn(index: int, ttfa: list, failures: list) -> None:
+    started = time.perf_counter()
+    first = None
+    try:
+        async for _ in chat_service.respond_with_speech(f"しつもん{index}", f"bench_{index % CLIENTS}"):
+            if first is None:
+                first = time.perf_counter() - started
+        ttfa.append(first)
+    except Exception as e:
+        failures.append(e)
+
+
+async def run(resilient: bool, turns: int) -> tuple[list, list, dict]:
+    faults = {
+        "llm_faults": Faults(SLOW_FRACTION, SLOW_SECONDS, FAIL_FRACTION, seed=1),
+        "tts_faults": Faults(SLOW_FRACTION, SLOW_SECONDS, FAIL_FRACTION, seed=2),
+    }
+    install(chat_service, stt_seconds=0, llm_first_token_seconds=FIRST_TOKEN_SECONDS, llm_chars_per_second=1e5,
+            tts_first_byte_seconds=FIRST_BYTE_SECONDS, tts_realtime_factor=1000, **faults)
+    chat_service.resilience = guards(resilient)
+    ttfa: list = []
+    failures: list = []
+    tasks = []
+    started = time.perf_counter()
+    for index in range(turns):
+        await asyncio.sleep(max(0.0, started + index / TURNS_PER_SECOND - time.perf_counter()))
+        tasks.append(asyncio.create_task(turn(index, ttfa, failures)))
+    await asyncio.gather(*tasks)
+    return ttfa, failures, chat_service.resilience.stats()
+
+
+async def main(turns: int) -> int:
+    logging.disable(logging.ERROR)
+    p99 = {}
+    failed = {}
+    for resilient in (False, True):
+        ttfa, failures, stats = await run(resilient, turns)
+        name = "resilient" if resilient else "single attempt"
+        p99[resilient] = percentile(ttfa, 99) * 1000
+        failed[resilient] = len(failures)
+        print(f"{name}:")
+        print(f"  time to first audio ms: p50 {percentile(ttfa, 50) * 1000:.0f}  "
+              f"p95 {percentile(ttfa, 95) * 1000:.0f}  p99 {p99[resilient]:.0f}")
+        print(f"  failed turns {len(failures)}/{turns}")
+        for provider in (LLM, TTS):
+            s = stats[provider]
+            print(f"  {provider}: {s['calls']} calls, {s['attempts']} attempts, hedged {s['hedged']} "
+                  f"(won {s['hedge_wins']}, after {s['hedge_after_ms']}ms), retried {s['retried']}, "
+                  f"timeouts {s['timeouts']}")
+    ok = p99[True] * 2 <= p99[False] and failed[True] * 10 <= failed[False]
+    print(f"p99 {p99[False]:.0f}ms -> {p99[True]:.0f}ms")
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)))
@@ -0,0 +1,116 @@
+# benchmarks/bench_send_queue.py
+"""Outbound queue behaviour with fast, slow and stalled clients.
+
+A producer pushes 40ms PCM frames as fast as TTS would. For each client the
+longest time a single put blocked the producer is measured, together with
+drops and whether the client was disconnected. Exits non-zero if the producer
+is ever blocked past put_timeout, a fast client loses frames, or a slow or
+stalled client is not disconnected.
+
+Usage (from backend/):
+    python -m benchmarks.bench_send_queue
+"""
+import asyncio
+import time
+
+from app.services.outbound_queue import OutboundQueue
+
+FRAME = b"\x00\x00" * 960  # 40ms of 24kHz 16-bit mono
+FRAMES = 500
+PUT_TIMEOUT = 0.05
+SEND_TIMEOUT = 0.5
+SLOW_CONSUMER_SECONDS = 1.0
+
+
+class FakeWebSocket:
+    """Records sends; each send takes send_delay seconds (None blocks forever)."""
+
+    def __init__(self, send_delay: float | None):
+        self.send_delay = send_delay
+        self.received = 0
+        self.closed_with: int | None = None
+
+    async def _send(self) -> None:
+        if self.send_delay is None:
+            await asyncio.Event().wait()
+        elif self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.received += 1
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self._send()
+
+    async def send_text(self, data: str) -> None:
+        await self._send()
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+
+
+async def run_client(name: str, send_delay: float | None) -> dict:
+    websocket = FakeWebSocket(send_delay)
+    queue = OutboundQueue(
+        websocket,
+        name,
+        max_bytes=64 * 1024,
+        max_messages=64,
+        put_timeout=PUT_TIMEOUT,
+        send_timeout=SEND_TIMEOUT,
+        slow_consumer_seconds=SLOW_CONSUMER_SECONDS,
+    )
+    queue.start()
+    worst_put = 0.0
+    started = time.perf_counter()
+    queue.put_text('{"type": "audio_start"}')
+    for _ in range(FRAMES):
+        put_started = time.perf_counter()
+        await queue.put_audio(FRAME)
+        worst_put = max(worst_put, time.perf_counter() - put_started)
+        if queue.closed:
+            break
+        await asyncio.sleep(0)
+    queue.put_text('{"type": "audio_end"}')
+    produce_seconds = time.perf_counter() - started
+    # Let the writer drain what is left
+    for _ in range(100):
+        if not queue.stats()["queue_depth"]:
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(SEND_TIMEOUT + 0.1)
+    stats = queue.stats()
+    queue.close()
+    return {
+        "name": name,
+        "produce_s": produce_seconds,
+        "worst_put_ms": worst_put * 1000,
+        "dropped": stats["dropped_frames"],
+        "coalesced": stats["coalesced_frames"],
+        "max_depth": stats["max_queue_depth"],
+        "disconnected": websocket.closed_with is not None,
+    }
+
+
+async def main() -> int:
+    results = await asyncio.gather(
+        run_client("fast", 0.0),
+        run_client("slow", 0.2),
+        run_client("stalled", None),
+    )
+    ok = True
+    for r in results:
+        print(
+            f"{r['name']:8s} produce {r['produce_s']:.2f}s  worst put {r['worst_put_ms']:.1f}ms  "
+            f"dropped {r['dropped']}  coalesced {r['coalesced']}  max depth {r['max_depth']}  "
+            f"disconnected {r['disconnected']}"
+        )
+        # Each put may wait put_timeout, plus scheduling slack
+        ok &= r["worst_put_ms"] <= PUT_TIMEOUT * 1000 + 20
+    fast, slow, stalled = results
+    ok &= fast["dropped"] == 0 and not fast["disconnected"]
+    ok &= slow["disconnected"] and stalled["disconnected"]
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,73 @@
+# benchmarks/bench_session_churn.py
+"""Connect/start/disconnect churn: checks that no pipeline tasks are orphaned.
+
+Each cycle opens /api/v1/ws/{client_id}, streams a little PCM, ends the
+utterance so a (deliberately slow) STT→LLM→TTS pipeline starts, and then
+disconnects mid-reply. After all cycles the server event loop must hold no
+pipeline tasks and no more tasks than it started with.
+
+Usage (from backend/):
+    python -m benchmarks.bench_session_churn [cycles]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.services.chat_service import chat_service  # noqa: E402
+from app.services.session_tasks import session_tasks  # noqa: E402
+
+
+async def slow_stt(audio_data, client_id, transcription=None):
+    await asyncio.sleep(0.001)
+    return "なんでおそらはあおいの？"
+
+
+async def endless_reply(text, client_id, audio_format=None):
+    # Stands in for a streaming LLM/TTS reply that is still running at disconnect
+    while True:
+        yield b"\x00\x00" * 960
+        await asyncio.sleep(0.05)
+
+
+def count_tasks() -> int:
+    return len(asyncio.all_tasks())
+
+
+def main() -> int:
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    logging.disable(logging.INFO)
+    chat_service.process_audio_to_text = slow_stt
+    chat_service.respond_with_speech = endless_reply
+
+    with TestClient(app) as client:
+        baseline = client.portal.call(count_tasks)
+        started = time.perf_counter()
+        for i in range(cycles):
+            with client.websocket_connect(f"/api/v1/ws/churn_{i}") as ws:
+                ws.send_text('{"type": "start_recording", "sample_rate": 16000}')
+                ws.send_bytes(b"\x10\x00" * 1600)
+                ws.send_text('{"type": "stop_recording"}')
+                ws.receive_text()  # audio_start: the pipeline is running
+        elapsed = time.perf_counter() - started
+        # Allow the last disconnect's cleanup to finish
+        time.sleep(0.2)
+        remaining = client.portal.call(count_tasks)
+        active = client.portal.call(session_tasks.active_count)
+
+    print(f"{cycles} cycles in {elapsed:.1f}s ({elapsed / cycles * 1000:.2f}ms/cycle)")
+    print(f"pipelines started: {session_tasks.started}, cancelled: {session_tasks.cancelled}")
+    print(f"event loop tasks: baseline {baseline}, after churn {remaining}; active pipelines {active}")
+    ok = active == 0 and remaining <= baseline and session_tasks.cancelled >= cycles
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,201 @@
+# benchmarks/bench_session_soak.py
+"""Memory soak: many short sessions must leave memory flat.
+
+Sessions are driven in-process through the ASGI app, with provider
+stand-ins at near-zero latency. Each session connects, speaks one utterance
+and then does one of the following:
+- waits for the reply and disconnects
+- disconnects before the reply
+- abandons the tab: it stays connected but goes silent, so the idle sweeper
+  has to evict the session and close the connection
+
+Requests for ids without a session are mixed in as well, since these used
+to re-create histories nobody removed.
+
+RSS and the number of sessions, connections, ingest buffers and per-connection
+tasks are sampled every tenth of the run. Exits non-zero if anything is still held
+after the last sweep, or if RSS grows more than MAX_GROWTH_MB after
+warm-up (the first sample).
+
+Usage (from backend/):
+    python -m benchmarks.bench_session_soak [sessions]
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.standins import NO_PROVIDER_LIMITS, install
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.update(
+    NO_PROVIDER_LIMITS,
+    SESSION_IDLE_SECONDS="5",
+    SESSION_SWEEP_INTERVAL="0.5",
+    TTS_CACHE_ENABLED="false",
+    ANSWER_CACHE_ENABLED="false",
+    CONVERSATION_STORE_PATH=os.path.join(tempfile.mkdtemp(), "conversations.sqlite3"),
+)
+
+from app.main import app  # noqa: E402
+from app.api.v1.endpoints.chat import manager  # noqa: E402
+from app.services.audio_ingest import audio_ingest  # noqa: E402
+from app.services.chat_service import chat_service  # noqa: E402
+from app.services.conversation_store import conversation_store  # noqa: E402
+from app.services.session_registry import session_registry  # noqa: E402
+from app.services.session_tasks import session_tasks  # noqa: E402
+from benchmarks.bench_e2e import INPUT_SAMPLE_RATE, make_audio  # noqa: E402
+
+CONCURRENCY = 64
+MAX_GROWTH_MB = 16.0
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class Closed(Exception):
+    pass
+
+
+class ASGIWebSocket:
+    """Minimal in-process WebSocket client speaking ASGI to the app."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+
+    async def connect(self) -> None:
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": self.path,
+            "raw_path": self.path.encode(), "root_path": "", "query_string": b"", "headers": [],
+            "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80), "subprotocols": [],
+        }
+        self._task = asyncio.create_task(app(scope, self._to_app.get, self._from_app.put))
+        self._to_app.put_nowait({"type": "websocket.connect"})
+        if (await self._from_app.get())["type"] != "websocket.accept":
+            raise Closed()
+
+    def send(self, data: str | bytes) -> None:
+        key = "text" if isinstance(data, str) else "bytes"
+        self._to_app.put_nowait({"type": "websocket.receive", key: data})
+
+    async def recv(self) -> str | bytes:
+        message = await self._from_app.get()
+        if message["type"] == "websocket.close":
+            raise Closed()
+        return message.get("text") or message.get("bytes")
+
+    async def close(self) -> None:
+        """Disconnects, or answers a close from the server, and waits for the endpoint to clean up."""
+        self._to_app.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await self._task
+
+    async def idle(self) -> None:
+        """Stays connected without sending, answering the server's close like a browser would."""
+        try:
+            while True:
+                await self.recv()
+        except Closed:
+            pass
+        await self.close()
+
+
+async def session(index: int, speech: list, idle_tabs: set) -> None:
+    ws = ASGIWebSocket(f"/api/v1/ws/soak_{index}")
+    await ws.connect()
+    ws.send(json.dumps({"type": "start_recording", "sample_rate": INPUT_SAMPLE_RATE}))
+    for chunk in speech:
+        ws.send(chunk)
+    ws.send(json.dumps({"type": "stop_recording"}))
+    kind = index % 10
+    if kind == 0:
+        await ws.close()
+        return
+    try:
+        while True:
+            message = await ws.recv()
+            if isinstance(message, str) and '"audio_end"' in message:
+                break
+    except Closed:
+        # Evicted by the server while waiting for the reply
+        await ws.close()
+        raise
+    if kind == 1:
+        task = asyncio.create_task(ws.idle())
+        idle_tabs.add(task)
+        task.add_done_callback(idle_tabs.discard)
+        return
+    if kind == 2:
+        # A late request for a client that has already gone
+        await chat_service.get_llm_response("まだいる？", f"gone_{index}")
+    await ws.close()
+
+
+def held() -> dict:
+    return {
+        "sessions": len(session_registry),
+        "connections": len(manager.active_connections),
+        "ingest": len(audio_ingest.sessions),
+        "pipelines": session_tasks.active_count(),
+        "tasks": sum(1 for task in asyncio.all_tasks() if task.get_name().startswith(("writer:", "pipeline:"))),
+    }
+
+
+async def main(total: int) -> int:
+    logging.disable(logging.WARNING)
+    install(chat_service, stt_seconds=0, llm_first_token_seconds=0, llm_chars_per_second=1e6,
+            tts_first_byte_seconds=0, tts_realtime_factor=1000)
+    await conversation_store.start()
+    session_registry.start()
+    speech, _ = make_audio(0.3)
+    idle_tabs: set = set()
+    samples = []
+    started = time.perf_counter()
+    done = failed = 0
+    step = max(total // 10, CONCURRENCY)
+    while done < total:
+        batch_end = min(done + step, total)
+        pending = set()
+        finished = []
+        for index in range(done, batch_end):
+            pending.add(asyncio.create_task(session(index, speech, idle_tabs)))
+            if len(pending) >= CONCURRENCY:
+                completed, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                finished.extend(completed)
+        finished.extend(pending)
+        results = await asyncio.gather(*finished, return_exceptions=True)
+        failed += sum(1 for result in results if isinstance(result, BaseException))
+        done = batch_end
+        samples.append((done, rss_mb(), held()))
+        print(f"{done:7d} sessions  {time.perf_counter() - started:6.1f}s  rss {samples[-1][1]:6.1f}MB  "
+              f"held {samples[-1][2]}  registry {session_registry.nbytes} bytes")
+
+    # Abandoned tabs are evicted after SESSION_IDLE_SECONDS
+    await asyncio.sleep(session_registry.idle_seconds + 2 * session_registry.sweep_interval)
+    await asyncio.gather(*idle_tabs)
+    await asyncio.sleep(0.1)  # let the last writer tasks unwind
+    remaining = held()
+    final_rss = rss_mb()
+    stats = session_registry.stats()
+    await session_registry.close()
+    await conversation_store.close()
+
+    growth = final_rss - samples[0][1]
+    print(f"after sweep: held {remaining}, rss {final_rss:.1f}MB ({growth:+.1f}MB since warm-up)")
+    print(f"failed sessions: {failed}")
+    print(f"registry: created {stats['created']}, evicted idle {stats['evicted_idle']}, "
+          f"evicted over budget {stats['evicted_budget']}")
+    ok = not any(remaining.values()) and not failed and growth < MAX_GROWTH_MB and stats["evicted_idle"] > 0
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)))
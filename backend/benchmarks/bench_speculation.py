@@ -0,0 +1,154 @@
+# benchmarks/bench_speculation.py
+"""Latency saved and LLM calls wasted by speculative LLM requests.
+
+Concurrent clients each speak a few utterances through the ingest path with
+the stub STT backend (its partial transcript grows STT_STUB_CHARS_PER_SECOND
+characters per second of audio until it equals the final transcript): voiced
+audio at 48kHz for --speech-seconds, then VAD_HANGOVER_MS of silence, the
+time it takes the server to endpoint the utterance. Each turn then gets the
+final transcript and streams the reply from the stand-in LLM, as the
+WebSocket pipeline does. Reported per mode (speculation off, and on with each
+LLM_SPECULATION_STABLE_MS of --stable-ms):
+- end of speech until the first LLM token (p50/p95)
+- speculative requests, hits and wasted requests per turn, from /metrics
+- the saved head start of adopted replies (mean)
+
+Also checks that every client's history holds exactly one question and one
+answer per turn, whether or not the reply was speculative.
+
+Exits non-zero if a history is wrong, or if speculation with the default
+LLM_SPECULATION_STABLE_MS misses a turn or does not cut the p50 by at least
+half of --llm-first-token-ms.
+
+Usage (from backend/):
+    python -m benchmarks.bench_speculation [--clients 8] [--turns 3]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from benchmarks.standins import NO_PROVIDER_LIMITS, install
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+for _name, _value in NO_PROVIDER_LIMITS.items():
+    os.environ.setdefault(_name, _value)
+# Every client asks the stub's question; the cache would answer all but the first
+os.environ["ANSWER_CACHE_ENABLED"] = "false"
+
+from app.core.config import settings  # noqa: E402
+from app.services import metrics  # noqa: E402
+from app.services.audio_ingest import AudioIngestSession  # noqa: E402
+from app.services.chat_service import chat_service  # noqa: E402
+from app.services.stt import create_stt_backend  # noqa: E402
+
+CAPTURE_RATE = 48000
+CHUNK_SAMPLES = 4096
+DEFAULT_STABLE_MS = settings.LLM_SPECULATION_STABLE_MS
+
+
+def voiced(seconds: float, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * CAPTURE_RATE)) / CAPTURE_RATE
+    signal = 4000 * np.sin(2 * np.pi * 220 * t) + rng.normal(0, 200, t.size)
+    return signal.astype("<i2").tobytes()
+
+
+async def turn(client_id: str, pcm: bytes, results: dict) -> None:
+    ingest = AudioIngestSession(client_id, sample_rate=CAPTURE_RATE)
+    ingest.start()
+    ingest.attach(chat_service.open_transcription(client_id, ingest.output_rate))
+    step = CHUNK_SAMPLES * 2
+    for offset in range(0, len(pcm), step):
+        ingest.feed(pcm[offset:offset + step])
+        await asyncio.sleep(CHUNK_SAMPLES / CAPTURE_RATE)
+    end_of_speech = time.perf_counter()
+    audio_data = ingest.finish()
+    transcription = ingest.take_transcription()
+    try:
+        text = await chat_service.process_audio_to_text(audio_data, client_id, transcription)
+        first_token = None
+        async for _ in chat_service.stream_llm_response(text, client_id):
+            if first_token is None:
+                first_token = time.perf_counter() - end_of_speech
+        results["first_token_ms"].append(first_token * 1000)
+    finally:
+        transcription.close()
+
+
+async def client(index: int, args: argparse.Namespace, results: dict) -> None:
+    client_id = f"client_{index}"
+    owner = await chat_service.open_session(client_id)
+    chat_service.clear_conversation(client_id)
+    silence = bytes(int(CAPTURE_RATE * settings.VAD_HANGOVER_MS / 1000) * 2)
+    try:
+        for number in range(args.turns):
+            await turn(client_id, voiced(args.speech_seconds, index * 100 + number) + silence, results)
+        if len(chat_service.sessions.get(client_id)) != 2 * args.turns:
+            results["bad_histories"] += 1
+    finally:
+        await chat_service.close_session(client_id, owner)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    counters = (metrics.LLM_SPECULATIONS, metrics.LLM_SPECULATION_HITS, metrics.LLM_SPECULATION_WASTED)
+    before = [counter.value for counter in counters]
+    saved = metrics.LLM_SPECULATION_SAVED_SECONDS
+    saved_before = (saved.count, saved.sum)
+    results = {"first_token_ms": [], "bad_histories": 0}
+    await asyncio.gather(*(client(index, args, results) for index in range(args.clients)))
+    await asyncio.sleep(0.1) # let discarded requests close
+    results["started"], results["hits"], results["wasted"] = (
+        counter.value - start for counter, start in zip(counters, before)
+    )
+    adopted = saved.count - saved_before[0]
+    results["saved_ms"] = (saved.sum - saved_before[1]) / adopted * 1000 if adopted else 0.0
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=3, help="utterances per client")
+    parser.add_argument("--speech-seconds", type=float, default=3.0,
+                        help="voiced audio per utterance (the stub transcript is complete after "
+                             f"{len(settings.STT_STUB_TEXT) / settings.STT_STUB_CHARS_PER_SECOND:.2f}s)")
+    parser.add_argument("--llm-first-token-ms", type=float, default=300.0)
+    parser.add_argument("--stable-ms", type=int, nargs="+", default=[DEFAULT_STABLE_MS, 100])
+    args = parser.parse_args()
+
+    chat_service.stt = create_stt_backend("stub")
+    install(chat_service, llm_first_token_seconds=args.llm_first_token_ms / 1000)
+    turns = args.clients * args.turns
+    print(f"{args.clients} clients x {args.turns} turns of {args.speech_seconds}s speech + "
+          f"{settings.VAD_HANGOVER_MS}ms endpointing silence, LLM first token {args.llm_first_token_ms:.0f}ms:")
+    print(f"  {'mode':14s} {'1st token p50':>13s} {'p95':>7s} {'requests':>9s} {'hits':>6s} "
+          f"{'wasted':>7s} {'per turn':>9s} {'saved':>7s}")
+    modes = [("off", None)] + [(f"on, {stable}ms", stable) for stable in args.stable_ms]
+    ok = True
+    bad_histories = 0
+    p50_off = None
+    for name, stable in modes:
+        settings.LLM_SPECULATION_ENABLED = stable is not None
+        if stable is not None:
+            settings.LLM_SPECULATION_STABLE_MS = stable
+        results = asyncio.run(run(args))
+        p50 = float(np.percentile(results["first_token_ms"], 50))
+        p95 = float(np.percentile(results["first_token_ms"], 95))
+        print(f"  {name:14s} {p50:11.0f}ms {p95:5.0f}ms {results['started']:9d} {results['hits']:6d} "
+              f"{results['wasted']:7d} {results['wasted'] / turns:9.1f} {results['saved_ms']:5.0f}ms")
+        bad_histories += results["bad_histories"]
+        if stable is None:
+            p50_off = p50
+        elif stable == DEFAULT_STABLE_MS:
+            ok = ok and results["hits"] == turns and p50 <= p50_off - args.llm_first_token_ms / 2
+    print(f"histories: {'ok' if not bad_histories else f'{bad_histories} WRONG'}")
+    ok = ok and not bad_histories
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
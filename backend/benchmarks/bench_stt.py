@@ -0,0 +1,134 @@
+# benchmarks/bench_stt.py
+"""End-of-speech to final transcript latency per STT backend.
+
+Concurrent clients each speak a few utterances of voiced audio captured at
+48kHz, streamed in real time in chunks of 4096 samples through the ingest
+path (conditioning, then the utterance's transcription stream), as the
+WebSocket endpoint does. At the end of each utterance the final transcript
+is awaited through ChatService.process_audio_to_text. Reported per backend:
+- end of speech until the final transcript (p50/p95/max)
+- start of speech until the first partial transcript, and partial updates
+  per utterance (streaming backends)
+
+Backends:
+- google: batch recognition after the utterance; there is no network
+  here, so Google is the stand-in recognizer with a fixed --google-ms
+  round trip (modeled, not measured)
+- stub: the deterministic streaming backend
+- vosk: measured if the vosk package and a model at STT_VOSK_MODEL_PATH
+  are installed, skipped otherwise
+
+Exits non-zero if a streaming backend takes more than --max-final-ms from
+end of speech to its final transcript at p95.
+
+Usage (from backend/):
+    python -m benchmarks.bench_stt [--clients 4] [--utterances 2] [--speech-seconds 2]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from benchmarks.standins import NO_PROVIDER_LIMITS, FakeRecognizer
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+for _name, _value in NO_PROVIDER_LIMITS.items():
+    os.environ.setdefault(_name, _value)
+
+from app.core.config import settings  # noqa: E402
+from app.services.audio_ingest import AudioIngestSession  # noqa: E402
+from app.services.chat_service import chat_service  # noqa: E402
+from app.services.stt import STTBackend, create_stt_backend  # noqa: E402
+
+CAPTURE_RATE = 48000
+CHUNK_SAMPLES = 4096
+
+
+def voiced(seconds: float, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * CAPTURE_RATE)) / CAPTURE_RATE
+    pitch = 200 + 40 * np.sin(2 * np.pi * 1.5 * t)
+    signal = 4000 * np.sin(2 * np.pi * np.cumsum(pitch) / CAPTURE_RATE) + rng.normal(0, 200, t.size)
+    return signal.astype("<i2").tobytes()
+
+
+async def utterance(client_id: str, pcm: bytes, results: dict) -> None:
+    ingest = AudioIngestSession(client_id, sample_rate=CAPTURE_RATE)
+    ingest.start()
+    transcription = chat_service.open_transcription(client_id, ingest.output_rate)
+    ingest.attach(transcription)
+    started = time.perf_counter()
+    partials = [] # (time, text)
+    transcription.listeners.append(lambda text: partials.append((time.perf_counter(), text)))
+    step = CHUNK_SAMPLES * 2
+    for offset in range(0, len(pcm), step):
+        ingest.feed(pcm[offset:offset + step])
+        await asyncio.sleep(CHUNK_SAMPLES / CAPTURE_RATE)
+    end_of_speech = time.perf_counter()
+    audio_data = ingest.finish()
+    text = await chat_service.process_audio_to_text(audio_data, client_id, ingest.take_transcription())
+    results["final_ms"].append((time.perf_counter() - end_of_speech) * 1000)
+    results["texts"].add(text)
+    results["partials"].append(len(partials))
+    if partials:
+        results["first_partial_ms"].append((partials[0][0] - started) * 1000)
+
+
+async def client(index: int, args: argparse.Namespace, results: dict) -> None:
+    for turn in range(args.utterances):
+        await utterance(f"client_{index}", voiced(args.speech_seconds, index * 100 + turn), results)
+
+
+async def run(backend: STTBackend, args: argparse.Namespace) -> dict:
+    chat_service.stt = backend
+    results = {"final_ms": [], "first_partial_ms": [], "partials": [], "texts": set()}
+    await asyncio.gather(*(client(index, args, results) for index in range(args.clients)))
+    return results
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--utterances", type=int, default=2, help="utterances per client")
+    parser.add_argument("--speech-seconds", type=float, default=2.0)
+    parser.add_argument("--google-ms", type=float, default=400.0, help="stand-in Google recognition round trip")
+    parser.add_argument("--max-final-ms", type=float, default=150.0, help="p95 gate for streaming backends")
+    args = parser.parse_args()
+
+    backends = []
+    google = create_stt_backend("google")
+    google.recognizer = FakeRecognizer(args.google_ms / 1000)
+    backends.append(google)
+    backends.append(create_stt_backend("stub"))
+    try:
+        backends.append(create_stt_backend("vosk"))
+    except Exception as e:
+        print(f"vosk: skipped ({e})")
+
+    print(f"{args.clients} clients x {args.utterances} utterances of {args.speech_seconds}s "
+          f"at {CAPTURE_RATE}Hz, STT at {settings.AUDIO_STT_SAMPLE_RATE}Hz:")
+    print(f"  {'backend':8s} {'streaming':>9s} {'final p50':>10s} {'p95':>8s} {'max':>8s} "
+          f"{'1st partial':>12s} {'partials':>9s}")
+    ok = True
+    for backend in backends:
+        results = asyncio.run(run(backend, args))
+        final = results["final_ms"]
+        p95 = percentile(final, 95)
+        if backend.streaming:
+            ok = ok and p95 <= args.max_final_ms
+        first_partial = f"{percentile(results['first_partial_ms'], 50):10.0f}ms" if backend.streaming else "-".rjust(12)
+        print(f"  {backend.name:8s} {str(backend.streaming):>9s} {percentile(final, 50):8.0f}ms {p95:6.0f}ms "
+              f"{max(final):6.0f}ms {first_partial} {np.mean(results['partials']):9.1f}")
+        print(f"           {len(results['texts'])} distinct transcripts, e.g. {min(results['texts'])}")
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,141 @@
+# benchmarks/bench_tts_segments.py
+"""Serial vs segmented synthesis of complete replies.
+
+A complete reply of about 200 characters is synthesized through
+ChatService.synthesize_speech_stream, as on the non-streaming LLM path and
+for canned messages. The TTS stand-in takes FIRST_BYTE_SECONDS to the first
+byte and then renders REALTIME_FACTOR audio seconds per second. REPLIES
+replies run CONCURRENCY at a time, first as one request per reply, then
+split at sentences with TTS_SEGMENT_FANOUT requests in flight per reply.
+
+Reported per mode:
+- time to the first audio chunk
+- time to the whole reply
+
+Reassembly is also checked with a stand-in whose every response ends in a
+stray odd byte, with and without silence gaps. The audio of every sentence
+must come out whole (no sample split across segments) and in order.
+
+Exits non-zero if reassembly is wrong or segmentation does not cut the p50
+time to the whole reply.
+
+Usage (from backend/):
+    python -m benchmarks.bench_tts_segments
+"""
+import asyncio
+import itertools
+import logging
+import os
+import time
+
+from benchmarks.standins import NO_PROVIDER_LIMITS, REPLY_SENTENCES, FakeOpenAI, install, speech_sample
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.update(NO_PROVIDER_LIMITS, TTS_CACHE_ENABLED="false")
+
+from app.core.config import settings  # noqa: E402
+from app.services.chat_service import chat_service  # noqa: E402
+from app.utils.text_utils import split_sentences  # noqa: E402
+
+REPLIES = 40
+CONCURRENCY = 10
+FIRST_BYTE_SECONDS = 0.2
+REALTIME_FACTOR = 4.0
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else 0.0
+
+
+class _OddTailCreate:
+    def __init__(self, create):
+        self.create = create
+
+    async def __aenter__(self):
+        response = await self.create.__aenter__()
+        iter_bytes = response.iter_bytes
+
+        async def with_odd_tail(chunk_size: int = 1024):
+            async for chunk in iter_bytes(chunk_size):
+                yield chunk
+            yield b"\x7f"
+
+        response.iter_bytes = with_odd_tail
+        return response
+
+    async def __aexit__(self, *exc_info) -> None:
+        return await self.create.__aexit__(*exc_info)
+
+
+class OddTailOpenAI(FakeOpenAI):
+    """TTS stand-in whose every response ends in a stray byte, like a truncated PCM stream."""
+
+    def _create(self, *, input: str, **kwargs) -> _OddTailCreate:
+        return _OddTailCreate(super()._create(input=input, **kwargs))
+
+
+async def synthesize(index: int, first: list, total: list) -> None:
+    text = f"しつもん{index}だね。" + "".join(REPLY_SENTENCES)
+    started = time.perf_counter()
+    first_chunk = None
+    async for _ in chat_service.synthesize_speech_stream(text):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - started
+    first.append(first_chunk)
+    total.append(time.perf_counter() - started)
+
+
+async def run(segmented: bool) -> tuple[list, list]:
+    settings.TTS_SEGMENTED = segmented
+    first: list = []
+    total: list = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def limited(index: int) -> None:
+        async with semaphore:
+            await synthesize(index, first, total)
+
+    await asyncio.gather(*(limited(index) for index in range(REPLIES)))
+    return first, total
+
+
+async def reassembled_in_order(gap_ms: int) -> bool:
+    settings.TTS_SEGMENTED = True
+    settings.TTS_SEGMENT_GAP_MS = gap_ms
+    chat_service.openai_client = OddTailOpenAI(FIRST_BYTE_SECONDS, REALTIME_FACTOR * 10)
+    text = "ちょっとまってね。" + "".join(REPLY_SENTENCES)
+    audio = bytearray()
+    async for chunk in chat_service.synthesize_speech_stream(text):
+        audio.extend(chunk)
+    if len(audio) % 2:
+        return False
+    runs = [sample for sample, _ in itertools.groupby(bytes(audio[i:i + 2]) for i in range(0, len(audio), 2))]
+    expected = []
+    for index, segment in enumerate(split_sentences(text, settings.TTS_SENTENCE_MIN_CHARS)):
+        if index and gap_ms:
+            expected.append(b"\x00\x00")
+        expected.append(speech_sample(segment))
+    return runs == expected
+
+
+async def main() -> int:
+    logging.disable(logging.WARNING)
+    install(chat_service, tts_first_byte_seconds=FIRST_BYTE_SECONDS, tts_realtime_factor=REALTIME_FACTOR)
+    p50_total = {}
+    for segmented in (False, True):
+        first, total = await run(segmented)
+        p50_total[segmented] = percentile(total, 50) * 1000
+        name = f"segmented (fan-out {settings.TTS_SEGMENT_FANOUT})" if segmented else "one request"
+        print(f"{name}:")
+        print(f"  first audio ms: p50 {percentile(first, 50) * 1000:.0f}  p95 {percentile(first, 95) * 1000:.0f}")
+        print(f"  whole reply ms: p50 {p50_total[segmented]:.0f}  p95 {percentile(total, 95) * 1000:.0f}")
+    in_order = await reassembled_in_order(0) and await reassembled_in_order(50)
+    print(f"reassembly with odd-length segments and gaps: {'ok' if in_order else 'WRONG'}")
+    ok = in_order and p50_total[True] < p50_total[False]
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
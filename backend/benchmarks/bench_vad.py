@@ -0,0 +1,84 @@
+# benchmarks/bench_vad.py
+"""Micro-benchmark for the streaming VAD endpointer over synthetic PCM.
+
+Generates noise / voiced speech / noise at 16 kHz, feeds it in 4096-sample
+chunks (the browser ScriptProcessor size) and reports per-chunk cost,
+realtime factor, sessions per core and endpointing delay after speech ends.
+
+Usage (from backend/):
+    python -m benchmarks.bench_vad
+"""
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.vad import END_OF_UTTERANCE, SPEECH_START, StreamingEndpointer
+
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 4096
+ITERATIONS = 200
+
+
+def synthetic_utterance(rng: np.random.Generator, lead_s: float, speech_s: float, tail_s: float) -> np.ndarray:
+    """Builds noise + harmonic, amplitude-modulated 'speech' + noise as Int16."""
+    def noise(seconds: float) -> np.ndarray:
+        return rng.normal(0, 60, int(seconds * SAMPLE_RATE))
+
+    t = np.arange(int(speech_s * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = 220 + 30 * np.sin(2 * np.pi * 1.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t) ** 2
+    speech = 4000 * envelope * voiced + rng.normal(0, 60, t.size)
+    pcm = np.concatenate((noise(lead_s), speech, noise(tail_s)))
+    return np.clip(pcm, -32768, 32767).astype("<i2")
+
+
+def run_once(pcm: bytes) -> tuple[list[tuple[str, float]], float]:
+    endpointer = StreamingEndpointer(SAMPLE_RATE)
+    events = []
+    step = CHUNK_SAMPLES * 2
+    started = time.perf_counter()
+    for offset in range(0, len(pcm), step):
+        event = endpointer.process(pcm[offset:offset + step])
+        if event:
+            events.append((event, (offset + step) / 2 / SAMPLE_RATE))
+        if event == END_OF_UTTERANCE:
+            break
+    return events, time.perf_counter() - started
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    lead, speech, tail = 0.5, 1.5, 1.5
+    pcm = synthetic_utterance(rng, lead, speech, tail).tobytes()
+
+    events, _ = run_once(pcm)
+    for name, at in events:
+        print(f"{name:>18} at {at:.3f}s")
+    end = dict(events).get(END_OF_UTTERANCE)
+    if dict(events).get(SPEECH_START) is None or end is None:
+        raise SystemExit("FAIL: speech start / end of utterance not detected")
+    print(f"endpoint delay after speech end: {(end - lead - speech) * 1000:.0f}ms "
+          f"(hangover {settings.VAD_HANGOVER_MS}ms, chunk {CHUNK_SAMPLES / SAMPLE_RATE * 1000:.0f}ms)")
+
+    # Full stream without early exit, repeated, to time steady-state cost.
+    endpointer = StreamingEndpointer(SAMPLE_RATE, no_speech_timeout=1e9, max_utterance=1e9)
+    step = CHUNK_SAMPLES * 2
+    chunks = [pcm[o:o + step] for o in range(0, len(pcm) - step + 1, step)]
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        endpointer.reset()
+        for chunk in chunks:
+            endpointer.process(chunk)
+    elapsed = time.perf_counter() - started
+    audio_seconds = ITERATIONS * len(chunks) * CHUNK_SAMPLES / SAMPLE_RATE
+    per_chunk_us = elapsed / (ITERATIONS * len(chunks)) * 1e6
+    realtime = audio_seconds / elapsed
+    print(f"per chunk: {per_chunk_us:.1f}us, realtime factor: {realtime:.0f}x "
+          f"(~{realtime:.0f} concurrent sessions per core)")
+
+
+if __name__ == "__main__":
+    main()
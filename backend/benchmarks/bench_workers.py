@@ -0,0 +1,121 @@
+# benchmarks/bench_workers.py
+"""Sessions per second with 1 vs N uvicorn workers sharing a SQLite session store.
+
+For each worker count, `uvicorn benchmarks.standin_app:app --workers N` is
+started with SESSION_STORE=sqlite and near-zero stand-in latencies, so the
+run is bound by server CPU rather than provider latency. Client processes
+then open short sessions in a loop for a fixed time. Each session connects,
+streams a short utterance without pacing, waits for the reply's audio_end
+and disconnects.
+
+Each session uses a random client id, so consecutive sessions of a client
+land on arbitrary workers (non-sticky routing).
+
+Usage (from backend/):
+    python -m benchmarks.bench_workers --workers 4 --seconds 20
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from benchmarks.bench_e2e import INPUT_SAMPLE_RATE, free_port, make_audio, wait_ready
+
+
+async def session_loop(url: str, deadline: float, speech: list[bytes]) -> tuple[int, int]:
+    from websockets.asyncio.client import connect
+
+    done = failed = 0
+    while time.monotonic() < deadline:
+        try:
+            async with connect(f"{url}/api/v1/ws/bench_{uuid.uuid4().hex[:12]}", max_size=None) as ws:
+                await ws.send(json.dumps({"type": "start_recording", "sample_rate": INPUT_SAMPLE_RATE}))
+                for chunk in speech:
+                    await ws.send(chunk)
+                await ws.send(json.dumps({"type": "stop_recording"}))
+                async with asyncio.timeout(30):
+                    while True:
+                        message = await ws.recv()
+                        if isinstance(message, str) and '"audio_end"' in message:
+                            break
+            done += 1
+        except Exception:
+            failed += 1
+    return done, failed
+
+
+def client_process(args: tuple[str, float, int]) -> tuple[int, int]:
+    url, deadline, concurrency = args
+    speech, _ = make_audio(0.3)
+
+    async def run() -> list[tuple[int, int]]:
+        return await asyncio.gather(*(session_loop(url, deadline, speech) for _ in range(concurrency)))
+
+    results = asyncio.run(run())
+    return sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+def measure(workers: int, args, db_path: str) -> tuple[float, int]:
+    port = free_port()
+    env = dict(
+        os.environ,
+        SESSION_STORE="sqlite",
+        SESSION_STORE_PATH=db_path,
+        UVICORN_WORKERS=str(workers),
+        TTS_CACHE_ENABLED="false",
+        ANSWER_CACHE_ENABLED="false",
+        BENCH_STT_MS="0",
+        BENCH_LLM_TTFT_MS="0",
+        BENCH_TTS_TTFB_MS="0",
+        BENCH_TTS_REALTIME="1000",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.standin_app:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port, timeout=60)
+        time.sleep(1.0 * workers) # let every worker finish its startup
+        deadline = time.monotonic() + args.seconds
+        jobs = [(f"ws://127.0.0.1:{port}", deadline, args.concurrency)] * args.client_processes
+        with multiprocessing.get_context("spawn").Pool(args.client_processes) as pool:
+            results = pool.map(client_process, jobs)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    done = sum(r[0] for r in results)
+    failed = sum(r[1] for r in results)
+    return done / args.seconds, failed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--client-processes", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=16, help="session loops per client process")
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}")
+    failed_any = False
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in sorted({1, args.workers}):
+            rate, failed = measure(workers, args, os.path.join(tmp, f"sessions_{workers}.sqlite3"))
+            baseline = baseline or rate
+            failed_any |= failed > 0
+            print(f"workers {workers:2d}: {rate:7.1f} sessions/s ({rate / baseline:.2f}x), failed {failed}")
+    print("PASS" if not failed_any else "FAIL")
+    return 0 if not failed_any else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,31 @@
+# benchmarks/standin_app.py
+"""The app with provider stand-ins installed, for uvicorn runs with several workers.
+
+Each worker imports this module and patches its own chat_service:
+
+    uvicorn benchmarks.standin_app:app --workers 4
+
+Stand-in latencies are read from BENCH_STT_MS, BENCH_LLM_TTFT_MS,
+BENCH_TTS_TTFB_MS and BENCH_TTS_REALTIME.
+"""
+import logging
+import os
+
+from benchmarks.standins import NO_PROVIDER_LIMITS, install
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+for name, value in NO_PROVIDER_LIMITS.items():
+    os.environ.setdefault(name, value)
+
+from app.main import app  # noqa: E402,F401
+from app.services.chat_service import chat_service  # noqa: E402
+
+logging.getLogger().setLevel(os.getenv("BENCH_LOG_LEVEL", "WARNING"))
+
+install(
+    chat_service,
+    stt_seconds=float(os.getenv("BENCH_STT_MS", "150")) / 1000,
+    llm_first_token_seconds=float(os.getenv("BENCH_LLM_TTFT_MS", "300")) / 1000,
+    tts_first_byte_seconds=float(os.getenv("BENCH_TTS_TTFB_MS", "200")) / 1000,
+    tts_realtime_factor=float(os.getenv("BENCH_TTS_REALTIME", "4")),
+)
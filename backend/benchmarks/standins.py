@@ -0,0 +1,260 @@
+# benchmarks/standins.py
+"""Local stand-ins for Gemini, OpenAI TTS and Google STT.
+
+They implement just the surface ChatService uses, with configurable latency
+and throughput, so benchmarks can drive the real pipeline offline. Faults
+makes a fraction of the calls slow or fail, like a misbehaving provider.
+
+    from benchmarks.standins import Faults, install
+    install(chat_service, stt_seconds=0.15, llm_first_token_seconds=0.3,
+            tts_faults=Faults(slow_fraction=0.05, slow_seconds=2.0))
+"""
+import asyncio
+import itertools
+import random
+import time
+import zlib
+from types import SimpleNamespace
+from typing import AsyncIterator, List
+
+import httpx
+import speech_recognition as sr
+from google.api_core.exceptions import ServiceUnavailable
+from openai import APIConnectionError
+
+# Stand-ins have no quota: environment that lifts the provider rate limits and
+# concurrency caps, applied before the app is imported unless set already
+NO_PROVIDER_LIMITS = {
+    "STT_RATE_PER_SECOND": "1000000", "STT_BURST": "1000000",
+    "LLM_RATE_PER_SECOND": "1000000", "LLM_BURST": "1000000", "LLM_MAX_CONCURRENCY": "100000",
+    "TTS_RATE_PER_SECOND": "1000000", "TTS_BURST": "1000000", "TTS_MAX_CONCURRENCY": "100000",
+}
+
+# A reply the length the persona prompt asks for (150-200 characters)
+REPLY_SENTENCES = (
+    "いいしつもんだね。",
+    "おそらがあおいのは、おひさまのひかりがくうきのなかでちらばるからなんだよ。",
+    "あおいいろのひかりは、ほかのいろよりもたくさんちらばるんだ。",
+    "だから、どこをみてもおそらはあおくみえるんだね。",
+    "ゆうがたになると、ひかりがながいみちをとおるから、あかくみえるんだよ。",
+    "こんどおそとにでたら、おそらのいろをよくみてみようね。",
+)
+
+
+class Faults:
+    """Injected misbehaviour of a stand-in: some calls are slow, some fail before answering."""
+
+    def __init__(self, slow_fraction: float = 0.0, slow_seconds: float = 0.0, fail_fraction: float = 0.0, seed: int = 0):
+        """
+        Args:
+            slow_fraction: Fraction of calls delayed before their first result.
+            slow_seconds: Extra delay of a slow call.
+            fail_fraction: Fraction of calls failing with a transient error.
+            seed: Seed of the random draws, for repeatable runs.
+        """
+        self.slow_fraction = slow_fraction
+        self.slow_seconds = slow_seconds
+        self.fail_fraction = fail_fraction
+        self._random = random.Random(seed)
+
+    def draw(self) -> tuple[float, bool]:
+        """Returns the extra delay of the next call and whether it fails."""
+        extra = self.slow_seconds if self._random.random() < self.slow_fraction else 0.0
+        return extra, self._random.random() < self.fail_fraction
+
+
+NO_FAULTS = Faults()
+
+
+class FakeRecognizer(sr.Recognizer):
+    """Google STT stand-in: blocks for a fixed time and returns a distinct question."""
+
+    def __init__(self, latency_seconds: float = 0.15, faults: Faults = NO_FAULTS):
+        super().__init__()
+        self.latency_seconds = latency_seconds
+        self.faults = faults
+        self._counter = itertools.count()
+
+    def recognize_google(self, audio_data, key=None, language="en-US", **kwargs):
+        extra, fail = self.faults.draw()
+        time.sleep(self.latency_seconds + extra)
+        if fail:
+            raise sr.RequestError("recognition connection failed: stand-in fault")
+        # Distinct text per call so answer and TTS caches do not short-circuit
+        return f"しつもん{next(self._counter)}なんでおそらはあおいの"
+
+
+class _FakeChunk:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _FakeStream:
+    """Streaming Gemini response: first token after a delay, then paced pieces."""
+
+    def __init__(
+        self, reply: str, first_token_seconds: float, chars_per_second: float, piece_chars: int, fail: bool = False
+    ):
+        self.reply = reply
+        self.first_token_seconds = first_token_seconds
+        self.chars_per_second = chars_per_second
+        self.piece_chars = piece_chars
+        self.fail = fail
+
+    async def __aiter__(self) -> AsyncIterator[_FakeChunk]:
+        await asyncio.sleep(self.first_token_seconds)
+        if self.fail:
+            raise ServiceUnavailable("stand-in fault")
+        for offset in range(0, len(self.reply), self.piece_chars):
+            if offset:
+                await asyncio.sleep(self.piece_chars / self.chars_per_second)
+            yield _FakeChunk(self.reply[offset:offset + self.piece_chars])
+
+
+class _FakeChat:
+    def __init__(self, model: "FakeGenerativeModel"):
+        self.model = model
+
+    async def send_message_async(self, text: str, stream: bool = False):
+        model = self.model
+        reply = model.reply_for(text)
+        extra, fail = model.faults.draw()
+        if stream:
+            return _FakeStream(reply, model.first_token_seconds + extra, model.chars_per_second, model.piece_chars, fail)
+        await asyncio.sleep(model.first_token_seconds + extra + len(reply) / model.chars_per_second)
+        if fail:
+            raise ServiceUnavailable("stand-in fault")
+        return _FakeChunk(reply)
+
+
+class FakeGenerativeModel:
+    """Gemini GenerativeModel stand-in with a fixed time to first token and output rate."""
+
+    def __init__(
+        self,
+        first_token_seconds: float = 0.3,
+        chars_per_second: float = 400.0,
+        piece_chars: int = 16,
+        faults: Faults = NO_FAULTS,
+    ):
+        self.first_token_seconds = first_token_seconds
+        self.chars_per_second = chars_per_second
+        self.piece_chars = piece_chars
+        self.faults = faults
+
+    @staticmethod
+    def reply_for(text: str) -> str:
+        """Returns a reply that starts with the question, so every reply is distinct."""
+        return f"{text}だね。" + "".join(REPLY_SENTENCES)
+
+    def start_chat(self, history: List | None = None) -> _FakeChat:
+        return _FakeChat(self)
+
+    async def generate_content_async(self, prompt: str):
+        await asyncio.sleep(self.first_token_seconds)
+        return _FakeChunk("こどもがおそらのいろについてしつもんした。")
+
+
+def speech_sample(text: str) -> bytes:
+    """Returns the 16-bit sample the TTS stand-in fills the audio of a text with."""
+    return (zlib.crc32(text.encode()) % 30000 + 1).to_bytes(2, "little")
+
+
+class _FakeSpeechResponse:
+    def __init__(self, total_bytes: int, bytes_per_second: float, sample: bytes):
+        self.total_bytes = total_bytes
+        self.bytes_per_second = bytes_per_second
+        self.sample = sample
+
+    async def iter_bytes(self, chunk_size: int = 1024) -> AsyncIterator[bytes]:
+        # Constant audio per text, so the order of reassembled segments can be checked
+        chunk = self.sample * (chunk_size // 2)
+        started = time.perf_counter()
+        for sent in range(0, self.total_bytes, chunk_size):
+            # Sleep only when more than a few milliseconds ahead of the target rate
+            ahead = sent / self.bytes_per_second - (time.perf_counter() - started)
+            if ahead > 0.005:
+                await asyncio.sleep(ahead)
+            yield chunk[:min(chunk_size, self.total_bytes - sent)]
+
+
+class _FakeStreamingCreate:
+    def __init__(self, tts: "FakeOpenAI", text: str):
+        self.tts = tts
+        self.text = text
+
+    async def __aenter__(self) -> _FakeSpeechResponse:
+        extra, fail = self.tts.faults.draw()
+        await asyncio.sleep(self.tts.first_byte_seconds + extra)
+        if fail:
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/audio/speech"))
+        seconds = max(len(self.text) / self.tts.chars_per_second, 0.2)
+        # 24kHz 16-bit mono, kept sample aligned
+        total_bytes = int(seconds * 24000) * 2
+        return _FakeSpeechResponse(total_bytes, 24000 * 2 * self.tts.realtime_factor, speech_sample(self.text))
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+
+class FakeOpenAI:
+    """AsyncOpenAI stand-in exposing audio.speech.with_streaming_response.create()."""
+
+    def __init__(
+        self,
+        first_byte_seconds: float = 0.2,
+        realtime_factor: float = 4.0,
+        chars_per_second: float = 8.0,
+        faults: Faults = NO_FAULTS,
+    ):
+        """
+        Args:
+            first_byte_seconds: Delay before the response starts.
+            realtime_factor: Audio seconds produced per wall-clock second.
+            chars_per_second: Speaking rate used to size the audio.
+            faults: Slow and failing requests to inject.
+        """
+        self.first_byte_seconds = first_byte_seconds
+        self.realtime_factor = realtime_factor
+        self.chars_per_second = chars_per_second
+        self.faults = faults
+        streaming = SimpleNamespace(create=self._create)
+        self.audio = SimpleNamespace(speech=SimpleNamespace(with_streaming_response=streaming))
+
+    def _create(self, *, input: str, **kwargs) -> _FakeStreamingCreate:
+        return _FakeStreamingCreate(self, input)
+
+
+def install(
+    service,
+    stt_seconds: float = 0.15,
+    llm_first_token_seconds: float = 0.3,
+    llm_chars_per_second: float = 400.0,
+    tts_first_byte_seconds: float = 0.2,
+    tts_realtime_factor: float = 4.0,
+    stt_faults: Faults = NO_FAULTS,
+    llm_faults: Faults = NO_FAULTS,
+    tts_faults: Faults = NO_FAULTS,
+) -> None:
+    """
+    Replaces a ChatService's provider clients with local stand-ins.
+
+    Args:
+        service: The ChatService to patch.
+        stt_seconds: Blocking time of each recognize_google call (google STT backend).
+        llm_first_token_seconds: Gemini time to first token.
+        llm_chars_per_second: Gemini output rate after the first token.
+        tts_first_byte_seconds: OpenAI TTS time to first byte.
+        tts_realtime_factor: OpenAI TTS audio seconds per wall-clock second.
+        stt_faults: Slow and failing STT calls to inject.
+        llm_faults: Slow and failing Gemini calls to inject (reply requests only).
+        tts_faults: Slow and failing TTS requests to inject.
+    """
+    service.recognizer = FakeRecognizer(stt_seconds, stt_faults)
+    if service.stt.name == "google":
+        service.stt.recognizer = service.recognizer
+    service.gemini_model = FakeGenerativeModel(llm_first_token_seconds, llm_chars_per_second, faults=llm_faults)
+    service.summary_model = FakeGenerativeModel(llm_first_token_seconds, llm_chars_per_second)
+    service.openai_client = FakeOpenAI(tts_first_byte_seconds, tts_realtime_factor, faults=tts_faults)
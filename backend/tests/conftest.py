@@ -0,0 +1,15 @@
+# tests/conftest.py
+"""Test environment: no provider keys and every runtime file in a temporary directory.
+
+Set before the app is imported, since settings are read at import time.
+Run from backend/:
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+_runtime_dir = tempfile.mkdtemp(prefix="voicechat-tests-")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("TTS_CACHE_DIR", os.path.join(_runtime_dir, "tts_cache"))
+os.environ.setdefault("SESSION_STORE_PATH", os.path.join(_runtime_dir, "sessions.sqlite3"))
+os.environ.setdefault("CONVERSATION_STORE_PATH", os.path.join(_runtime_dir, "conversations.sqlite3"))
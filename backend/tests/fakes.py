@@ -0,0 +1,29 @@
+# tests/fakes.py
+"""Stand-ins for the framework objects the app is driven through in tests."""
+import asyncio
+
+
+class FakeWebSocket:
+    """The part of starlette's WebSocket the endpoint uses; receive() returns what the test queues."""
+
+    def __init__(self):
+        self.scope = {"subprotocols": []}
+        self.query_params = {}
+        self.sent = []
+        self.close_code = None
+        self.incoming: asyncio.Queue = asyncio.Queue()
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_text(self, message):
+        self.sent.append(message)
+
+    async def send_bytes(self, message):
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.close_code = code
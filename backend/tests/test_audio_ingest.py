@@ -0,0 +1,52 @@
+# tests/test_audio_ingest.py
+"""Client-reported input sample rates are checked before anything is sized from them."""
+import asyncio
+import json
+
+import pytest
+
+from app.api.v1.endpoints.chat import handle_command, manager
+from app.services.audio_ingest import AudioIngestSession, audio_ingest, valid_sample_rate
+from app.services.chat_service import chat_service
+from tests.fakes import FakeWebSocket
+
+
+@pytest.mark.parametrize("sample_rate", [8000, 16000, 44100, 48000, 96000])
+def test_valid_sample_rates(sample_rate):
+    assert valid_sample_rate(sample_rate)
+
+
+@pytest.mark.parametrize("sample_rate", ["48000", 48000.0, True, 0, -16000, 7999, 96001, 10 ** 12, None, [48000]])
+def test_invalid_sample_rates(sample_rate):
+    assert not valid_sample_rate(sample_rate)
+
+
+def test_start_with_an_invalid_rate_leaves_the_session_unchanged():
+    ingest = AudioIngestSession("client", sample_rate=16000)
+    capacity = ingest.nbytes
+    with pytest.raises(ValueError):
+        ingest.start(sample_rate=10 ** 9)
+    assert ingest.sample_rate == 16000
+    assert ingest.nbytes == capacity
+    assert not ingest.recording
+
+
+def test_start_recording_with_an_invalid_rate_is_refused():
+    async def scenario():
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, "client")
+        try:
+            await handle_command({"type": "start_recording", "sample_rate": "48000"}, "client", chat_service)
+            await asyncio.sleep(0.01)
+            assert not audio_ingest.get("client").recording
+            errors = [json.loads(message) for message in websocket.sent if '"error"' in message]
+            assert errors and errors[0]["error"] == "invalid_sample_rate"
+
+            await handle_command({"type": "start_recording", "sample_rate": 48000}, "client", chat_service)
+            assert audio_ingest.get("client").recording
+            assert audio_ingest.get("client").sample_rate == 48000
+        finally:
+            manager.disconnect("client", websocket)
+            audio_ingest.remove("client")
+
+    asyncio.run(scenario())
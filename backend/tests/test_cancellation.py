@@ -0,0 +1,141 @@
+# tests/test_cancellation.py
+"""A reply in flight is cancelled when the child talks over it (barge-in) or disconnects."""
+import asyncio
+import json
+
+import pytest
+
+from app.api.v1.endpoints.chat import websocket_endpoint
+from app.services.chat_service import chat_service
+from app.services.session_tasks import SessionTaskManager, session_tasks
+from tests.fakes import FakeWebSocket
+
+UTTERANCE = b"\x10\x00" * 1600
+CHURN_CYCLES = 1000
+
+
+class EndlessReply:
+    """Stands in for a streaming LLM/TTS reply that runs until it is cancelled."""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.replies = 0
+        self.closes = 0
+
+    async def __call__(self, text, client_id, audio_format=None):
+        self.replies += 1
+        self.started.set()
+        try:
+            while True:
+                yield b"\x00\x00" * 960
+                await asyncio.sleep(0.01)
+        finally:
+            self.closes += 1
+            self.closed.set()
+
+
+@pytest.fixture
+def reply(monkeypatch):
+    async def recognized(audio_data, client_id, transcription=None):
+        return "なんでおそらはあおいの？"
+
+    endless = EndlessReply()
+    monkeypatch.setattr(chat_service, "process_audio_to_text", recognized)
+    monkeypatch.setattr(chat_service, "respond_with_speech", endless)
+    return endless
+
+
+def text(message: dict) -> dict:
+    return {"type": "websocket.receive", "text": json.dumps(message)}
+
+
+async def speak(websocket: FakeWebSocket) -> None:
+    websocket.incoming.put_nowait(text({"type": "start_recording", "sample_rate": 16000}))
+    websocket.incoming.put_nowait({"type": "websocket.receive", "bytes": UTTERANCE})
+    websocket.incoming.put_nowait(text({"type": "stop_recording"}))
+
+
+def test_start_recording_cancels_the_reply_in_flight(reply):
+    async def scenario():
+        websocket = FakeWebSocket()
+        endpoint = asyncio.create_task(websocket_endpoint(websocket, "client", chat_service))
+        try:
+            await speak(websocket)
+            await asyncio.wait_for(reply.started.wait(), 1)
+            assert session_tasks.active_count() == 1
+
+            # The child talks over the reply
+            websocket.incoming.put_nowait(text({"type": "start_recording", "sample_rate": 16000}))
+            await asyncio.wait_for(reply.closed.wait(), 1)
+            await asyncio.sleep(0.01)
+            assert session_tasks.active_count() == 0
+        finally:
+            websocket.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+            await endpoint
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_cancels_the_reply_in_flight(reply):
+    async def scenario():
+        websocket = FakeWebSocket()
+        endpoint = asyncio.create_task(websocket_endpoint(websocket, "client", chat_service))
+        await speak(websocket)
+        await asyncio.wait_for(reply.started.wait(), 1)
+
+        websocket.incoming.put_nowait({"type": "websocket.disconnect", "code": 1001})
+        await asyncio.wait_for(endpoint, 1)
+        # The endpoint returns only after the pipeline has unwound
+        assert reply.closed.is_set()
+        assert session_tasks.active_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_connect_start_disconnect_churn_leaves_no_tasks(reply):
+    async def replying(count: int) -> None:
+        while reply.replies < count:
+            await asyncio.sleep(0)
+
+    async def scenario():
+        baseline = len(asyncio.all_tasks())
+        for cycle in range(CHURN_CYCLES):
+            websocket = FakeWebSocket()
+            endpoint = asyncio.create_task(websocket_endpoint(websocket, f"churn_{cycle}", chat_service))
+            await speak(websocket)
+            await asyncio.wait_for(replying(cycle + 1), 1)
+            websocket.incoming.put_nowait({"type": "websocket.disconnect", "code": 1001})
+            await asyncio.wait_for(endpoint, 1)
+        await asyncio.sleep(0.01)
+        assert reply.replies == reply.closes == CHURN_CYCLES
+        assert session_tasks.active_count() == 0
+        assert len(asyncio.all_tasks()) == baseline
+
+    asyncio.run(scenario())
+
+
+def test_new_pipeline_starts_after_the_cancelled_one_unwound():
+    async def scenario():
+        tasks = SessionTaskManager()
+        events = []
+
+        async def first():
+            try:
+                await asyncio.sleep(60)
+            finally:
+                await asyncio.sleep(0.01) # e.g. closing a provider stream
+                events.append("first unwound")
+
+        async def second():
+            events.append("second started")
+
+        old = tasks.start("client", first())
+        await asyncio.sleep(0.01)
+        new = tasks.start("client", second())
+        await new
+        assert old.cancelled()
+        assert events == ["first unwound", "second started"]
+        assert tasks.cancelled == 1 and tasks.active_count() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,65 @@
+# tests/test_connections.py
+"""A client that reconnects under the same client_id keeps its newer connection."""
+import asyncio
+
+from app.api.v1.endpoints.chat import ConnectionManager, manager, websocket_endpoint
+from app.services.audio_ingest import audio_ingest
+from app.services.chat_service import chat_service
+from app.services.outbound_queue import EVICTED_CLOSE_CODE
+from app.services.session_tasks import session_tasks
+from tests.fakes import FakeWebSocket
+
+
+def test_reconnect_closes_the_replaced_connection():
+    async def scenario():
+        manager = ConnectionManager()
+        old, new = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(old, "client")
+        old_queue = manager.send_queues["client"]
+        await manager.connect(new, "client")
+        await asyncio.sleep(0.01)
+        assert old_queue.closed
+        assert old.close_code == EVICTED_CLOSE_CODE
+        assert manager.send_queues["client"].websocket is new
+
+        # The old socket's late disconnect leaves the newer connection alone
+        assert not manager.disconnect("client", old)
+        await manager.send_control({"type": "ping"}, "client")
+        await asyncio.sleep(0.01)
+        assert new.sent == ['{"type": "ping"}']
+        assert old.sent == []
+
+        assert manager.disconnect("client", new)
+        assert "client" not in manager.send_queues
+        assert "client" not in manager.active_connections
+
+    asyncio.run(scenario())
+
+
+def test_stale_connection_cleanup_keeps_the_newer_connections_state():
+    async def scenario():
+        old, new = FakeWebSocket(), FakeWebSocket()
+        old_endpoint = asyncio.create_task(websocket_endpoint(old, "client", chat_service))
+        await asyncio.sleep(0.01)
+        new_endpoint = asyncio.create_task(websocket_endpoint(new, "client", chat_service))
+        await asyncio.sleep(0.01)
+        pipeline = session_tasks.start("client", asyncio.sleep(60))
+        ingest = audio_ingest.get("client")
+        ingest.start(sample_rate=16000)
+
+        old.incoming.put_nowait({"type": "websocket.disconnect", "code": 1001})
+        await old_endpoint
+        await asyncio.sleep(0.01)
+        assert not pipeline.done()
+        assert audio_ingest.sessions.get("client") is ingest
+        assert manager.send_queues["client"].websocket is new
+        assert chat_service.sessions.get("client") is not None
+
+        new.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await new_endpoint
+        assert pipeline.cancelled()
+        assert "client" not in audio_ingest.sessions
+        assert "client" not in manager.send_queues
+        assert chat_service.sessions.get("client") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,61 @@
+# tests/test_conversation_store.py
+"""A conversation that starts over never resumes turns or a summary of the previous one."""
+import asyncio
+import tempfile
+from pathlib import Path
+
+from app.services.chat_service import ChatService
+from app.services.conversation_store import ConversationStore
+from app.services.history import MODEL, USER
+from app.services.session_store import SessionStore
+
+RESUME_SECONDS = 60.0
+
+
+def exchange(service: ChatService, question: str, answer: str) -> None:
+    history = service.sessions.get("client")
+    history.append(USER, question)
+    history.append(MODEL, answer)
+    service._persist_exchange("client", question, answer)
+
+
+def test_expired_conversation_is_not_mixed_into_the_resumed_one():
+    async def scenario():
+        store = ConversationStore(
+            path=Path(tempfile.mkdtemp(prefix="voicechat-conversations-")) / "conversations.sqlite3",
+            flush_interval=60.0,
+            batch_size=500,
+            max_pending=1000,
+            resume_seconds=RESUME_SECONDS,
+            retention_seconds=3600.0,
+            purge_interval=3600.0,
+        )
+        service = ChatService(store=SessionStore(), conversations_db=store)
+        await store.start()
+        try:
+            owner = await service.open_session("client")
+            exchange(service, "old question", "old answer")
+            store.record_summary("client", "old summary", 0)
+            await service.close_session("client", owner)
+
+            # The old conversation expires; the next connection starts fresh
+            store.resume_seconds = 0.0
+            owner = await service.open_session("client")
+            store.resume_seconds = RESUME_SECONDS
+            assert len(service.sessions.get("client")) == 0
+            exchange(service, "first question", "first answer")
+            exchange(service, "second question", "second answer")
+            store.record_summary("client", "new summary", 2) # folds the first exchange
+            await service.close_session("client", owner)
+
+            owner = await service.open_session("client")
+            try:
+                history = service.sessions.get("client").to_dict()
+                assert history["summary"] == "new summary"
+                assert history["turns"] == [[USER, "second question"], [MODEL, "second answer"]]
+            finally:
+                await service.close_session("client", owner)
+        finally:
+            await store.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,111 @@
+# tests/test_offload.py
+"""Blocking calls run on the offload pool, so one stuck call never stalls the event loop."""
+import asyncio
+import threading
+import time
+
+import speech_recognition as sr
+
+from app.services.chat_service import ChatService
+from app.services.offload import BlockingOffloader
+from app.services.stt import GoogleSTTBackend
+
+STUCK_SECONDS = 0.5
+
+
+async def heartbeat(stop: asyncio.Event, lags: list, interval: float = 0.01) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - expected)
+
+
+def test_stuck_call_does_not_stall_the_loop_or_other_calls():
+    async def scenario():
+        offloader = BlockingOffloader(max_workers=4, stage_limits={"stt": 2})
+        release = threading.Event()
+        stop = asyncio.Event()
+        lags: list = []
+        beat = asyncio.create_task(heartbeat(stop, lags))
+        try:
+            stuck = asyncio.create_task(offloader.run("stt", release.wait, STUCK_SECONDS * 4))
+            await asyncio.sleep(0.02)
+            results = await asyncio.wait_for(
+                asyncio.gather(*(offloader.run("stt", time.sleep, 0.005) for _ in range(10))), STUCK_SECONDS
+            )
+            assert len(results) == 10
+            assert not stuck.done()
+            await asyncio.sleep(STUCK_SECONDS)
+            release.set()
+            assert await stuck
+        finally:
+            stop.set()
+            await beat
+            offloader.shutdown()
+        # Run on the loop, the stuck call would have delayed a heartbeat by STUCK_SECONDS
+        assert max(lags) < STUCK_SECONDS / 2
+        assert offloader.stats()["stt"]["completed"] == 11
+
+    asyncio.run(scenario())
+
+
+class BlockingRecognizer(sr.Recognizer):
+    """Recognizer whose first call blocks until released; later calls return at once."""
+
+    def __init__(self, release: threading.Event):
+        super().__init__()
+        self.release = release
+        self.calls = 0
+
+    def recognize_google(self, audio_data, language=None, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            self.release.wait(STUCK_SECONDS * 4)
+            return "stuck"
+        return "ok"
+
+
+def test_stuck_recognition_does_not_hold_up_other_sessions():
+    async def scenario():
+        offloader = BlockingOffloader(max_workers=4, stage_limits={"stt": 2})
+        release = threading.Event()
+        service = ChatService(offloader=offloader, stt=GoogleSTTBackend(offloader))
+        service.stt.recognizer = BlockingRecognizer(release)
+        audio = sr.AudioData(b"\x10\x00" * 1600, 16000, 2)
+        try:
+            stuck = asyncio.create_task(service.process_audio_to_text(audio, "stuck_client"))
+            await asyncio.sleep(0.02)
+            others = await asyncio.wait_for(
+                asyncio.gather(*(service.process_audio_to_text(audio, f"client_{i}") for i in range(5))),
+                STUCK_SECONDS,
+            )
+            assert others == ["ok"] * 5
+            release.set()
+            assert await stuck == "stuck"
+        finally:
+            release.set()
+            offloader.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_keeps_the_stage_slot_until_the_thread_finishes():
+    async def scenario():
+        offloader = BlockingOffloader(max_workers=4, stage_limits={"stt": 1})
+        release = threading.Event()
+        try:
+            stuck = asyncio.create_task(offloader.run("stt", release.wait, 5))
+            await asyncio.sleep(0.02)
+            stuck.cancel()
+            queued = asyncio.create_task(offloader.run("stt", lambda: "ran"))
+            await asyncio.sleep(0.05)
+            # The cancelled call's thread is still running: the stage stays at its cap
+            assert not queued.done()
+            assert offloader.stats()["stt"]["running"] == 1
+            release.set()
+            assert await asyncio.wait_for(queued, 1) == "ran"
+        finally:
+            release.set()
+            offloader.shutdown()
+
+    asyncio.run(scenario())
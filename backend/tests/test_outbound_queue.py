@@ -0,0 +1,51 @@
+# tests/test_outbound_queue.py
+"""The send budget counts the bytes each message takes on the wire."""
+import asyncio
+import json
+
+from app.services.outbound_queue import OutboundQueue
+from tests.fakes import FakeWebSocket
+
+
+def queue(websocket: FakeWebSocket, max_bytes: int = 10 ** 6) -> OutboundQueue:
+    return OutboundQueue(
+        websocket,
+        "client",
+        max_bytes=max_bytes,
+        max_messages=64,
+        put_timeout=0.01,
+        send_timeout=1.0,
+        slow_consumer_seconds=60.0,
+    )
+
+
+def test_text_messages_are_counted_in_utf8_bytes():
+    async def scenario():
+        websocket = FakeWebSocket()
+        outbound = queue(websocket)
+        message = json.dumps({"type": "transcription", "text": "あおいそら"}, ensure_ascii=False)
+        outbound.put_text(message)
+        assert outbound.stats()["queued_bytes"] == len(message.encode("utf-8")) > len(message)
+
+        outbound.start()
+        await asyncio.sleep(0.01)
+        assert websocket.sent == [message]
+        assert outbound.stats()["queued_bytes"] == 0
+        assert outbound.sent_bytes == len(message.encode("utf-8"))
+        outbound.close()
+
+    asyncio.run(scenario())
+
+
+def test_queued_text_counts_against_the_audio_budget():
+    async def scenario():
+        outbound = queue(FakeWebSocket(), max_bytes=64)
+        outbound.put_text("あ" * 20) # 60 bytes, 20 characters
+        assert not await outbound.put_audio(b"\x00" * 8)
+        assert outbound.dropped_frames == 1
+
+        outbound.put_text("い", flush_audio=True)
+        assert outbound.stats()["queued_bytes"] == 63
+        outbound.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,67 @@
+# tests/test_resilience.py
+"""Background provider calls never open a circuit, and turns are admitted per provider."""
+import asyncio
+
+import pytest
+import speech_recognition as sr
+
+from app.services.provider_scheduler import LLM, STT, TTS, ProviderBusy
+from app.services.resilience import CircuitBreaker, ProviderGuard, ProviderResilience
+
+
+def guard(name: str) -> ProviderGuard:
+    return ProviderGuard(
+        name,
+        timeout=1.0,
+        stall_timeout=1.0,
+        retries=1,
+        retry_base=0.0,
+        retry_max=0.0,
+        hedge=False,
+        hedge_quantile=0.95,
+        hedge_min_samples=50,
+        breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60.0),
+    )
+
+
+async def unavailable():
+    raise sr.RequestError("503 Service Unavailable")
+
+
+def test_background_failures_leave_the_circuit_closed():
+    async def scenario():
+        tts = guard(TTS)
+        for _ in range(3):
+            with pytest.raises(sr.RequestError):
+                await tts.call(unavailable, background=True)
+        assert tts.breaker.state == CircuitBreaker.CLOSED
+        assert tts.failures == 6 # every attempt is still counted
+
+        with pytest.raises(sr.RequestError):
+            await tts.call(unavailable)
+        assert tts.breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(ProviderBusy):
+            await tts.call(unavailable)
+
+        # Background calls still reach the provider while the circuit is open
+        async def rendered():
+            return b"audio"
+
+        assert await tts.call(rendered, background=True) == b"audio"
+        assert tts.breaker.state == CircuitBreaker.OPEN
+
+    asyncio.run(scenario())
+
+
+def test_admit_checks_only_the_turns_providers():
+    async def scenario():
+        resilience = ProviderResilience({name: guard(name) for name in (STT, LLM, TTS)})
+        with pytest.raises(sr.RequestError):
+            await resilience.call(TTS, unavailable)
+        assert resilience.guards[TTS].breaker.state == CircuitBreaker.OPEN
+
+        resilience.admit((STT, LLM))
+        with pytest.raises(ProviderBusy):
+            resilience.admit((STT, LLM, TTS))
+
+    asyncio.run(scenario())
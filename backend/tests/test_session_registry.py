@@ -0,0 +1,104 @@
+# tests/test_session_registry.py
+"""Histories in memory stay within their budgets, and idle sessions are swept."""
+import asyncio
+import time
+
+from app.services.history import MODEL, USER
+from app.services.session_registry import SessionRegistry
+
+TURN = "あ" * 100
+
+
+def registry(**overrides) -> SessionRegistry:
+    options = dict(idle_seconds=60.0, sweep_interval=60.0, session_max_bytes=10 ** 6, max_bytes=10 ** 7)
+    options.update(overrides)
+    return SessionRegistry(**options)
+
+
+def exchange(sessions: SessionRegistry, client_id: str) -> int:
+    history = sessions.get(client_id)
+    history.append(USER, TURN)
+    history.append(MODEL, TURN)
+    return sessions.account(client_id)
+
+
+def exchange_bytes() -> int:
+    sessions = registry()
+    empty = sessions.create("probe").nbytes
+    exchange(sessions, "probe")
+    return sessions.get("probe").nbytes - empty
+
+
+def test_idle_sweep_evicts_only_idle_sessions():
+    sessions = registry(idle_seconds=0.05)
+    evicted = []
+    sessions.on_evict = evicted.append
+    for client_id in ("a", "b", "c"):
+        sessions.create(client_id)
+    time.sleep(0.06)
+    sessions.touch("b")
+
+    assert sessions.sweep() == 2
+    assert evicted == ["a", "c"]
+    assert "b" in sessions and sessions.get("a") is None
+    assert sessions.nbytes == sessions.get("b").nbytes
+    assert sessions.stats()["evicted_idle"] == 2
+
+
+def test_sweeper_task_runs_every_interval():
+    async def scenario():
+        sessions = registry(idle_seconds=0.02, sweep_interval=0.01)
+        sessions.create("client")
+        sessions.start()
+        try:
+            await asyncio.sleep(0.1)
+        finally:
+            await sessions.close()
+        assert "client" not in sessions
+
+    asyncio.run(scenario())
+
+
+def test_history_is_trimmed_to_the_session_budget():
+    empty = registry().create("probe").nbytes
+    budget = empty + 3 * exchange_bytes()
+    sessions = registry(session_max_bytes=budget)
+    sessions.create("client")
+    dropped = sum(exchange(sessions, "client") for _ in range(5))
+
+    history = sessions.get("client")
+    assert dropped == 4 # two exchanges, dropped in user/model pairs
+    assert len(history) == 6
+    assert history.nbytes <= budget
+    assert sessions.nbytes == history.nbytes
+    assert sessions.stats()["trimmed_turns"] == 4
+
+
+def test_global_budget_evicts_the_least_recently_active_sessions():
+    empty = registry().create("probe").nbytes
+    sessions = registry(max_bytes=3 * empty + 4 * exchange_bytes())
+    evicted = []
+    sessions.on_evict = evicted.append
+    for client_id in ("a", "b", "c"):
+        sessions.create(client_id)
+    exchange(sessions, "a")
+    exchange(sessions, "b")
+    sessions.touch("a") # "b" is now the least recently active with history
+    exchange(sessions, "c")
+    assert evicted == []
+
+    exchange(sessions, "c")
+    exchange(sessions, "c")
+    assert evicted == ["b"]
+    assert sessions.nbytes <= sessions.max_bytes
+    assert sessions.nbytes == sum(sessions.get(client_id).nbytes for client_id in ("a", "c"))
+    assert sessions.stats()["evicted_budget"] == 1
+
+
+def test_the_most_recent_session_is_never_evicted_for_the_budget():
+    sessions = registry(max_bytes=1)
+    sessions.create("a")
+    sessions.create("b")
+    exchange(sessions, "b")
+    assert "a" not in sessions
+    assert "b" in sessions
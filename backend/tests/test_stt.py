@@ -0,0 +1,107 @@
+# tests/test_stt.py
+"""Each utterance is recognized once per stream, and streams opened for a turn are closed."""
+import asyncio
+
+import pytest
+import speech_recognition as sr
+
+from app.services.chat_service import chat_service
+from app.services.stt import BatchSTTBackend, STTBackend, StubSTTBackend
+
+SAMPLE_RATE = 16000
+
+
+class FlakyBackend(StubSTTBackend):
+    """Fails the first `failures` recognitions with a transient error and records every stream."""
+
+    def __init__(self, failures: int = 0):
+        super().__init__("こんにちは")
+        self.failures = failures
+        self.recognitions = 0
+        self.streams = []
+
+    def open(self, client_id, sample_rate):
+        stream = super().open(client_id, sample_rate)
+        recognize = stream._recognize
+
+        async def counted(audio_data):
+            self.recognitions += 1
+            await asyncio.sleep(0.01)
+            if self.recognitions <= self.failures:
+                raise sr.RequestError("503 Service Unavailable")
+            return await recognize(audio_data)
+
+        stream._recognize = counted
+        stream.closed = False
+        stream.close_callbacks.append(lambda: setattr(stream, "closed", True))
+        self.streams.append(stream)
+        return stream
+
+
+def utterance() -> sr.AudioData:
+    return sr.AudioData(b"\x10\x00" * SAMPLE_RATE, SAMPLE_RATE, 2)
+
+
+def with_backend(backend, scenario):
+    previous = chat_service.stt
+    chat_service.stt = backend
+    try:
+        return asyncio.run(scenario())
+    finally:
+        chat_service.stt = previous
+
+
+def test_concurrent_finish_calls_share_one_recognition():
+    async def scenario():
+        stream = backend.open("client", SAMPLE_RATE)
+        first, second = await asyncio.gather(stream.finish(utterance()), stream.finish(utterance()))
+        assert first == second == "こんにちは"
+        assert await stream.finish(utterance()) == "こんにちは"
+        assert backend.recognitions == 1
+
+    backend = FlakyBackend()
+    asyncio.run(scenario())
+
+
+def test_process_audio_to_text_closes_the_stream_it_opens():
+    async def scenario():
+        assert await chat_service.process_audio_to_text(utterance(), "client") == "こんにちは"
+        assert len(backend.streams) == 1 and backend.streams[0].closed
+
+    backend = FlakyBackend()
+    with_backend(backend, scenario)
+
+
+def test_process_audio_to_text_leaves_a_callers_stream_open():
+    async def scenario():
+        stream = backend.open("client", SAMPLE_RATE)
+        stream.feed(utterance().frame_data)
+        assert await chat_service.process_audio_to_text(utterance(), "client", stream) == "こんにちは"
+        assert not stream.closed
+
+    backend = FlakyBackend()
+    with_backend(backend, scenario)
+
+
+def test_retry_recognizes_on_a_fresh_stream():
+    async def scenario():
+        stream = backend.open("client", SAMPLE_RATE)
+        stream.feed(utterance().frame_data)
+        assert await chat_service.process_audio_to_text(utterance(), "client", stream) == "こんにちは"
+        assert backend.recognitions == 2
+        retried = backend.streams[1]
+        assert stream.failed and not stream.closed
+        assert retried.fed_bytes == len(utterance().frame_data) and retried.closed
+
+    backend = FlakyBackend(failures=1)
+    with_backend(backend, scenario)
+
+
+def test_backends_must_implement_recognition():
+    class Incomplete(BatchSTTBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        STTBackend()
+    with pytest.raises(TypeError):
+        Incomplete()
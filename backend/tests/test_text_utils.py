@@ -0,0 +1,38 @@
+# tests/test_text_utils.py
+"""Streamed text is cut into the same sentences however it is split into pieces."""
+from app.utils.text_utils import SentenceChunker, split_sentences
+
+REPLY = "うん。そらがあおいのはね、ひかりがちらばるからだよ！\nゆうやけがあかいのは、どうしてかな？ふしぎだね。"
+
+
+def streamed(text: str, piece: int, min_chars: int = 5) -> list:
+    chunker = SentenceChunker(min_chars)
+    chunks = []
+    for offset in range(0, len(text), piece):
+        chunks.extend(chunker.feed(text[offset:offset + piece]))
+    rest = chunker.flush()
+    if rest:
+        chunks.append(rest)
+    return chunks
+
+
+def test_chunks_do_not_depend_on_how_the_stream_is_split():
+    expected = split_sentences(REPLY, 5)
+    assert expected == [
+        "うん。そらがあおいのはね、ひかりがちらばるからだよ！",
+        "ゆうやけがあかいのは、どうしてかな？",
+        "ふしぎだね。",
+    ]
+    for piece in (1, 2, 3, 7, len(REPLY)):
+        assert streamed(REPLY, piece) == expected
+
+
+def test_short_sentences_held_back_across_feeds_are_merged():
+    chunker = SentenceChunker(min_chars=8)
+    assert chunker.feed("うん。") == []
+    assert chunker.feed("ええ。") == []
+    assert chunker.feed("そうだね") == []
+    assert chunker.feed("。つぎ") == ["うん。ええ。そうだね。"]
+    assert chunker.flush() == "つぎ"
+    assert chunker.feed("はい。") == []
+    assert chunker.flush() == "はい。"
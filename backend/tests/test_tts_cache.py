@@ -0,0 +1,87 @@
+# tests/test_tts_cache.py
+"""Concurrent misses for one rendering are synthesized once, and a failed producer hands the key on."""
+import asyncio
+
+import pytest
+
+from app.services.chat_service import chat_service
+from app.services.tts_cache import TTSCache, tts_cache_key
+
+AUDIO = b"\x01\x00" * 512
+
+
+class Upstream:
+    """Stands in for the TTS API; the first `failures` renderings fail part-way through."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+
+    async def __call__(self, text, client_id, audio_format=None, background=False):
+        self.calls += 1
+        failing = self.calls <= self.failures
+        await asyncio.sleep(0.01)
+        yield AUDIO[:256]
+        await asyncio.sleep(0.01)
+        if failing:
+            raise ConnectionError("stream reset")
+        yield AUDIO[256:]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = TTSCache(memory_max_bytes=10 ** 6)
+    monkeypatch.setattr(chat_service, "tts_cache", fresh)
+    return fresh
+
+
+async def rendered(text: str) -> bytes:
+    return b"".join([bytes(chunk) async for chunk in chat_service._synthesize_cached(text)])
+
+
+def test_concurrent_misses_share_one_rendering(cache, monkeypatch):
+    upstream = Upstream()
+    monkeypatch.setattr(chat_service, "_synthesize_upstream", upstream)
+
+    async def scenario():
+        results = await asyncio.gather(*(rendered("おはよう") for _ in range(5)))
+        assert results == [AUDIO] * 5
+        assert upstream.calls == 1
+        assert cache.stats()["coalesced"] == 4 and cache.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiters_of_a_failed_producer_elect_a_new_one(cache, monkeypatch):
+    upstream = Upstream(failures=1)
+    monkeypatch.setattr(chat_service, "_synthesize_upstream", upstream)
+
+    async def scenario():
+        results = await asyncio.gather(*(rendered("おやすみ") for _ in range(3)), return_exceptions=True)
+        assert isinstance(results[0], ConnectionError)
+        assert results[1:] == [AUDIO, AUDIO]
+        # One waiter took over as producer; the other waited for it
+        assert upstream.calls == 2
+        assert cache.get(tts_cache_key("おやすみ")) == AUDIO
+        assert cache.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_a_stale_producer_cannot_release_the_current_one(cache):
+    async def scenario():
+        key = tts_cache_key("こんにちは")
+        stale, producer = cache.begin(key)
+        assert producer
+        cache.abandon(key, stale)
+        current, producer = cache.begin(key)
+        assert producer and current is not stale
+
+        cache.abandon(key, stale)
+        waiter, producer = cache.begin(key)
+        assert waiter is current and not producer
+        cache.complete(key, AUDIO, current)
+        assert await waiter == AUDIO
+        assert cache.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
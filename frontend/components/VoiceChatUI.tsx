@@ -12,6 +12,48 @@ type MicState = 'idle' | 'recording' | 'playing';
 const nestJsWsUrl = process.env.NEXT_PUBLIC_NESTJS_WS_URL || 'ws://127.0.0.1:3001/voice-chat'; // デフォルト値設定
 const fastApiWsUrlBase = process.env.NEXT_PUBLIC_FASTAPI_WS_URL || 'ws://127.0.0.1:5000/ws/'; // デフォルト値設定
 
+// バイナリフレームプロトコル (backend app/services/framing.py と同じ定義)
+// ヘッダー16バイト (リトルエンディアン): version u8, type u8, flags u16, stream u32, sequence u32, timestamp u32
+const FRAME_SUBPROTOCOL = 'voicechat.v1';
+const FRAME_VERSION = 1;
+const FRAME_HEADER_BYTES = 16;
+const FRAME_AUDIO = 1;
+const FRAME_CONTROL = 2;
+const FRAME_TEXT = 3;
+const FRAME_FLAG_END = 0x1;
+
+// 応答音声のフォーマット (backend app/services/audio_codec.py で交渉される)。
+// このクライアントが再生できる pcm / ulaw / alaw だけを提案し、それ以外の指定は無視する
+const PLAYABLE_FORMATS = ['pcm', 'ulaw', 'alaw'];
+const requestedFormats = (process.env.NEXT_PUBLIC_AUDIO_FORMAT || 'pcm').split(',').map(name => name.trim().toLowerCase());
+const playableFormats = requestedFormats.filter(name => PLAYABLE_FORMATS.includes(name));
+if (playableFormats.length < requestedFormats.length) {
+  console.warn(`NEXT_PUBLIC_AUDIO_FORMAT: ${requestedFormats.filter(name => !PLAYABLE_FORMATS.includes(name)).join(',')} cannot be played; offering ${PLAYABLE_FORMATS.join(' / ')} only`);
+}
+const audioFormat = playableFormats.length ? playableFormats.join(',') : 'pcm';
+const audioSampleRate = process.env.NEXT_PUBLIC_AUDIO_SAMPLE_RATE || '';
+
+// G.711 (mu-law / A-law) の1バイトを Int16 の値に戻すテーブル
+const buildG711Table = (decode: (byte: number) => number): Float32Array => {
+  const table = new Float32Array(256);
+  for (let byte = 0; byte < 256; byte++) {
+    table[byte] = decode(byte) / 0x8000;
+  }
+  return table;
+};
+const ULAW_TABLE = buildG711Table(byte => {
+  const value = ~byte & 0xff;
+  const magnitude = ((((value & 0x0f) << 3) + 0x84) << ((value & 0x70) >> 4)) - 0x84;
+  return value & 0x80 ? -magnitude : magnitude;
+});
+const ALAW_TABLE = buildG711Table(byte => {
+  const value = byte ^ 0x55;
+  const segment = (value & 0x70) >> 4;
+  let magnitude = (value & 0x0f) << 4;
+  magnitude = segment === 0 ? magnitude + 8 : (magnitude + 0x108) << (segment - 1);
+  return value & 0x80 ? magnitude : -magnitude;
+});
+
 export default function VoiceChatUI() {
   const [micState, setMicState] = useState<MicState>('idle'); // 'idle', 'recording', 'playing'
   // eslint-disable-next-line @typescript-eslint/no-explicit-any
@@ -21,6 +63,15 @@ export default function VoiceChatUI() {
   const audioContextRef = useRef<AudioContext | null>(null);
   const mediaStreamRef = useRef<MediaStream | null>(null);
   const processorRef = useRef<ScriptProcessorNode | null>(null);
+  const micStateRef = useRef<MicState>('idle'); // onaudioprocess から最新の状態を参照するため
+  const wsRef = useRef<WebSocket | null>(null);
+  const traceRef = useRef<{ id: string; startedAt: number } | null>(null); // ターンごとのトレースID (サーバーログとの突き合わせ用)
+  const framedRef = useRef<boolean>(false); // サーバーがフレームプロトコルを受け入れたか
+  const uplinkRef = useRef<{ stream: number; sequence: number; epoch: number }>({ stream: 0, sequence: 0, epoch: 0 });
+
+  useEffect(() => {
+    micStateRef.current = micState;
+  }, [micState]);
 
   useEffect(() => {
     // NestJS WebSocket サーバーへの接続 (確認用 - 変更なし)
@@ -34,34 +85,74 @@ export default function VoiceChatUI() {
 
     // FastAPI WebSocket サーバーへの接続
     const clientId = generateClientId();
-    const fastApiWsUrl = `${fastApiWsUrlBase}${clientId}`;
-    const ws = new WebSocket(fastApiWsUrl);
+    const query = new URLSearchParams({ audio_format: audioFormat });
+    if (audioSampleRate) {
+      query.set('audio_sample_rate', audioSampleRate);
+    }
+    const fastApiWsUrl = `${fastApiWsUrlBase}${clientId}?${query}`;
+    // フレームプロトコルを提案し、受け入れられなければ従来の JSON テキスト / 生 PCM で話す
+    const ws = new WebSocket(fastApiWsUrl, [FRAME_SUBPROTOCOL]);
     setFastAPIWebSocket(ws);
+    wsRef.current = ws;
 
     ws.onopen = () => {
-      console.log('FastAPI WebSocket connection opened:', clientId);
+      framedRef.current = ws.protocol === FRAME_SUBPROTOCOL;
+      uplinkRef.current = { stream: 0, sequence: 0, epoch: performance.now() };
+      console.log('FastAPI WebSocket connection opened:', clientId, framedRef.current ? '(framed)' : '');
+    };
+
+    ws.binaryType = 'arraybuffer';
+
+    // eslint-disable-next-line @typescript-eslint/no-explicit-any
+    const handleControl = (control: any, stream: number) => {
+      if (control.trace_id && traceRef.current?.id === control.trace_id) {
+          console.log(`[trace ${control.trace_id}] ${control.type} +${Math.round(performance.now() - traceRef.current.startedAt)}ms`);
+      }
+      if (control.type === 'audio_start') {
+          startPlayback(control.format ?? 'pcm', control.sample_rate ?? 24000, stream);
+      } else if (control.type === 'audio_end' && stream === playbackStreamRef.current) {
+          if (control.interrupted) {
+              stopPlayback(); // 割り込み (barge-in) で打ち切られた応答は即停止
+          } else {
+              endPlayback();
+          }
+      }
     };
 
     ws.onmessage = (event) => {
-      console.log('Message from FastAPI server:', event.data);
-      // FastAPIからのメッセージ（テキスト）を受信したら読み上げ開始
       if (typeof event.data === 'string') {
-          speak(event.data);
-      } else if (event.data instanceof Blob) {
-          // Blobデータ（音声など）を受信した場合の処理（必要なら）
-          console.log("Received audio data from FastAPI");
-          // ここでBlobデータを再生するなどの処理を追加できます
-          // バイナリデータ（音声）が届いた場合
-          setMicState('playing'); // 再生中状態にする
-          const audioUrl = URL.createObjectURL(event.data);
-          const audio = new Audio(audioUrl);
-          audio.play();
-          audio.onended = () => setMicState('idle'); // 再生完了でidleに戻す
-          // 例: const audioUrl = URL.createObjectURL(event.data);
-          //     const audio = new Audio(audioUrl);
-          //     audio.play();
-          //     setMicState('playing'); // 再生中状態にする
-          //     audio.onended = () => setMicState('idle'); // 再生完了でidleに戻す
+          // 制御メッセージ (JSON) とテキスト応答を区別する
+          const control = parseControlMessage(event.data);
+          if (control) {
+              handleControl(control, 0);
+          } else {
+              // FastAPIからのメッセージ（テキスト）を受信したら読み上げ開始
+              speak(event.data);
+          }
+      } else if (event.data instanceof ArrayBuffer && framedRef.current) {
+          const buffer = event.data;
+          if (buffer.byteLength < FRAME_HEADER_BYTES) {
+              return;
+          }
+          const header = new DataView(buffer, 0, FRAME_HEADER_BYTES);
+          const type = header.getUint8(1);
+          const stream = header.getUint32(4, true);
+          if (type === FRAME_AUDIO) {
+              // 打ち切った応答の遅れて届いたフレームは再生しない
+              if (stream === playbackStreamRef.current) {
+                  enqueuePcmFrame(buffer, FRAME_HEADER_BYTES);
+              }
+          } else if (type === FRAME_CONTROL) {
+              const control = parseControlMessage(new TextDecoder().decode(new Uint8Array(buffer, FRAME_HEADER_BYTES)));
+              if (control) {
+                  handleControl(control, stream);
+              }
+          } else if (type === FRAME_TEXT) {
+              speak(new TextDecoder().decode(new Uint8Array(buffer, FRAME_HEADER_BYTES)));
+          }
+      } else if (event.data instanceof ArrayBuffer) {
+          // PCM フレームは届いた順にすぐ再生キューへ積む
+          enqueuePcmFrame(event.data, 0);
       }
     };
 
@@ -82,6 +173,124 @@ export default function VoiceChatUI() {
     };
   }, []); // 依存配列は空のまま
 
+  // ---- サーバーからのストリーミング PCM 再生 (Int16, mono) ----
+  const playbackContextRef = useRef<AudioContext | null>(null);
+  const playbackCursorRef = useRef<number>(0);
+  const playbackSampleRateRef = useRef<number>(24000);
+  const playbackTableRef = useRef<Float32Array | null>(null); // G.711 の復号テーブル (pcm では null)
+  const playbackEndedRef = useRef<boolean>(true);
+  const lastSourceRef = useRef<AudioBufferSourceNode | null>(null);
+  const playbackStreamRef = useRef<number>(0); // 再生中の応答のストリームID (従来プロトコルでは 0)
+
+  // ---- フレームプロトコルでの送信 ----
+  // ヘッダーを書き込んだフレームを返す。ペイロード領域 (FRAME_HEADER_BYTES 以降) は呼び出し側が埋める
+  const allocateFrame = (type: number, payloadBytes: number, flags: number = 0): ArrayBuffer => {
+    const uplink = uplinkRef.current;
+    const buffer = new ArrayBuffer(FRAME_HEADER_BYTES + payloadBytes);
+    const header = new DataView(buffer, 0, FRAME_HEADER_BYTES);
+    header.setUint8(0, FRAME_VERSION);
+    header.setUint8(1, type);
+    header.setUint16(2, flags, true);
+    header.setUint32(4, uplink.stream, true);
+    header.setUint32(8, uplink.sequence++, true);
+    header.setUint32(12, Math.round(performance.now() - uplink.epoch) >>> 0, true);
+    return buffer;
+  };
+
+  // JSON コマンドを送る。startStream で新しい発話ストリームを開始する
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  const sendCommand = (ws: WebSocket, message: any, startStream: boolean = false) => {
+    if (!framedRef.current) {
+      ws.send(JSON.stringify(message));
+      return;
+    }
+    if (startStream) {
+      uplinkRef.current.stream += 1;
+      uplinkRef.current.sequence = 0;
+    }
+    const payload = new TextEncoder().encode(JSON.stringify(message));
+    const frame = allocateFrame(FRAME_CONTROL, payload.byteLength);
+    new Uint8Array(frame, FRAME_HEADER_BYTES).set(payload);
+    ws.send(frame);
+  };
+
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  const parseControlMessage = (text: string): any | null => {
+    try {
+      const message = JSON.parse(text);
+      return message && typeof message === 'object' && typeof message.type === 'string' ? message : null;
+    } catch {
+      return null;
+    }
+  };
+
+  const startPlayback = (format: string, sampleRate: number, stream: number) => {
+    if (!PLAYABLE_FORMATS.includes(format)) {
+      // 再生できないフォーマット (wav のヘッダーや圧縮音声) をサンプルとして鳴らさない
+      console.error(`Unsupported reply audio format: ${format}`);
+      stopPlayback();
+      return;
+    }
+    if (!playbackContextRef.current || playbackContextRef.current.state === 'closed') {
+      playbackContextRef.current = new AudioContext();
+    }
+    playbackSampleRateRef.current = sampleRate;
+    playbackTableRef.current = format === 'ulaw' ? ULAW_TABLE : format === 'alaw' ? ALAW_TABLE : null;
+    playbackStreamRef.current = stream;
+    playbackCursorRef.current = playbackContextRef.current.currentTime;
+    playbackEndedRef.current = false;
+    lastSourceRef.current = null;
+    setMicState('playing');
+  };
+
+  const enqueuePcmFrame = (buffer: ArrayBuffer, offset: number) => {
+    const context = playbackContextRef.current;
+    const table = playbackTableRef.current;
+    if (!context || buffer.byteLength - offset < (table ? 1 : 2)) {
+      return;
+    }
+    // コピーせずにペイロードを参照
+    const samples = table ? new Uint8Array(buffer, offset) : new Int16Array(buffer, offset, (buffer.byteLength - offset) >> 1);
+    const audioBuffer = context.createBuffer(1, samples.length, playbackSampleRateRef.current);
+    const channel = audioBuffer.getChannelData(0);
+    if (table) {
+      for (let i = 0; i < samples.length; i++) {
+        channel[i] = table[samples[i]];
+      }
+    } else {
+      for (let i = 0; i < samples.length; i++) {
+        channel[i] = samples[i] / 0x8000;
+      }
+    }
+    const source = context.createBufferSource();
+    source.buffer = audioBuffer;
+    source.connect(context.destination);
+    const startAt = Math.max(playbackCursorRef.current, context.currentTime);
+    source.start(startAt);
+    playbackCursorRef.current = startAt + audioBuffer.duration;
+    source.onended = () => {
+      if (playbackEndedRef.current && lastSourceRef.current === source) {
+        setMicState('idle'); // 最後のフレームの再生完了でidleに戻す
+      }
+    };
+    lastSourceRef.current = source;
+  };
+
+  const stopPlayback = () => {
+    playbackContextRef.current?.close().catch(e => console.error("Error closing playback AudioContext:", e));
+    playbackContextRef.current = null;
+    lastSourceRef.current = null;
+    playbackEndedRef.current = true;
+    setMicState('idle');
+  };
+
+  const endPlayback = () => {
+    playbackEndedRef.current = true;
+    if (!lastSourceRef.current) {
+      setMicState('idle'); // 音声フレームが無かった場合
+    }
+  };
+
   const generateClientId = () => {
     return "client_" + Math.random().toString(36).substring(2, 15);
   };
@@ -122,19 +331,29 @@ export default function VoiceChatUI() {
       const processor = context.createScriptProcessor(4096, 1, 1); // バッファサイズ、入力チャンネル数、出力チャンネル数
       processorRef.current = processor;
 
+      // FastAPI サーバーに録音開始とサンプルレートを通知
+      if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
+          console.log("Sending start_recording signal to FastAPI");
+          const traceId = Math.random().toString(16).substring(2, 18);
+          traceRef.current = { id: traceId, startedAt: performance.now() };
+          sendCommand(wsRef.current, { type: "start_recording", sample_rate: context.sampleRate, trace_id: traceId }, true);
+      }
+
       processor.onaudioprocess = (e) => {
-        if (micState !== 'recording' || !fastAPIWebSocket || fastAPIWebSocket.readyState !== WebSocket.OPEN) {
+        const ws = wsRef.current;
+        if (micStateRef.current !== 'recording' || !ws || ws.readyState !== WebSocket.OPEN) {
           return;
         }
-        // Float32Array を Int16Array に変換して送信
+        // Float32Array を Int16Array に変換して送信 (フレームプロトコルではフレームのペイロード領域に直接書き込む)
         const inputData = e.inputBuffer.getChannelData(0);
-        const output = new Int16Array(inputData.length);
+        const buffer = framedRef.current ? allocateFrame(FRAME_AUDIO, inputData.length * 2) : new ArrayBuffer(inputData.length * 2);
+        const output = new Int16Array(buffer, framedRef.current ? FRAME_HEADER_BYTES : 0, inputData.length);
         for (let i = 0; i < inputData.length; i++) {
             output[i] = Math.max(-1, Math.min(1, inputData[i])) * 0x7FFF; // 16ビット整数に変換
         }
         // console.log("Sending audio data chunk..."); // ログが多いのでコメントアウト
-        console.debug("送信前の音声データ（ArrayBufferサイズ）:", output.buffer.byteLength);
-        fastAPIWebSocket.send(output.buffer);
+        console.debug("送信前の音声データ（ArrayBufferサイズ）:", buffer.byteLength);
+        ws.send(buffer);
       };
 
       source.connect(processor);
@@ -176,13 +395,8 @@ export default function VoiceChatUI() {
     if (micState === 'idle') {
       // 待機状態 -> 録音開始
       setMicState('recording');
-      startBrowserRecording(); // ブラウザでの録音開始
-      // FastAPI サーバーに録音開始を通知 (必要であればメッセージを送る)
-      if (fastAPIWebSocket && fastAPIWebSocket.readyState === WebSocket.OPEN) {
-          console.log("Sending start_recording signal to FastAPI");
-          // 必要に応じて開始の合図を送る（例: JSONメッセージ）
-          fastAPIWebSocket.send(JSON.stringify({ type: "start_recording" }));
-      }
+      micStateRef.current = 'recording';
+      startBrowserRecording(); // ブラウザでの録音開始 (start_recording もここで送信)
 
     } else if (micState === 'recording') {
       // 録音状態 -> 読み上げ準備/待機状態へ
@@ -192,12 +406,17 @@ export default function VoiceChatUI() {
       if (fastAPIWebSocket && fastAPIWebSocket.readyState === WebSocket.OPEN) {
           console.log("Sending stop_recording signal to FastAPI");
           // fastAPIWebSocket.send(JSON.stringify({ type: "stop_recording" }));
-          // 空のデータを送ることで終端を示す場合もある
-          fastAPIWebSocket.send(new ArrayBuffer(0));
+          // 空のデータを送ることで終端を示す場合もある (フレームプロトコルでは FLAG_END 付きの空フレーム)
+          fastAPIWebSocket.send(framedRef.current ? allocateFrame(FRAME_AUDIO, 0, FRAME_FLAG_END) : new ArrayBuffer(0));
       }
     } else if (micState === 'playing') {
         // 再生中 -> アイドル状態へ（再生停止）
         speechSynthesis.cancel(); // 現在の読み上げをキャンセル
+        stopPlayback(); // ストリーミング再生も停止
+        // サーバー側の応答生成 (LLM/TTS) も中断させる
+        if (fastAPIWebSocket && fastAPIWebSocket.readyState === WebSocket.OPEN) {
+            sendCommand(fastAPIWebSocket, { type: "interrupt" });
+        }
         setMicState('idle');
         console.log("Speech synthesis cancelled by user.");
     }